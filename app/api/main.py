@@ -100,10 +100,29 @@ async def lifespan(app: FastAPI):
         logger.error(f"数据库初始化失败: {e}")
         raise
 
+    # 预编译工作流（所有请求共享）
+    from ..workflow import warm_graphs
+    warm_graphs()
+
+    # 事件循环阻塞监控
+    from ..services.metrics import start_loop_monitor, stop_loop_monitor
+    start_loop_monitor(settings.loop_monitor_interval, settings.loop_stall_threshold)
+
     logger.info("应用启动成功")
     yield
 
     # 关闭
+    await stop_loop_monitor()
+
+    from ..services.video_gen import shutdown_video_poller
+    await shutdown_video_poller()
+
+    from ..services.http import close_http_clients
+    await close_http_clients()
+
+    from ..services.storage import shutdown_storage
+    shutdown_storage()
+
     from ..db import close_db
     await close_db()
     logger.info("应用关闭")
@@ -135,7 +154,10 @@ def create_app() -> FastAPI:
     app.include_router(test_router, prefix="/api/v1")
 
     # 静态文件服务 - 用于访问生成的视频和图片
+    # 本地存储后端的对象也经由该挂载访问（服务器支持 pathsend 扩展时零拷贝发送）
     outputs_path = settings.output_dir
+    if settings.storage_backend == "local":
+        (outputs_path / "storage").mkdir(parents=True, exist_ok=True)
     if outputs_path.exists():
         app.mount("/outputs", StaticFiles(directory=str(outputs_path)), name="outputs")
         logger.info(f"静态文件服务已挂载: /outputs -> {outputs_path}")
@@ -35,6 +35,12 @@ class GenerationRequest(BaseModel):
         description="[向后兼容] 旧风格预设（建议使用style参数）",
     )
 
+    # 缓存控制
+    bypass_cache: bool = Field(
+        False,
+        description="跳过文案缓存，强制重新生成",
+    )
+
     class Config:
         json_schema_extra = {
             "example": {
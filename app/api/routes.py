@@ -9,14 +9,18 @@ from fastapi import APIRouter, HTTPException, status
 from fastapi.responses import FileResponse, StreamingResponse
 
 from .models import GenerationRequest, GenerationResponse, TaskStatus, HealthResponse
-from ..workflow import create_graph
+from ..workflow import get_graph, get_task_graph
 from ..state import AgentState
 from ..config import get_settings
+from ..services.governor import clear_task_queue_wait, get_task_queue_wait, track_task_queue_wait
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["tasks"])
 
+# 当前进程中正在执行的任务（同一任务不能同时执行两次）
+_running_tasks: set[str] = set()
+
 
 # ============================================================================
 # SSE 流式生成端点
@@ -79,18 +83,23 @@ async def _stream_generation(
     philosopher: str | None = None,  # 向后兼容
     science_type: str | None = None,  # 向后兼容
     style_preset: str | None = None,  # 向后兼容
+    bypass_cache: bool = False,
 ) -> AsyncGenerator[str, None]:
     """
     流式生成视频，通过 SSE 返回进度
 
     SSE 事件类型：
-    - progress: 进度更新
+    - progress: 进度更新（含各提供商的排队时间 queue_wait）
     - scene: 场景数据更新（图片/视频生成完成）
     - done: 完成，返回最终视频 URL
     - error: 错误
     """
     task_id = uuid.uuid4().hex
-    graph = create_graph()
+    graph = get_graph()
+
+    # 绑定任务上下文（工作流节点中的存储对象引用等按任务记录）
+    from ..services.context import set_task_id
+    set_task_id(task_id)
 
     # 处理向后兼容的参数映射
     final_style = style
@@ -114,6 +123,9 @@ async def _stream_generation(
             "philosopher": philosopher,
             "science_type": science_type,
             "style_preset": style_preset,
+            "bypass_cache": bypass_cache,
+            # 任务恢复时按该变体取工作流
+            "graph_variant": get_settings().graph_variant,
         },
         "step": "init",
     }
@@ -124,23 +136,56 @@ async def _stream_generation(
 
     logger.info(f"[SSE] 开始流式生成: task_id={task_id}, topic={topic}")
 
-    try:
-        # 发送初始事件
-        yield _sse_event("init", {
+    # 发送初始事件
+    yield _sse_event("init", {
+        "task_id": task_id,
+        "topic": topic,
+    })
+
+    async for chunk in _stream_workflow(graph, initial_state, config, task_id):
+        yield chunk
+
+
+async def _stream_workflow(
+    graph,
+    graph_input: AgentState | None,
+    config: dict,
+    task_id: str,
+) -> AsyncGenerator[str, None]:
+    """
+    执行工作流并把节点更新转换为 SSE 事件
+
+    Args:
+        graph_input: 初始状态；为 None 时从检查点中最后完成的节点继续执行
+    """
+    if task_id in _running_tasks:
+        yield _sse_event("error", {
             "task_id": task_id,
-            "topic": topic,
+            "message": "任务正在执行中",
         })
+        return
+    _running_tasks.add(task_id)
+    track_task_queue_wait(task_id)
 
+    try:
         # 流式执行工作流
         final_state = None
         event_count = 0
         writing_sent = False  # 标记文案是否已发送
 
-        async for event in graph.astream(initial_state, config):
+        durability = get_settings().checkpoint_durability
+        async for event in graph.astream(graph_input, config, durability=durability):
             event_count += 1
 
             for node_name, state in event.items():
-                if not isinstance(state, dict) or "step" not in state:
+                if not isinstance(state, dict):
+                    continue
+
+                # 单个场景的图像/视频完成后立即推送（不等待聚合节点）
+                for event_data in _scene_task_events(task_id, state):
+                    yield _sse_event("scene", event_data)
+
+                if "step" not in state:
                     continue
 
                 final_state = state
@@ -155,6 +200,11 @@ async def _stream_generation(
                     "step": step,
                     "progress": progress,
                     "message": _get_step_message(step),
+                    # 各提供商限流器上累计的排队时间（秒）
+                    "queue_wait": {
+                        provider: round(seconds, 2)
+                        for provider, seconds in get_task_queue_wait(task_id).items()
+                    },
                 })
 
                 # 文案生成完成事件（首次进入 imaging 步骤时发送）
@@ -232,6 +282,27 @@ async def _stream_generation(
             "task_id": task_id,
             "message": str(e),
         })
+    finally:
+        _running_tasks.discard(task_id)
+        clear_task_queue_wait(task_id)
+
+
+def _scene_task_events(task_id: str, update: dict) -> list[dict]:
+    """从单场景节点的 image_tasks / video_tasks 更新中提取已完成的场景事件"""
+    events = []
+    for key, scene_type, url_field in (
+        ("image_tasks", "image", "image_url"),
+        ("video_tasks", "video", "video_url"),
+    ):
+        for entry in (update.get(key) or {}).values():
+            if entry.get("status") == "completed" and entry.get(url_field):
+                events.append({
+                    "task_id": task_id,
+                    "scene_id": entry.get("scene_id"),
+                    "scene_type": scene_type,
+                    "url": entry[url_field],
+                })
+    return events
 
 
 def _sse_event(event_type: str, data: dict) -> str:
@@ -256,7 +327,7 @@ async def generate_video_stream(request: GenerationRequest):
 
     **SSE 事件类型**:
     - `init`: 任务初始化，返回 task_id
-    - `progress`: 进度更新 {step, progress, message}
+    - `progress`: 进度更新 {step, progress, message, queue_wait}
     - `scene`: 场景数据更新 {scene_id, type, url}
     - `done`: 完成，返回最终视频 URL
     - `error`: 错误信息
@@ -273,6 +344,7 @@ async def generate_video_stream(request: GenerationRequest):
     - **theme**: 可选的子主题（用于某些风格的细分）
     - **philosopher**: [向后兼容] 指定哲学家（映射到camus风格）
     - **science_type**: [向后兼容] 关联科学类型
+    - **bypass_cache**: 跳过文案缓存，强制重新生成
     """
     return StreamingResponse(
         _stream_generation(
@@ -282,6 +354,7 @@ async def generate_video_stream(request: GenerationRequest):
             philosopher=request.philosopher,
             science_type=request.science_type,
             style_preset=request.style_preset,
+            bypass_cache=request.bypass_cache,
         ),
         media_type="text/event-stream",
         headers={
@@ -292,6 +365,70 @@ async def generate_video_stream(request: GenerationRequest):
     )
 
 
+@router.post(
+    "/tasks/{task_id}/resume",
+    summary="恢复中断的视频生成任务（SSE 流式返回）",
+)
+async def resume_task_stream(task_id: str):
+    """
+    从检查点中最后完成的节点继续执行中断的任务（进程重启、合成失败等）
+
+    已完成的场景不会重新生成：检查点中已完成节点的输出直接复用，
+    中断时正在生成的场景通过幂等记录继续轮询已创建的视频任务、重新上传已生成的产物。
+
+    **使用方式**:
+    ```bash
+    curl -N -X POST http://localhost:8001/api/v1/tasks/<task_id>/resume
+    ```
+
+    **SSE 事件类型**: 与 `/generate` 相同，`init` 事件中的 `resume_from` 为将要执行的节点
+    """
+    graph = await get_task_graph(task_id)
+    if graph is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="任务不存在或没有可恢复的检查点",
+        )
+
+    config = {"configurable": {"thread_id": task_id}}
+    snapshot = await graph.aget_state(config)
+    if not snapshot.next:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="任务已结束，无需恢复",
+        )
+    if task_id in _running_tasks:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="任务正在执行中",
+        )
+
+    return StreamingResponse(
+        _stream_resume(graph, config, task_id, list(snapshot.next)),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",  # 禁用 nginx 缓冲
+        },
+    )
+
+
+async def _stream_resume(graph, config: dict, task_id: str, resume_from: list[str]) -> AsyncGenerator[str, None]:
+    """从检查点继续执行任务，通过 SSE 返回进度"""
+    from ..services.context import set_task_id
+    set_task_id(task_id)
+
+    logger.info(f"[SSE] 恢复任务: task_id={task_id}, resume_from={resume_from}")
+    yield _sse_event("init", {
+        "task_id": task_id,
+        "resume_from": resume_from,
+    })
+
+    async for chunk in _stream_workflow(graph, None, config, task_id):
+        yield chunk
+
+
 # ============================================================================
 # 其他 REST 端点
 # ============================================================================
@@ -320,6 +457,18 @@ async def download_video(filename: str) -> FileResponse:
     )
 
 
+@router.get(
+    "/metrics",
+    summary="运行时指标",
+)
+async def get_metrics() -> dict:
+    """
+    返回各服务注册的运行时指标（缓存命中率等）
+    """
+    from ..services.metrics import collect_metrics
+    return collect_metrics()
+
+
 @router.get(
     "/health",
     response_model=HealthResponse,
@@ -18,18 +18,75 @@ class Settings(BaseSettings):
     tts_cluster: str = Field(default="volcano_tts", alias="VOLC_TTS_CLUSTER")
     tts_endpoint: str = Field(default="https://openspeech.bytedance.com/api/v1/tts", alias="VOLC_TTS_ENDPOINT")
     tts_voice: str = Field(default="zh_female_jitangnv_saturn_bigtts", alias="TTS_VOICE")
+    tts_transport: str = Field(default="websocket", alias="TTS_TRANSPORT")  # websocket / http
+    tts_ws_endpoint: str = Field(
+        default="wss://openspeech.bytedance.com/api/v1/tts/ws_binary",
+        alias="VOLC_TTS_WS_ENDPOINT",
+    )
+    tts_max_concurrency: int = Field(default=4, alias="TTS_MAX_CONCURRENCY")  # 同时进行的合成请求数
+    tts_scene_retries: int = Field(default=2, alias="TTS_SCENE_RETRIES")  # 单个场景失败时的重试次数
+    tts_cache_enabled: bool = Field(default=True, alias="TTS_CACHE_ENABLED")
+    tts_cache_size: int = Field(default=512, alias="TTS_CACHE_SIZE")  # 内存层条目上限（LRU 淘汰）
+    tts_cache_ttl: float = Field(default=30 * 24 * 3600, alias="TTS_CACHE_TTL")  # 缓存条目有效期（秒）
+
+    # 提供商：volcengine（火山引擎）/ fake（本地模拟提供商，离线压测用，需要 ffmpeg）
+    provider: str = Field(default="volcengine", alias="PROVIDER")
+    fake_seed: int = Field(default=0, alias="FAKE_SEED")
+    fake_llm_latency: float = Field(default=3.0, alias="FAKE_LLM_LATENCY")  # 延迟中位数（秒）
+    fake_image_latency: float = Field(default=4.0, alias="FAKE_IMAGE_LATENCY")
+    fake_video_latency: float = Field(default=30.0, alias="FAKE_VIDEO_LATENCY")
+    fake_tts_latency: float = Field(default=1.0, alias="FAKE_TTS_LATENCY")
+    fake_latency_sigma: float = Field(default=0.5, alias="FAKE_LATENCY_SIGMA")  # 对数正态分布 sigma（越大长尾越重）
+    fake_failure_rate: float = Field(default=0.0, alias="FAKE_FAILURE_RATE")  # 单次调用失败概率
+    fake_rpm: float = Field(default=0, alias="FAKE_RPM")  # 模拟提供商侧限流（0 表示不限）
+    fake_scene_count: int = Field(default=6, alias="FAKE_SCENE_COUNT")  # 模拟文案的场景数
+    fake_video_duration: float = Field(default=5.0, alias="FAKE_VIDEO_DURATION")  # 模拟视频片段时长（秒）
 
     # LLM 配置
     llm_model: str = "doubao-seed-1-8-251228"
     image_model: str = "doubao-seedream-3-0-t2i-250415"
     video_model: str = "doubao-seedance-1-0-pro-fast-251015"
 
+    # 提供商限流（进程内所有请求共享）：最大在途请求数 + 每分钟请求数，并按 AIMD 自适应
+    llm_max_concurrency: int = Field(default=8, alias="LLM_MAX_CONCURRENCY")
+    image_max_concurrency: int = Field(default=8, alias="IMAGE_MAX_CONCURRENCY")
+    video_max_concurrency: int = Field(default=16, alias="VIDEO_MAX_CONCURRENCY")  # 同时运行的视频任务数
+    llm_rpm: float = Field(default=300, alias="LLM_RPM")
+    image_rpm: float = Field(default=300, alias="IMAGE_RPM")
+    video_rpm: float = Field(default=60, alias="VIDEO_RPM")
+    tts_rpm: float = Field(default=300, alias="TTS_RPM")
+    governor_burst: int = Field(default=10, alias="GOVERNOR_BURST")  # 令牌桶容量（允许的突发请求数）
+    governor_spike_factor: float = Field(default=3.0, alias="GOVERNOR_SPIKE_FACTOR")  # 延迟超过基线该倍数时收缩并发
+    governor_decrease_factor: float = Field(default=0.5, alias="GOVERNOR_DECREASE_FACTOR")  # 限流/延迟突增时的收缩系数
+
+    # 单个场景失败时的节点内重试次数；中间结果写入幂等记录，重试从断点继续
+    image_scene_retries: int = Field(default=2, alias="IMAGE_SCENE_RETRIES")
+    video_scene_retries: int = Field(default=2, alias="VIDEO_SCENE_RETRIES")
+    idempotency_ttl: float = Field(default=24 * 3600, alias="IDEMPOTENCY_TTL")  # 幂等记录有效期（秒，提供商临时 URL 约 24h 过期）
+
+    # 视频任务轮询配置（全局批量轮询器）
+    video_task_timeout: float = Field(default=300.0, alias="VIDEO_TASK_TIMEOUT")
+    video_poll_batch_size: int = Field(default=50, alias="VIDEO_POLL_BATCH_SIZE")
+    video_poll_min_interval: float = Field(default=2.0, alias="VIDEO_POLL_MIN_INTERVAL")
+    video_poll_max_interval: float = Field(default=15.0, alias="VIDEO_POLL_MAX_INTERVAL")
+
+    # 共享 HTTP 连接池配置
+    http_http2: bool = Field(default=True, alias="HTTP_HTTP2")
+    http_max_connections: int = Field(default=100, alias="HTTP_MAX_CONNECTIONS")
+    http_max_keepalive_connections: int = Field(default=20, alias="HTTP_MAX_KEEPALIVE")
+    http_keepalive_expiry: float = Field(default=30.0, alias="HTTP_KEEPALIVE_EXPIRY")
+    http_max_per_host: int = Field(default=16, alias="HTTP_MAX_PER_HOST")
+
     output_dir: Path = Field(default=Path("./outputs"))
 
     # 背景音乐配置
     bgm_enabled: bool = Field(default=True, alias="BGM_ENABLED")
     bgm_volume: float = Field(default=0.2, alias="BGM_VOLUME")  # 背景音乐音量 (0.0-1.0)
 
+    # 存储后端：minio（对象存储）/ local（本地文件系统，单机部署）
+    storage_backend: str = Field(default="minio", alias="STORAGE_BACKEND")
+    local_storage_public_url: str = Field(default="http://localhost:8001", alias="LOCAL_STORAGE_PUBLIC_URL")  # 本应用的公开地址
+
     # MinIO 对象存储配置
     minio_endpoint: str = Field(default="localhost:9000", alias="MINIO_ENDPOINT")
     minio_access_key: str = Field(default="minioadmin", alias="MINIO_ACCESS_KEY")
@@ -37,6 +94,53 @@ class Settings(BaseSettings):
     minio_bucket: str = Field(default="dear-assets", alias="MINIO_BUCKET")
     minio_use_ssl: bool = Field(default=False, alias="MINIO_USE_SSL")
     minio_public_url: str = Field(default="http://localhost:9000", alias="MINIO_PUBLIC_URL")
+    minio_region: str = Field(default="us-east-1", alias="MINIO_REGION")
+    storage_max_workers: int = Field(default=8, alias="STORAGE_MAX_WORKERS")  # 存储线程池大小
+    storage_part_size: int = Field(default=8 * 1024 * 1024, alias="STORAGE_PART_SIZE")  # 分片大小（字节，最小 5MiB）
+    storage_parallel_uploads: int = Field(default=4, alias="STORAGE_PARALLEL_UPLOADS")  # 单个文件并行上传的分片数
+
+    # 本地产物缓存（上传时写入，下游节点按 URL 直接读取本地文件）
+    artifact_cache_enabled: bool = Field(default=True, alias="ARTIFACT_CACHE_ENABLED")
+    artifact_cache_dir: Path | None = Field(default=None, alias="ARTIFACT_CACHE_DIR")  # 默认 {output_dir}/artifact_cache
+    artifact_cache_max_bytes: int = Field(default=2 * 1024 ** 3, alias="ARTIFACT_CACHE_MAX_BYTES")  # 每个进程的上限
+
+    # 事件循环阻塞监控
+    loop_monitor_interval: float = Field(default=0.1, alias="LOOP_MONITOR_INTERVAL")  # 采样间隔（秒）
+    loop_stall_threshold: float = Field(default=0.05, alias="LOOP_STALL_THRESHOLD")  # 超过该延迟计为一次阻塞（秒）
+
+    # 图像生成缓存配置
+    image_cache_enabled: bool = Field(default=True, alias="IMAGE_CACHE_ENABLED")
+    image_cache_ttl: float = Field(default=7 * 24 * 3600, alias="IMAGE_CACHE_TTL")  # 缓存条目有效期（秒）
+    image_cloud_url_ttl: float = Field(default=23 * 3600, alias="IMAGE_CLOUD_URL_TTL")  # 云端 URL 视为有效的时长（官方 24h）
+
+    # 参考图编码缓存（角色一致性生成时复用已编码的参考图）
+    image_ref_cache_max_bytes: int = Field(default=64 * 1024 * 1024, alias="IMAGE_REF_CACHE_MAX_BYTES")
+    image_ref_max_side: int = Field(default=2048, alias="IMAGE_REF_MAX_SIDE")  # 参考图长边上限（像素，需 Pillow，0 表示不缩小）
+
+    # 图像请求对冲（长尾延迟）
+    image_hedge_enabled: bool = Field(default=False, alias="IMAGE_HEDGE_ENABLED")
+    image_hedge_percentile: float = Field(default=0.95, alias="IMAGE_HEDGE_PERCENTILE")  # 超过近期延迟该分位数时对冲
+    image_hedge_budget: float = Field(default=0.1, alias="IMAGE_HEDGE_BUDGET")  # 对冲请求数占总请求数的上限
+    image_hedge_window: int = Field(default=100, alias="IMAGE_HEDGE_WINDOW")  # 统计延迟分位数的最近样本数
+
+    # 组图模式（一次请求生成所有场景的图像）
+    image_batch_max_images: int = Field(default=15, alias="IMAGE_BATCH_MAX_IMAGES")  # 单次请求的图像数上限，超出自动拆分
+    graph_variant: str = Field(default="pipelined", alias="GRAPH_VARIANT")  # pipelined（场景流水线）/ scene（逐场景并发）/ batch（组图）
+    # 工作流检查点存储：database（写入 DATABASE_URL，支持任务恢复）/ memory（进程内存）
+    checkpoint_backend: str = Field(default="database", alias="CHECKPOINT_BACKEND")
+    # 检查点写入时机：sync（每个超步落盘后再继续，崩溃不丢已完成节点）/ async（后台写入）/ exit（结束时写入）
+    checkpoint_durability: str = Field(default="sync", alias="CHECKPOINT_DURABILITY")
+    # 内存检查点存储的上限（CHECKPOINT_BACKEND=memory 时生效）
+    checkpoint_max_threads: int = Field(default=1000, alias="CHECKPOINT_MAX_THREADS")  # 最多保留的任务数，超出淘汰最久未使用的
+    checkpoint_ttl: float = Field(default=3600, alias="CHECKPOINT_TTL")  # 任务空闲超过该时间（秒）后淘汰
+    checkpoint_keep_latest: bool = Field(default=True, alias="CHECKPOINT_KEEP_LATEST")  # 每个任务只保留最新检查点
+
+    # 文案生成缓存配置（进程内 LRU + 数据库持久层）
+    llm_cache_enabled: bool = Field(default=True, alias="LLM_CACHE_ENABLED")
+    llm_cache_size: int = Field(default=256, alias="LLM_CACHE_SIZE")
+    llm_cache_ttl: float = Field(default=24 * 3600, alias="LLM_CACHE_TTL")
+    # 流式解析文案场景，边生成边启动图像生成
+    llm_stream_scenes: bool = Field(default=True, alias="LLM_STREAM_SCENES")
 
     # 数据库配置
     database_url: str = Field(
@@ -4,8 +4,23 @@
 提供数据库连接、模型定义和仓库层
 """
 from .session import get_db_session, get_engine, get_session_maker, init_db, close_db
-from .models import Session as DBSession, Message, GenerationTask
-from .repository import SessionRepository, MessageRepository, TaskRepository
+from .models import (
+    Session as DBSession,
+    Message,
+    GenerationTask,
+    CacheEntry,
+    ObjectReference,
+    WorkflowCheckpoint,
+    WorkflowCheckpointWrite,
+)
+from .repository import (
+    SessionRepository,
+    MessageRepository,
+    TaskRepository,
+    CacheRepository,
+    ObjectReferenceRepository,
+    CheckpointRepository,
+)
 
 __all__ = [
     "get_db_session",
@@ -16,7 +31,14 @@ __all__ = [
     "DBSession",
     "Message",
     "GenerationTask",
+    "CacheEntry",
+    "ObjectReference",
+    "WorkflowCheckpoint",
+    "WorkflowCheckpointWrite",
     "SessionRepository",
     "MessageRepository",
     "TaskRepository",
+    "CacheRepository",
+    "ObjectReferenceRepository",
+    "CheckpointRepository",
 ]
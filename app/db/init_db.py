@@ -31,6 +31,8 @@ async def main():
         print("  - sessions: 会话记录")
         print("  - messages: 消息记录")
         print("  - generation_tasks: 视频生成任务记录")
+        print("  - cache_entries: 通用持久化缓存")
+        print("  - object_references: 任务与存储对象的引用关系")
     except Exception as e:
         print(f"❌ 数据库初始化失败: {e}")
         sys.exit(1)
@@ -5,10 +5,14 @@
 - sessions: 会话记录
 - messages: 消息记录
 - generation_tasks: 视频生成任务记录
+- cache_entries: 通用持久化缓存
+- object_references: 任务与存储对象的引用关系
+- workflow_checkpoints: 工作流检查点（任务恢复）
+- workflow_checkpoint_writes: 检查点之后已完成节点的写入
 """
 from datetime import datetime
 from typing import Literal
-from sqlalchemy import String, DateTime, ForeignKey, Text, Float, JSON, Integer
+from sqlalchemy import String, DateTime, ForeignKey, Text, Float, JSON, Integer, LargeBinary
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 
@@ -183,3 +187,143 @@ class GenerationTask(Base):
 
     # 关系
     session: Mapped["Session"] = relationship("Session", back_populates="tasks")
+
+
+class CacheEntry(Base):
+    """
+    缓存条目
+
+    通用的持久化键值缓存，按命名空间区分用途（如图像生成结果）
+    """
+    __tablename__ = "cache_entries"
+
+    namespace: Mapped[str] = mapped_column(String(50), primary_key=True)
+    """命名空间"""
+
+    key: Mapped[str] = mapped_column(String(128), primary_key=True)
+    """缓存键（通常为内容哈希）"""
+
+    value: Mapped[dict] = mapped_column(JSON, nullable=False)
+    """缓存值 (JSON 格式)"""
+
+    hit_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    """命中次数"""
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+    )
+    """创建时间"""
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+    )
+    """更新时间"""
+
+    expires_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True, index=True
+    )
+    """过期时间（为空表示永不过期）"""
+
+
+class ObjectReference(Base):
+    """
+    对象引用
+
+    记录哪些任务引用了对象存储中的哪些对象（内容寻址，同一对象可被多个任务引用）
+    """
+    __tablename__ = "object_references"
+
+    task_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    """任务 ID"""
+
+    object_name: Mapped[str] = mapped_column(String(255), primary_key=True, index=True)
+    """对象名称"""
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+    )
+    """创建时间"""
+
+
+class WorkflowCheckpoint(Base):
+    """
+    工作流检查点
+
+    LangGraph 每个超步结束时保存的完整状态（序列化后存储），用于任务中断后恢复
+    """
+    __tablename__ = "workflow_checkpoints"
+
+    thread_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    """工作流线程 ID（即任务 ID）"""
+
+    checkpoint_ns: Mapped[str] = mapped_column(String(255), primary_key=True, default="")
+    """检查点命名空间（子图使用）"""
+
+    checkpoint_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    """检查点 ID（按时间有序）"""
+
+    parent_checkpoint_id: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    """上一个检查点 ID"""
+
+    checkpoint_type: Mapped[str] = mapped_column(String(32), nullable=False)
+    """检查点序列化类型"""
+
+    checkpoint: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    """序列化后的检查点（含各通道的值）"""
+
+    metadata_type: Mapped[str] = mapped_column(String(32), nullable=False)
+    """元数据序列化类型"""
+
+    metadata_: Mapped[bytes] = mapped_column("metadata", LargeBinary, nullable=False)
+    """序列化后的检查点元数据"""
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+        index=True,
+    )
+    """创建时间"""
+
+
+class WorkflowCheckpointWrite(Base):
+    """
+    检查点写入
+
+    检查点之后已完成节点的输出。恢复时这些节点不会重新执行
+    """
+    __tablename__ = "workflow_checkpoint_writes"
+
+    thread_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    """工作流线程 ID"""
+
+    checkpoint_ns: Mapped[str] = mapped_column(String(255), primary_key=True, default="")
+    """检查点命名空间"""
+
+    checkpoint_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    """所属检查点 ID"""
+
+    task_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    """产生写入的节点任务 ID"""
+
+    idx: Mapped[int] = mapped_column(Integer, primary_key=True)
+    """写入序号"""
+
+    channel: Mapped[str] = mapped_column(String(255), nullable=False)
+    """写入的通道"""
+
+    value_type: Mapped[str] = mapped_column(String(32), nullable=False)
+    """值序列化类型"""
+
+    value: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    """序列化后的值"""
+
+    task_path: Mapped[str] = mapped_column(String(255), nullable=False, default="")
+    """节点任务路径（用于写入排序）"""
@@ -9,7 +9,27 @@ from sqlalchemy import select, update, delete, func, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from .models import Session, Message, GenerationTask
+from .models import (
+    Session,
+    Message,
+    GenerationTask,
+    CacheEntry,
+    ObjectReference,
+    WorkflowCheckpoint,
+    WorkflowCheckpointWrite,
+)
+
+
+def _dialect_insert(session: AsyncSession):
+    """返回支持 ON CONFLICT 的 insert 构造函数（PostgreSQL / SQLite），其他数据库返回 None"""
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    return None
 
 
 class SessionRepository:
@@ -460,3 +480,396 @@ class TaskRepository:
             stmt = stmt.limit(limit)
         result = await session.execute(stmt)
         return list(result.scalars().all())
+
+
+class CacheRepository:
+    """缓存仓库"""
+
+    @staticmethod
+    async def get(
+        session: AsyncSession,
+        namespace: str,
+        key: str,
+    ) -> CacheEntry | None:
+        """
+        获取未过期的缓存条目
+
+        Args:
+            session: 数据库会话
+            namespace: 命名空间
+            key: 缓存键
+
+        Returns:
+            缓存条目，不存在或已过期时返回 None
+        """
+        stmt = select(CacheEntry).where(
+            and_(
+                CacheEntry.namespace == namespace,
+                CacheEntry.key == key,
+                (CacheEntry.expires_at.is_(None)) | (CacheEntry.expires_at > func.now()),
+            )
+        )
+        result = await session.execute(stmt)
+        return result.scalar_one_or_none()
+
+    @staticmethod
+    async def set(
+        session: AsyncSession,
+        namespace: str,
+        key: str,
+        value: dict,
+        expires_at: datetime | None = None,
+    ) -> None:
+        """
+        写入缓存条目（已存在时覆盖）
+
+        使用数据库的 upsert，并发写入同一个键时不会因主键冲突失败。
+
+        Args:
+            session: 数据库会话
+            namespace: 命名空间
+            key: 缓存键
+            value: 缓存值
+            expires_at: 过期时间
+        """
+        insert = _dialect_insert(session)
+        if insert is None:
+            await session.merge(CacheEntry(namespace=namespace, key=key, value=value, expires_at=expires_at))
+            await session.flush()
+            return
+
+        stmt = insert(CacheEntry).values(namespace=namespace, key=key, value=value, expires_at=expires_at)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CacheEntry.namespace, CacheEntry.key],
+            set_={"value": stmt.excluded.value, "expires_at": stmt.excluded.expires_at},
+        )
+        await session.execute(stmt)
+
+    @staticmethod
+    async def record_hit(session: AsyncSession, namespace: str, key: str) -> None:
+        """
+        累加命中次数
+
+        Args:
+            session: 数据库会话
+            namespace: 命名空间
+            key: 缓存键
+        """
+        stmt = (
+            update(CacheEntry)
+            .where(and_(CacheEntry.namespace == namespace, CacheEntry.key == key))
+            .values(hit_count=CacheEntry.hit_count + 1)
+        )
+        await session.execute(stmt)
+
+    @staticmethod
+    async def delete(session: AsyncSession, namespace: str, key: str) -> bool:
+        """
+        删除缓存条目
+
+        Args:
+            session: 数据库会话
+            namespace: 命名空间
+            key: 缓存键
+
+        Returns:
+            是否删除成功
+        """
+        stmt = delete(CacheEntry).where(
+            and_(CacheEntry.namespace == namespace, CacheEntry.key == key)
+        )
+        result = await session.execute(stmt)
+        return result.rowcount > 0
+
+    @staticmethod
+    async def purge_expired(session: AsyncSession, namespace: str | None = None) -> int:
+        """
+        清理已过期的缓存条目
+
+        Args:
+            session: 数据库会话
+            namespace: 命名空间（为空时清理全部）
+
+        Returns:
+            删除的条目数量
+        """
+        stmt = delete(CacheEntry).where(CacheEntry.expires_at <= func.now())
+        if namespace:
+            stmt = stmt.where(CacheEntry.namespace == namespace)
+        result = await session.execute(stmt)
+        return result.rowcount
+
+
+class ObjectReferenceRepository:
+    """对象引用仓库"""
+
+    @staticmethod
+    async def add(session: AsyncSession, task_id: str, object_name: str) -> None:
+        """
+        记录任务对对象的引用（已存在时忽略）
+
+        Args:
+            session: 数据库会话
+            task_id: 任务 ID
+            object_name: 对象名称
+        """
+        insert = _dialect_insert(session)
+        if insert is None:
+            if await session.get(ObjectReference, (task_id, object_name)) is None:
+                session.add(ObjectReference(task_id=task_id, object_name=object_name))
+                await session.flush()
+            return
+
+        # 同一任务并发上传相同内容（如两个场景的配音文本相同）时不会因主键冲突失败
+        stmt = insert(ObjectReference).values(task_id=task_id, object_name=object_name)
+        stmt = stmt.on_conflict_do_nothing(
+            index_elements=[ObjectReference.task_id, ObjectReference.object_name],
+        )
+        await session.execute(stmt)
+
+    @staticmethod
+    async def list_by_task(session: AsyncSession, task_id: str) -> list[str]:
+        """
+        获取任务引用的全部对象
+
+        Args:
+            session: 数据库会话
+            task_id: 任务 ID
+
+        Returns:
+            对象名称列表
+        """
+        stmt = select(ObjectReference.object_name).where(ObjectReference.task_id == task_id)
+        result = await session.execute(stmt)
+        return list(result.scalars().all())
+
+    @staticmethod
+    async def count(session: AsyncSession, object_name: str) -> int:
+        """
+        统计引用某对象的任务数
+
+        Args:
+            session: 数据库会话
+            object_name: 对象名称
+
+        Returns:
+            引用数量
+        """
+        stmt = select(func.count()).select_from(ObjectReference).where(
+            ObjectReference.object_name == object_name
+        )
+        result = await session.execute(stmt)
+        return result.scalar_one()
+
+    @staticmethod
+    async def delete_by_task(session: AsyncSession, task_id: str) -> int:
+        """
+        删除任务的全部引用
+
+        Args:
+            session: 数据库会话
+            task_id: 任务 ID
+
+        Returns:
+            删除的引用数量
+        """
+        stmt = delete(ObjectReference).where(ObjectReference.task_id == task_id)
+        result = await session.execute(stmt)
+        return result.rowcount
+
+
+class CheckpointRepository:
+    """工作流检查点仓库"""
+
+    @staticmethod
+    async def get(
+        session: AsyncSession,
+        thread_id: str,
+        checkpoint_ns: str = "",
+        checkpoint_id: str | None = None,
+    ) -> WorkflowCheckpoint | None:
+        """
+        获取检查点
+
+        Args:
+            session: 数据库会话
+            thread_id: 工作流线程 ID
+            checkpoint_ns: 检查点命名空间
+            checkpoint_id: 检查点 ID（为空时返回最新的检查点）
+
+        Returns:
+            检查点，不存在时返回 None
+        """
+        if checkpoint_id:
+            return await session.get(WorkflowCheckpoint, (thread_id, checkpoint_ns, checkpoint_id))
+
+        stmt = (
+            select(WorkflowCheckpoint)
+            .where(
+                and_(
+                    WorkflowCheckpoint.thread_id == thread_id,
+                    WorkflowCheckpoint.checkpoint_ns == checkpoint_ns,
+                )
+            )
+            .order_by(WorkflowCheckpoint.checkpoint_id.desc())
+            .limit(1)
+        )
+        result = await session.execute(stmt)
+        return result.scalar_one_or_none()
+
+    @staticmethod
+    async def list_checkpoints(
+        session: AsyncSession,
+        thread_id: str | None = None,
+        checkpoint_ns: str | None = None,
+        checkpoint_id: str | None = None,
+        before_id: str | None = None,
+        limit: int | None = None,
+    ) -> list[WorkflowCheckpoint]:
+        """
+        按条件列出检查点（新的在前）
+
+        Args:
+            session: 数据库会话
+            thread_id: 工作流线程 ID（为空时不过滤）
+            checkpoint_ns: 检查点命名空间（为空时不过滤）
+            checkpoint_id: 检查点 ID（为空时不过滤）
+            before_id: 只返回该检查点之前的检查点
+            limit: 最多返回的条数（为空时不限）
+
+        Returns:
+            检查点列表
+        """
+        conditions = []
+        if thread_id is not None:
+            conditions.append(WorkflowCheckpoint.thread_id == thread_id)
+        if checkpoint_ns is not None:
+            conditions.append(WorkflowCheckpoint.checkpoint_ns == checkpoint_ns)
+        if checkpoint_id:
+            conditions.append(WorkflowCheckpoint.checkpoint_id == checkpoint_id)
+        if before_id:
+            conditions.append(WorkflowCheckpoint.checkpoint_id < before_id)
+
+        stmt = select(WorkflowCheckpoint).order_by(
+            WorkflowCheckpoint.thread_id,
+            WorkflowCheckpoint.checkpoint_id.desc(),
+        )
+        if conditions:
+            stmt = stmt.where(and_(*conditions))
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        result = await session.execute(stmt)
+        return list(result.scalars().all())
+
+    @staticmethod
+    async def put(session: AsyncSession, checkpoint: WorkflowCheckpoint) -> None:
+        """
+        保存检查点（已存在时覆盖）
+
+        Args:
+            session: 数据库会话
+            checkpoint: 检查点
+        """
+        await session.merge(checkpoint)
+        await session.flush()
+
+    @staticmethod
+    async def get_writes(
+        session: AsyncSession,
+        thread_id: str,
+        checkpoint_ns: str,
+        checkpoint_id: str,
+    ) -> list[WorkflowCheckpointWrite]:
+        """
+        获取检查点之后的全部写入
+
+        Args:
+            session: 数据库会话
+            thread_id: 工作流线程 ID
+            checkpoint_ns: 检查点命名空间
+            checkpoint_id: 检查点 ID
+
+        Returns:
+            写入列表
+        """
+        stmt = select(WorkflowCheckpointWrite).where(
+            and_(
+                WorkflowCheckpointWrite.thread_id == thread_id,
+                WorkflowCheckpointWrite.checkpoint_ns == checkpoint_ns,
+                WorkflowCheckpointWrite.checkpoint_id == checkpoint_id,
+            )
+        )
+        result = await session.execute(stmt)
+        return list(result.scalars().all())
+
+    @staticmethod
+    async def get_writes_for(
+        session: AsyncSession,
+        checkpoints: list[WorkflowCheckpoint],
+    ) -> dict[tuple[str, str, str], list[WorkflowCheckpointWrite]]:
+        """
+        一次查询获取多个检查点之后的写入
+
+        Args:
+            session: 数据库会话
+            checkpoints: 检查点列表
+
+        Returns:
+            (thread_id, checkpoint_ns, checkpoint_id) -> 写入列表
+        """
+        writes: dict[tuple[str, str, str], list[WorkflowCheckpointWrite]] = {
+            (c.thread_id, c.checkpoint_ns, c.checkpoint_id): [] for c in checkpoints
+        }
+        if not writes:
+            return writes
+
+        stmt = select(WorkflowCheckpointWrite).where(
+            WorkflowCheckpointWrite.checkpoint_id.in_({c.checkpoint_id for c in checkpoints})
+        )
+        result = await session.execute(stmt)
+        for write in result.scalars().all():
+            key = (write.thread_id, write.checkpoint_ns, write.checkpoint_id)
+            if key in writes:
+                writes[key].append(write)
+        return writes
+
+    @staticmethod
+    async def put_write(
+        session: AsyncSession,
+        write: WorkflowCheckpointWrite,
+        overwrite: bool = False,
+    ) -> None:
+        """
+        保存一条写入
+
+        Args:
+            session: 数据库会话
+            write: 写入
+            overwrite: 已存在时是否覆盖（否则保留已有写入）
+        """
+        key = (write.thread_id, write.checkpoint_ns, write.checkpoint_id, write.task_id, write.idx)
+        if overwrite:
+            await session.merge(write)
+        elif await session.get(WorkflowCheckpointWrite, key) is None:
+            session.add(write)
+        await session.flush()
+
+    @staticmethod
+    async def delete_thread(session: AsyncSession, thread_id: str) -> int:
+        """
+        删除工作流线程的全部检查点和写入
+
+        Args:
+            session: 数据库会话
+            thread_id: 工作流线程 ID
+
+        Returns:
+            删除的检查点数量
+        """
+        await session.execute(
+            delete(WorkflowCheckpointWrite).where(WorkflowCheckpointWrite.thread_id == thread_id)
+        )
+        result = await session.execute(
+            delete(WorkflowCheckpoint).where(WorkflowCheckpoint.thread_id == thread_id)
+        )
+        return result.rowcount
@@ -3,7 +3,8 @@ from .llm import LLMService, get_llm_service
 from .image_gen import ImageGenService, get_image_service
 from .video_gen import VideoGenService, get_video_service
 from .tts import TTSService, get_tts_service
-from .storage import StorageService, get_storage_service
+from .storage import StorageService, MinIOStorageService, LocalStorageService, get_storage_service
+from .http import get_http_client, close_http_clients
 
 __all__ = [
     "LLMService",
@@ -15,5 +16,9 @@ __all__ = [
     "TTSService",
     "get_tts_service",
     "StorageService",
+    "MinIOStorageService",
+    "LocalStorageService",
     "get_storage_service",
+    "get_http_client",
+    "close_http_clients",
 ]
@@ -0,0 +1,210 @@
+"""
+本地产物缓存
+
+工作流各阶段上传到存储的文件，下一阶段往往又要下载回来（如分镜视频 → 合成，
+合成视频 → 配音合并）。上传时把文件同时放入本地磁盘缓存，下游按 URL 直接取本地文件，
+不再经过网络。
+
+- 按 URL 寻址，超过容量上限时按 LRU 淘汰
+- 放入/取出优先使用硬链接，不复制文件内容
+- 多个 worker 共享同一目录时，各自维护索引和容量上限（上限按进程计算，
+  目录总占用最多为 worker 数 × 上限）；文件被其他进程淘汰时按未命中处理
+"""
+import errno
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import time
+import urllib.parse
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+
+from ..config import get_settings
+from .metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+
+# 启动时只清理超过该时长未修改的临时文件，其他 worker 正在写入的不受影响
+_STALE_TEMP_SECONDS = 3600
+
+
+def link_or_copy(src: Path, dest: Path) -> None:
+    """硬链接到目标路径，跨设备等无法链接时复制"""
+    try:
+        os.link(src, dest)
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+            raise
+        shutil.copyfile(src, dest)
+
+
+class ArtifactCache:
+    """
+    磁盘 LRU 缓存（线程安全，可在存储线程池中调用）
+
+    Args:
+        root: 缓存目录
+        max_bytes: 本进程的容量上限（字节）
+    """
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, int] = OrderedDict()  # 文件名 -> 大小
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._load()
+
+    @staticmethod
+    def _key(url: str) -> str:
+        suffix = Path(urllib.parse.urlparse(url).path).suffix
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()[:32] + suffix
+
+    def _load(self) -> None:
+        """启动时按修改时间恢复索引（最近使用的在后）"""
+        files = []
+        stale_before = time.time() - _STALE_TEMP_SECONDS
+        for path in self.root.iterdir():
+            try:
+                if not path.is_file():
+                    continue
+                stat = path.stat()
+            except FileNotFoundError:
+                continue  # 其他进程刚好淘汰或完成了写入
+            if path.name.startswith("."):
+                if stat.st_mtime < stale_before:
+                    path.unlink(missing_ok=True)  # 异常退出遗留的临时文件
+                continue
+            files.append((stat.st_mtime, path.name, stat.st_size))
+
+        with self._lock:
+            for _, name, size in sorted(files):
+                self._entries[name] = size
+                self.total_bytes += size
+            self._evict_locked()
+
+    def _evict_locked(self) -> None:
+        while self.total_bytes > self.max_bytes and self._entries:
+            name, size = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            self.evictions += 1
+            (self.root / name).unlink(missing_ok=True)
+
+    def _drop_locked(self, name: str) -> None:
+        size = self._entries.pop(name, None)
+        if size is not None:
+            self.total_bytes -= size
+
+    def new_temp_path(self) -> Path:
+        """返回缓存目录内的临时文件路径（用于边下载边写入）"""
+        return self.root / f".tmp-{uuid.uuid4().hex}"
+
+    def get(self, url: str) -> Path | None:
+        """查询缓存，命中时返回本地路径"""
+        name = self._key(url)
+        path = self.root / name
+        with self._lock:
+            if name in self._entries and path.exists():
+                self._entries.move_to_end(name)
+                self.hits += 1
+            else:
+                self._drop_locked(name)
+                self.misses += 1
+                return None
+        try:
+            os.utime(path)  # 记录最近使用时间，重启后恢复 LRU 顺序
+        except OSError:
+            pass
+        return path
+
+    def copy_to(self, url: str, dest: Path) -> Path | None:
+        """命中时把缓存文件链接到目标路径，未命中返回 None"""
+        path = self.get(url)
+        if path is None:
+            return None
+        dest = Path(dest)
+        dest.unlink(missing_ok=True)
+        try:
+            link_or_copy(path, dest)
+        except FileNotFoundError:
+            # 刚好被淘汰（可能是其他进程）
+            with self._lock:
+                self._drop_locked(path.name)
+                self.hits -= 1
+                self.misses += 1
+            return None
+        return dest
+
+    def put_file(self, url: str, src: Path, move: bool = False) -> Path | None:
+        """
+        放入缓存
+
+        Args:
+            url: 存储 URL
+            src: 本地文件
+            move: True 时重命名（源文件被消费），否则硬链接
+
+        Returns:
+            缓存文件路径，文件超过容量上限时返回 None
+        """
+        src = Path(src)
+        size = src.stat().st_size
+        if size > self.max_bytes:
+            if move:
+                src.unlink(missing_ok=True)
+            return None
+
+        name = self._key(url)
+        path = self.root / name
+        if move:
+            os.replace(src, path)
+        else:
+            temp = self.new_temp_path()
+            link_or_copy(src, temp)
+            os.replace(temp, path)
+
+        with self._lock:
+            self._drop_locked(name)
+            self._entries[name] = size
+            self.total_bytes += size
+            self._evict_locked()
+        return path
+
+    def put_bytes(self, url: str, data: bytes) -> Path | None:
+        """放入字节数据"""
+        temp = self.new_temp_path()
+        temp.write_bytes(data)
+        return self.put_file(url, temp, move=True)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+_artifact_cache: ArtifactCache | None = None
+
+
+def get_artifact_cache() -> ArtifactCache:
+    """获取产物缓存单例"""
+    global _artifact_cache
+    if _artifact_cache is None:
+        settings = get_settings()
+        root = settings.artifact_cache_dir or settings.output_dir / "artifact_cache"
+        _artifact_cache = ArtifactCache(root, settings.artifact_cache_max_bytes)
+        register_metrics("artifact_cache", _artifact_cache.stats)
+    return _artifact_cache
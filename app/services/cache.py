@@ -0,0 +1,204 @@
+"""
+缓存工具
+
+- PersistentCache: 基于数据库 cache_entries 表，按命名空间隔离；
+  数据库不可用时自动降级为未命中，不影响主流程。
+- LRUCache: 进程内 LRU 缓存
+- TieredCache: 两级缓存（LRU + 持久层）
+"""
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# 数据库出错后暂停访问的时间（秒），避免每次请求都等待连接超时
+_BACKOFF_SECONDS = 60.0
+
+
+def make_cache_key(*parts: Any) -> str:
+    """根据任意可 JSON 序列化的组成部分生成稳定的缓存键"""
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class PersistentCache:
+    """数据库持久化缓存（单个命名空间）"""
+
+    def __init__(self, namespace: str, ttl: float | None = None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self._disabled_until = 0.0
+
+    def _available(self) -> bool:
+        return time.monotonic() >= self._disabled_until
+
+    def _on_error(self, action: str, e: Exception) -> None:
+        """只在数据库不可用（连接失败、超时等）时暂停访问，其他错误只记录日志"""
+        from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+
+        # OSError 包括连接被拒绝、DNS 解析失败和超时（驱动建连时直接抛出）
+        unavailable = (
+            isinstance(e, (OperationalError, InterfaceError, OSError))
+            or (isinstance(e, DBAPIError) and e.connection_invalidated)
+        )
+        if not unavailable:
+            logger.warning(f"持久化缓存{action}失败: namespace={self.namespace}, error={e}")
+            return
+
+        logger.warning(f"持久化缓存{action}失败，暂停 {_BACKOFF_SECONDS:.0f}s: namespace={self.namespace}, error={e}")
+        self._disabled_until = time.monotonic() + _BACKOFF_SECONDS
+
+    async def get(self, key: str) -> dict | None:
+        """读取缓存，未命中或数据库不可用时返回 None"""
+        if not self._available():
+            return None
+
+        from ..db.repository import CacheRepository
+        from ..db.session import get_session_maker
+
+        try:
+            async with get_session_maker()() as session:
+                entry = await CacheRepository.get(session, self.namespace, key)
+                if entry is None:
+                    return None
+                await CacheRepository.record_hit(session, self.namespace, key)
+                await session.commit()
+                return dict(entry.value)
+        except Exception as e:
+            self._on_error("读取", e)
+            return None
+
+    async def set(self, key: str, value: dict, ttl: float | None = None) -> None:
+        """写入缓存"""
+        if not self._available():
+            return
+
+        from ..db.repository import CacheRepository
+        from ..db.session import get_session_maker
+
+        ttl = ttl if ttl is not None else self.ttl
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl) if ttl else None
+
+        try:
+            async with get_session_maker()() as session:
+                await CacheRepository.set(session, self.namespace, key, value, expires_at)
+                await session.commit()
+        except Exception as e:
+            self._on_error("写入", e)
+
+    async def delete(self, key: str) -> None:
+        """删除缓存"""
+        if not self._available():
+            return
+
+        from ..db.repository import CacheRepository
+        from ..db.session import get_session_maker
+
+        try:
+            async with get_session_maker()() as session:
+                await CacheRepository.delete(session, self.namespace, key)
+                await session.commit()
+        except Exception as e:
+            self._on_error("删除", e)
+
+
+class LRUCache:
+    """进程内 LRU 缓存（带 TTL 和命中统计）"""
+
+    def __init__(self, maxsize: int = 256, ttl: float | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float | None, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str) -> Any | None:
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        ttl = ttl if ttl is not None else self.ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class TieredCache:
+    """两级缓存：进程内 LRU + 数据库持久层"""
+
+    def __init__(self, namespace: str, maxsize: int = 256, ttl: float | None = None):
+        self.memory = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.persistent = PersistentCache(namespace, ttl=ttl)
+        self.persistent_hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> dict | None:
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+
+        value = await self.persistent.get(key)
+        if value is not None:
+            self.persistent_hits += 1
+            self.memory.set(key, value)
+            return value
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: dict) -> None:
+        self.memory.set(key, value)
+        await self.persistent.set(key, value)
+
+    async def delete(self, key: str) -> None:
+        self.memory.delete(key)
+        await self.persistent.delete(key)
+
+    def stats(self) -> dict:
+        memory_hits = self.memory.hits
+        total = memory_hits + self.persistent_hits + self.misses
+        return {
+            "memory": self.memory.stats(),
+            "memory_hits": memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_rate": (memory_hits + self.persistent_hits) / total if total else 0.0,
+        }
@@ -0,0 +1,19 @@
+"""
+请求上下文
+
+通过 contextvars 在工作流各节点及其调用的服务之间传递当前任务 ID，
+无需逐层传参（asyncio 任务创建时会复制当前上下文）。
+"""
+from contextvars import ContextVar
+
+current_task_id: ContextVar[str | None] = ContextVar("current_task_id", default=None)
+
+
+def get_task_id() -> str | None:
+    """获取当前任务 ID（不在任务上下文中时返回 None）"""
+    return current_task_id.get()
+
+
+def set_task_id(task_id: str | None) -> None:
+    """设置当前任务 ID"""
+    current_task_id.set(task_id)
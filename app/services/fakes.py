@@ -0,0 +1,437 @@
+"""
+本地模拟提供商（离线压测用）
+
+在不消耗真实配额的情况下跑通完整工作流：模拟 Ark 客户端（LLM / 图像 / 视频）
+与 TTS 的调用接口，按配置的延迟分布、失败率和提供商侧限流返回结果，
+产物是用 ffmpeg 在本地生成的小尺寸 PNG / MP4 / MP3。
+
+- 延迟服从对数正态分布（中位数 + sigma），sigma 越大长尾越重
+- 随机数按 (种子, 提供商, 请求内容, 第几次尝试) 派生，结果与并发交错顺序无关
+- 超过每分钟请求数上限时抛出 status_code=429 的异常，与真实限流走同一条处理路径
+- 生成的"云端 URL"指向虚拟主机，由共享 HTTP 客户端挂载的传输层直接读取本地文件
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import random
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+from types import SimpleNamespace
+
+import httpx
+
+from ..config import get_settings
+from .metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+
+# 模拟产物的虚拟主机（不会被解析到真实网络）
+FAKE_MEDIA_HOST = "fake-provider.invalid"
+
+_CONTENT_TYPES = {".png": "image/png", ".mp4": "video/mp4", ".mp3": "audio/mpeg"}
+
+# 模拟文案的场景类型与情绪（循环使用）
+_SCENE_TYPES = ["hook", "theory", "science", "analogy", "twist", "sublime"]
+_EMOTIONS = ["好奇", "共鸣", "惊讶", "温暖", "释然", "感动"]
+
+
+class FakeProviderError(Exception):
+    """模拟提供商错误（status_code 与真实 HTTP 状态码含义一致）"""
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class FakeBehavior:
+    """
+    单个模拟提供商的行为：延迟、失败率、限流
+
+    Args:
+        name: 提供商名称
+        median: 延迟中位数（秒）
+        sigma: 对数正态分布的 sigma
+        failure_rate: 失败概率（0-1）
+        rpm: 每分钟请求数上限（<= 0 表示不限）
+        seed: 随机种子
+    """
+
+    def __init__(
+        self,
+        name: str,
+        median: float,
+        sigma: float,
+        failure_rate: float,
+        rpm: float,
+        seed: int,
+    ):
+        self.name = name
+        self.median = median
+        self.sigma = sigma
+        self.failure_rate = failure_rate
+        self.rpm = rpm
+        self.seed = seed
+        self._window: deque[float] = deque()
+        # 请求内容 -> 已尝试次数（成功后清除，只保留仍在重试的请求）
+        self._attempts: dict[str, int] = {}
+
+        self.calls = 0
+        self.failures = 0
+        self.throttled = 0
+        self.latency_total = 0.0
+
+    def rng(self, key: str) -> random.Random:
+        """按请求内容和尝试次数派生随机数（重试时结果不同，重放时一致）"""
+        attempt = self._attempts.get(key, 0)
+        self._attempts[key] = attempt + 1
+        return random.Random(f"{self.seed}:{self.name}:{key}:{attempt}")
+
+    def succeeded(self, key: str) -> None:
+        """请求成功后清除尝试次数"""
+        self._attempts.pop(key, None)
+
+    def sample_latency(self, rng: random.Random) -> float:
+        if self.median <= 0:
+            return 0.0
+        return rng.lognormvariate(math.log(self.median), self.sigma)
+
+    def check_rate_limit(self) -> None:
+        """超过每分钟请求数上限时抛出 429"""
+        if self.rpm <= 0:
+            return
+        now = time.monotonic()
+        while self._window and now - self._window[0] >= 60.0:
+            self._window.popleft()
+        if len(self._window) >= self.rpm:
+            self.throttled += 1
+            raise FakeProviderError(f"[fake:{self.name}] 请求过于频繁", status_code=429)
+        self._window.append(now)
+
+    async def call(self, key: str) -> random.Random:
+        """
+        模拟一次同步调用：限流检查 → 等待延迟 → 按失败率抛出异常
+
+        Returns:
+            本次调用的随机数生成器（用于生成确定性的返回内容）
+        """
+        self.check_rate_limit()
+        rng = self.rng(key)
+        latency = self.sample_latency(rng)
+        self.calls += 1
+        self.latency_total += latency
+        await asyncio.sleep(latency)
+        if rng.random() < self.failure_rate:
+            self.failures += 1
+            raise FakeProviderError(f"[fake:{self.name}] 模拟服务错误", status_code=500)
+        self.succeeded(key)
+        return rng
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "throttled": self.throttled,
+            "avg_latency": self.latency_total / self.calls if self.calls else 0.0,
+        }
+
+
+# ============================================================================
+# 本地产物
+# ============================================================================
+
+class FakeMediaStore:
+    """用 ffmpeg 生成模拟产物，并提供虚拟主机上的 URL"""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def url(self, name: str) -> str:
+        return f"http://{FAKE_MEDIA_HOST}/{name}"
+
+    def path_from_url(self, url: str) -> Path | None:
+        name = httpx.URL(url).path.lstrip("/")
+        if not name or "/" in name:
+            return None
+        return self.root / name
+
+    @staticmethod
+    async def _ffmpeg(*args: str) -> None:
+        process = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-hide_banner", "-loglevel", "error", *args, "-y",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        _, stderr = await process.communicate()
+        if process.returncode != 0:
+            raise RuntimeError(f"FFmpeg 失败: {stderr.decode()}")
+
+    async def _render(self, name: str, *args: str) -> Path:
+        """生成产物（先写临时文件再改名，同名产物只生成一次）"""
+        path = self.root / name
+        if not path.exists():
+            temp = self.root / f".{uuid.uuid4().hex}{path.suffix}"
+            try:
+                await self._ffmpeg(*args, str(temp))
+                temp.replace(path)
+            finally:
+                temp.unlink(missing_ok=True)
+        return path
+
+    async def image(self, key: str) -> str:
+        """纯色 PNG（颜色由请求内容决定）"""
+        digest = hashlib.md5(key.encode()).hexdigest()
+        name = f"img-{digest[:16]}.png"
+        await self._render(name, "-f", "lavfi", "-i", f"color=c=0x{digest[:6]}:s=108x192", "-frames:v", "1")
+        return self.url(name)
+
+    async def video(self, key: str, duration: float) -> str:
+        """测试图案 MP4"""
+        digest = hashlib.md5(f"{key}:{duration}".encode()).hexdigest()
+        name = f"vid-{digest[:16]}.mp4"
+        await self._render(
+            name,
+            "-f", "lavfi", "-i", f"testsrc2=size=108x192:rate=12:duration={duration:.2f}",
+            "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p",
+            "-movflags", "faststart",
+        )
+        return self.url(name)
+
+    async def audio(self, dest: Path, duration: float, frequency: int) -> Path:
+        """正弦波 MP3"""
+        await self._ffmpeg(
+            "-f", "lavfi", "-i", f"sine=frequency={frequency}:duration={duration:.2f}",
+            "-c:a", "libmp3lame", "-b:a", "32k",
+            str(dest),
+        )
+        return dest
+
+
+class FakeMediaTransport(httpx.AsyncBaseTransport):
+    """虚拟主机的 HTTP 传输层：直接返回本地模拟产物"""
+
+    def __init__(self, media: FakeMediaStore):
+        self._media = media
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        path = self._media.path_from_url(str(request.url))
+        if path is None or not path.is_file():
+            return httpx.Response(404, request=request)
+        data = await asyncio.to_thread(path.read_bytes)
+        return httpx.Response(
+            200,
+            content=data,
+            headers={"Content-Type": _CONTENT_TYPES.get(path.suffix, "application/octet-stream")},
+            request=request,
+        )
+
+
+# ============================================================================
+# 模拟 Ark 客户端（与 AsyncArk 中服务层用到的接口一致）
+# ============================================================================
+
+class _FakeChatCompletions:
+    """chat.completions：返回结构合法的文案 JSON"""
+
+    def __init__(self, behavior: FakeBehavior, scene_count: int):
+        self._behavior = behavior
+        self._scene_count = scene_count
+
+    def _script(self, messages: list[dict], rng: random.Random) -> str:
+        topic = messages[-1]["content"][:20] if messages else ""
+        scenes = []
+        for i in range(self._scene_count):
+            scenes.append({
+                "id": i + 1,
+                "text": f"第{i + 1}句：关于{topic}的思考，{rng.randint(1, 99)}。",
+                "type": _SCENE_TYPES[i % len(_SCENE_TYPES)],
+                "duration": 5.0,
+                "emotion": _EMOTIONS[i % len(_EMOTIONS)],
+                "image_prompt": f"stick figure scene {i + 1}, {rng.choice(['sunrise', 'ocean', 'city', 'forest'])}",
+            })
+        return json.dumps({"title": topic, "scenes": scenes}, ensure_ascii=False)
+
+    async def create(self, messages: list[dict], stream: bool = False, **kwargs):
+        key = json.dumps(messages, ensure_ascii=False, sort_keys=True)
+        if not stream:
+            rng = await self._behavior.call(key)
+            message = SimpleNamespace(content=self._script(messages, rng))
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+        # 流式：首块延迟即完整采样延迟的一部分，其余内容分块逐步到达
+        self._behavior.check_rate_limit()
+        rng = self._behavior.rng(key)
+        latency = self._behavior.sample_latency(rng)
+        self._behavior.calls += 1
+        self._behavior.latency_total += latency
+        failed = rng.random() < self._behavior.failure_rate
+        text = self._script(messages, rng)
+
+        async def chunks():
+            pieces = [text[i:i + 32] for i in range(0, len(text), 32)]
+            await asyncio.sleep(latency * 0.2)
+            for piece in pieces:
+                await asyncio.sleep(latency * 0.8 / len(pieces))
+                delta = SimpleNamespace(content=piece)
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+            if failed:
+                self._behavior.failures += 1
+                raise FakeProviderError(f"[fake:{self._behavior.name}] 流式输出中断", status_code=500)
+            self._behavior.succeeded(key)
+
+        return chunks()
+
+
+class _FakeImages:
+    """images.generate：单图或组图"""
+
+    def __init__(self, behavior: FakeBehavior, media: FakeMediaStore):
+        self._behavior = behavior
+        self._media = media
+
+    async def generate(self, prompt: str, seed: int | None = None, **kwargs):
+        key = f"{prompt}:{seed}:{kwargs.get('size')}"
+        await self._behavior.call(key)
+
+        count = 1
+        options = kwargs.get("sequential_image_generation_options")
+        if kwargs.get("sequential_image_generation") == "auto" and options is not None:
+            count = max(1, getattr(options, "max_images", None) or 1)
+
+        urls = [await self._media.image(f"{key}:{i}") for i in range(count)]
+        return SimpleNamespace(data=[SimpleNamespace(url=url) for url in urls])
+
+
+class _FakeVideoTasks:
+    """content_generation.tasks：创建后按采样耗时在后台"完成\""""
+
+    def __init__(self, behavior: FakeBehavior, media: FakeMediaStore, duration: float):
+        self._behavior = behavior
+        self._media = media
+        self._duration = duration
+        # 未结束的任务 task_id -> (完成时间, 是否失败, 请求内容)，结束后移除
+        self._tasks: dict[str, tuple[float, bool, str]] = {}
+
+    async def create(self, model: str, content: list[dict], **kwargs):
+        key = json.dumps(content, ensure_ascii=False, sort_keys=True)
+        self._behavior.check_rate_limit()
+        rng = self._behavior.rng(key)
+        latency = self._behavior.sample_latency(rng)
+        self._behavior.calls += 1
+        self._behavior.latency_total += latency
+
+        task_id = f"fake-{uuid.uuid4().hex}"
+        failed = rng.random() < self._behavior.failure_rate
+        if not failed:
+            self._behavior.succeeded(key)
+        self._tasks[task_id] = (time.monotonic() + latency, failed, key)
+        return SimpleNamespace(id=task_id)
+
+    async def _status(self, task_id: str) -> SimpleNamespace:
+        entry = self._tasks.get(task_id)
+        if entry is None:
+            return SimpleNamespace(id=task_id, status="failed", error="任务不存在", content=None)
+
+        done_at, failed, key = entry
+        if time.monotonic() < done_at:
+            return SimpleNamespace(id=task_id, status="running", content=None)
+        if failed:
+            self._behavior.failures += 1
+            self._tasks.pop(task_id, None)
+            return SimpleNamespace(id=task_id, status="failed", error="模拟任务失败", content=None)
+
+        url = await self._media.video(key, self._duration)
+        self._tasks.pop(task_id, None)
+        return SimpleNamespace(id=task_id, status="succeeded", content=SimpleNamespace(video_url=url))
+
+    async def list(self, task_ids: list[str], **kwargs):
+        items = [await self._status(task_id) for task_id in task_ids]
+        return SimpleNamespace(items=items)
+
+    async def get(self, task_id: str):
+        return await self._status(task_id)
+
+
+class FakeArkClient:
+    """模拟 AsyncArk（chat.completions / images / content_generation.tasks）"""
+
+    def __init__(self, behaviors: dict[str, FakeBehavior], media: FakeMediaStore, scene_count: int, video_duration: float):
+        self.chat = SimpleNamespace(completions=_FakeChatCompletions(behaviors["llm"], scene_count))
+        self.images = _FakeImages(behaviors["image"], media)
+        self.content_generation = SimpleNamespace(
+            tasks=_FakeVideoTasks(behaviors["video"], media, video_duration),
+        )
+
+
+class FakeTTSClient:
+    """模拟语音合成：音频时长按文本长度估算"""
+
+    # 每秒朗读字数（语速 1.0 时）
+    CHARS_PER_SECOND = 4.0
+
+    def __init__(self, behavior: FakeBehavior, media: FakeMediaStore):
+        self._behavior = behavior
+        self._media = media
+
+    async def synthesize(self, text: str, dest: Path, voice_type: str, speed_ratio: float) -> Path:
+        rng = await self._behavior.call(f"{text}:{voice_type}:{speed_ratio}")
+        duration = max(1.0, len(text) / (self.CHARS_PER_SECOND * max(speed_ratio, 0.1)))
+        return await self._media.audio(dest, duration, frequency=rng.randint(220, 880))
+
+
+# ============================================================================
+# 单例
+# ============================================================================
+
+class _FakeProviders:
+    def __init__(self):
+        settings = get_settings()
+        self.media = FakeMediaStore(settings.output_dir / "fake_provider")
+        self.behaviors = {
+            name: FakeBehavior(
+                name,
+                median=getattr(settings, f"fake_{name}_latency"),
+                sigma=settings.fake_latency_sigma,
+                failure_rate=settings.fake_failure_rate,
+                rpm=settings.fake_rpm,
+                seed=settings.fake_seed,
+            )
+            for name in ("llm", "image", "video", "tts")
+        }
+        self.ark = FakeArkClient(
+            self.behaviors, self.media, settings.fake_scene_count, settings.fake_video_duration,
+        )
+        self.tts = FakeTTSClient(self.behaviors["tts"], self.media)
+        register_metrics("fake_provider", lambda: {
+            name: behavior.stats() for name, behavior in self.behaviors.items()
+        })
+        logger.info(f"使用模拟提供商: seed={settings.fake_seed}, 产物目录={self.media.root}")
+
+
+_fake_providers: _FakeProviders | None = None
+
+
+def _get_fake_providers() -> _FakeProviders:
+    global _fake_providers
+    if _fake_providers is None:
+        _fake_providers = _FakeProviders()
+    return _fake_providers
+
+
+def get_fake_ark_client() -> FakeArkClient:
+    """获取模拟 Ark 客户端（进程内共享，限流按进程统计）"""
+    return _get_fake_providers().ark
+
+
+def get_fake_tts_client() -> FakeTTSClient:
+    """获取模拟 TTS 客户端"""
+    return _get_fake_providers().tts
+
+
+def get_fake_media_transport() -> FakeMediaTransport:
+    """获取虚拟主机的 HTTP 传输层（挂载到共享 HTTP 客户端）"""
+    return FakeMediaTransport(_get_fake_providers().media)
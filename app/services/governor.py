@@ -0,0 +1,280 @@
+"""
+提供商调用限流器
+
+每个外部提供商（llm / image / video / tts）在进程内共享一个限流器：
+
+- 令牌桶：限制每分钟请求数（RPM），允许一定突发
+- 并发上限：限制同时在途的请求数
+- AIMD：请求成功时缓慢增加并发窗口，遇到限流（429）或延迟突增时成倍缩小
+
+等待时间按任务（见 context.current_task_id）累计，用于在 SSE 进度中展示排队耗时。
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from ..config import get_settings
+from .context import get_task_id
+from .metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+
+# 两次乘性减小之间的最短间隔（秒），避免同一批 429 把窗口压到最小
+_DECREASE_COOLDOWN = 2.0
+
+# 延迟基线的 EMA 系数
+_LATENCY_ALPHA = 0.1
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """判断异常是否为提供商限流"""
+    try:
+        from volcenginesdkarkruntime._exceptions import ArkRateLimitError
+        if isinstance(error, ArkRateLimitError):
+            return True
+    except ImportError:
+        pass
+
+    status = getattr(error, "status_code", None)
+    if status is None:
+        response = getattr(error, "response", None)
+        status = getattr(response, "status_code", None)
+    return status == 429
+
+
+class ProviderGovernor:
+    """
+    单个提供商的限流器
+
+    Args:
+        name: 提供商名称
+        rpm: 每分钟请求数上限（<= 0 表示不限）
+        max_inflight: 并发上限
+        burst: 令牌桶容量
+        spike_factor: 延迟超过基线的倍数视为突增
+        decrease_factor: 乘性减小系数
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rpm: float,
+        max_inflight: int,
+        burst: int = 10,
+        spike_factor: float = 3.0,
+        decrease_factor: float = 0.5,
+    ):
+        self.name = name
+        self.rpm = rpm
+        self.max_inflight = max_inflight
+        self.burst = burst
+        self.spike_factor = spike_factor
+        self.decrease_factor = decrease_factor
+
+        # 并发窗口
+        self.limit = float(max_inflight)
+        self.inflight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+        # 令牌桶（GCRA：记录理论到达时间）
+        self._interval = 60.0 / rpm if rpm > 0 else 0.0
+        self._tat = 0.0
+
+        self._latency_baseline: float | None = None
+        self._last_decrease = 0.0
+
+        # 指标
+        self.requests = 0
+        self.throttled = 0
+        self.spikes = 0
+        self.decreases = 0
+        self.wait_seconds = 0.0
+
+    # ------------------------------------------------------------------
+    # 并发窗口
+    # ------------------------------------------------------------------
+
+    def _has_capacity(self) -> bool:
+        return self.inflight < max(1, int(self.limit))
+
+    async def _acquire_slot(self) -> None:
+        if self._has_capacity() and not self._waiters:
+            self.inflight += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await future
+        except BaseException:
+            if future.done() and not future.cancelled():
+                # 已被分配名额但调用方取消，归还
+                self._release_slot()
+            elif future in self._waiters:
+                self._waiters.remove(future)
+            raise
+
+    def _release_slot(self) -> None:
+        self.inflight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self._has_capacity():
+            future = self._waiters.popleft()
+            if not future.done():
+                self.inflight += 1
+                future.set_result(None)
+
+    # ------------------------------------------------------------------
+    # 令牌桶
+    # ------------------------------------------------------------------
+
+    async def _acquire_token(self) -> None:
+        if self._interval <= 0:
+            return
+        now = time.monotonic()
+        tat = max(self._tat, now)
+        allowed_at = tat - self._interval * (self.burst - 1)
+        self._tat = tat + self._interval
+        if allowed_at > now:
+            await asyncio.sleep(allowed_at - now)
+
+    # ------------------------------------------------------------------
+    # AIMD
+    # ------------------------------------------------------------------
+
+    def _decrease(self, reason: str) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < _DECREASE_COOLDOWN:
+            return
+        self._last_decrease = now
+        old = self.limit
+        self.limit = max(1.0, self.limit * self.decrease_factor)
+        self.decreases += 1
+        logger.warning(f"[{self.name}] {reason}，并发窗口 {old:.1f} -> {self.limit:.1f}")
+
+    def _on_success(self, latency: float | None) -> None:
+        if latency is not None:
+            baseline = self._latency_baseline
+            if baseline is not None and latency > baseline * self.spike_factor:
+                self.spikes += 1
+                self._decrease(f"延迟突增 {latency:.1f}s (基线 {baseline:.1f}s)")
+                return
+            self._latency_baseline = (
+                latency if baseline is None
+                else baseline * (1 - _LATENCY_ALPHA) + latency * _LATENCY_ALPHA
+            )
+
+        # 加性增加：大约每个窗口的请求完成后 +1
+        if self.limit < self.max_inflight:
+            self.limit = min(float(self.max_inflight), self.limit + 1.0 / self.limit)
+            self._wake()
+
+    def _on_error(self, error: BaseException) -> None:
+        if is_rate_limited(error):
+            self.throttled += 1
+            self._decrease("触发限流")
+
+    # ------------------------------------------------------------------
+    # 对外接口
+    # ------------------------------------------------------------------
+
+    @asynccontextmanager
+    async def slot(self, track_latency: bool = True) -> AsyncIterator[float]:
+        """
+        获取一次调用名额
+
+        Args:
+            track_latency: 是否用本次调用耗时检测延迟突增（流式/长任务应关闭）
+
+        Yields:
+            本次排队等待的秒数
+        """
+        started = time.monotonic()
+        await self._acquire_slot()
+        try:
+            await self._acquire_token()
+        except BaseException:
+            self._release_slot()
+            raise
+
+        waited = time.monotonic() - started
+        self.requests += 1
+        self.wait_seconds += waited
+        _record_task_wait(self.name, waited)
+
+        call_started = time.monotonic()
+        try:
+            yield waited
+        except BaseException as e:
+            self._on_error(e)
+            raise
+        else:
+            self._on_success(time.monotonic() - call_started if track_latency else None)
+        finally:
+            self._release_slot()
+
+    def stats(self) -> dict:
+        return {
+            "limit": round(self.limit, 2),
+            "max_inflight": self.max_inflight,
+            "rpm": self.rpm,
+            "inflight": self.inflight,
+            "queued": len(self._waiters),
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "latency_spikes": self.spikes,
+            "decreases": self.decreases,
+            "avg_wait": self.wait_seconds / self.requests if self.requests else 0.0,
+            "latency_baseline": self._latency_baseline,
+        }
+
+
+# 按任务累计的排队时间 {task_id: {provider: seconds}}，只记录已登记的任务
+_task_waits: dict[str, dict[str, float]] = {}
+
+
+def _record_task_wait(provider: str, waited: float) -> None:
+    # 任务结束后仍在运行的后台请求（如预取）不会重新创建记录
+    waits = _task_waits.get(get_task_id())
+    if waits is not None:
+        waits[provider] = waits.get(provider, 0.0) + waited
+
+
+def track_task_queue_wait(task_id: str) -> None:
+    """开始统计任务的排队时间（任务开始时调用，结束时调用 clear_task_queue_wait）"""
+    _task_waits.setdefault(task_id, {})
+
+
+def get_task_queue_wait(task_id: str) -> dict[str, float]:
+    """获取任务在各提供商上累计的排队时间（秒）"""
+    return dict(_task_waits.get(task_id, {}))
+
+
+def clear_task_queue_wait(task_id: str) -> None:
+    """清理任务的排队时间记录（任务结束时调用）"""
+    _task_waits.pop(task_id, None)
+
+
+_governors: dict[str, ProviderGovernor] = {}
+
+
+def get_governor(provider: str) -> ProviderGovernor:
+    """获取提供商限流器（llm / image / video / tts）"""
+    governor = _governors.get(provider)
+    if governor is None:
+        settings = get_settings()
+        governor = ProviderGovernor(
+            provider,
+            rpm=getattr(settings, f"{provider}_rpm"),
+            max_inflight=getattr(settings, f"{provider}_max_concurrency"),
+            burst=settings.governor_burst,
+            spike_factor=settings.governor_spike_factor,
+            decrease_factor=settings.governor_decrease_factor,
+        )
+        _governors[provider] = governor
+        register_metrics("governor", lambda: {name: g.stats() for name, g in _governors.items()})
+    return governor
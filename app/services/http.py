@@ -0,0 +1,154 @@
+"""
+共享 HTTP 客户端
+
+进程级连接池：所有服务和工作流节点复用同一组 keep-alive 连接，
+避免每次下载都重新进行 TCP/TLS 握手。
+"""
+import asyncio
+import logging
+from pathlib import Path
+from typing import AsyncIterator, Callable
+
+import httpx
+
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+def _http2_available() -> bool:
+    """检查是否安装了 HTTP/2 支持（h2）"""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """响应体关闭时释放主机连接配额"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]):
+        self._stream = stream
+        self._release = release
+        self._released = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self._release()
+
+
+class _HostLimitedTransport(httpx.AsyncBaseTransport):
+    """限制单个主机的并发连接数"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, max_per_host: int):
+        self._transport = transport
+        self._max_per_host = max_per_host
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._semaphores[host] = asyncio.Semaphore(self._max_per_host)
+
+        await semaphore.acquire()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            semaphore.release()
+            raise
+
+        response.stream = _ReleasingStream(response.stream, semaphore.release)
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class HTTPClientRegistry:
+    """HTTP 客户端注册表（按名称管理，随应用生命周期关闭）"""
+
+    def __init__(self):
+        self._clients: dict[str, tuple[httpx.AsyncClient, asyncio.AbstractEventLoop]] = {}
+
+    def _create_client(self) -> httpx.AsyncClient:
+        settings = get_settings()
+        http2 = settings.http_http2 and _http2_available()
+        limits = httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry,
+        )
+        transport = _HostLimitedTransport(
+            httpx.AsyncHTTPTransport(http2=http2, limits=limits, retries=1),
+            max_per_host=settings.http_max_per_host,
+        )
+        logger.info(
+            f"创建共享 HTTP 客户端: http2={http2}, "
+            f"max_connections={settings.http_max_connections}, "
+            f"max_per_host={settings.http_max_per_host}"
+        )
+        mounts = None
+        if settings.provider == "fake":
+            # 模拟提供商的产物 URL 直接读取本地文件
+            from .fakes import FAKE_MEDIA_HOST, get_fake_media_transport
+            mounts = {f"http://{FAKE_MEDIA_HOST}": get_fake_media_transport()}
+
+        return httpx.AsyncClient(
+            transport=transport,
+            mounts=mounts,
+            timeout=httpx.Timeout(60.0, connect=10.0),
+            follow_redirects=True,
+        )
+
+    def get(self, name: str = "default") -> httpx.AsyncClient:
+        """获取客户端（连接池与事件循环绑定，循环变化时重新创建）"""
+        loop = asyncio.get_running_loop()
+        entry = self._clients.get(name)
+        if entry is None or entry[1] is not loop or entry[0].is_closed:
+            client = self._create_client()
+            self._clients[name] = (client, loop)
+            return client
+        return entry[0]
+
+    async def aclose(self) -> None:
+        """关闭所有客户端"""
+        clients, self._clients = self._clients, {}
+        for name, (client, _) in clients.items():
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"关闭 HTTP 客户端失败: {name}, error={e}")
+
+
+_registry = HTTPClientRegistry()
+
+
+def get_http_client(name: str = "default") -> httpx.AsyncClient:
+    """获取共享 HTTP 客户端"""
+    return _registry.get(name)
+
+
+async def close_http_clients() -> None:
+    """关闭共享 HTTP 客户端（在应用关闭时调用）"""
+    await _registry.aclose()
+
+
+async def download_to_file(url: str, dest: Path, timeout: float = 60.0) -> Path:
+    """流式下载到本地文件"""
+    client = get_http_client()
+    async with client.stream("GET", url, timeout=timeout) as r:
+        r.raise_for_status()
+        with open(dest, "wb") as f:
+            async for chunk in r.aiter_bytes(1024 * 1024):
+                f.write(chunk)
+    return dest
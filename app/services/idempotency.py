@@ -0,0 +1,118 @@
+"""
+幂等记录
+
+按 (任务, 场景, 阶段) 保存外部调用的中间结果（如 Seedance 任务 ID、提供商返回的临时 URL、
+已上传的存储 URL）。节点重试或任务恢复时先读取记录，从上一次尝试停下的位置继续：
+已创建的视频任务继续轮询，已生成的产物继续上传，而不是重新发起付费生成。
+
+- 记录保存在两级缓存（进程内 LRU + 数据库 cache_entries，命名空间 idempotency）中
+- 每条记录带输入指纹，输入变化（如场景图像重新生成）时旧记录自动失效
+"""
+import logging
+from typing import Any
+
+from ..config import get_settings
+from .cache import TieredCache, make_cache_key
+from .context import get_task_id
+from .metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class IdempotencyRecord:
+    """单个 (任务, 场景, 阶段) 的幂等记录"""
+
+    def __init__(self, store: "IdempotencyStore", key: str, fingerprint: str, data: dict):
+        self._store = store
+        self.key = key
+        self._fingerprint = fingerprint
+        self._data = data
+
+    def get(self, field: str, default: Any = None) -> Any:
+        return self._data.get(field, default)
+
+    def mark_resumed(self, step: str) -> None:
+        """记录一次从断点恢复（用于指标）"""
+        self._store.resumed[step] = self._store.resumed.get(step, 0) + 1
+
+    async def update(self, **fields: Any) -> None:
+        """写入字段（每完成一步立即持久化）"""
+        self._data.update(fields)
+        await self._save()
+
+    async def discard(self, *fields: str) -> None:
+        """丢弃已失效的字段（如过期的临时 URL）"""
+        for field in fields:
+            self._data.pop(field, None)
+        await self._save()
+
+    async def _save(self) -> None:
+        try:
+            await self._store.cache.set(self.key, {"fingerprint": self._fingerprint, **self._data})
+        except Exception as e:
+            logger.warning(f"写入幂等记录失败: {self.key}, error={e}")
+
+
+class IdempotencyStore:
+    """幂等记录存储"""
+
+    def __init__(self, ttl: float):
+        self.cache = TieredCache("idempotency", maxsize=1024, ttl=ttl)
+        # 恢复点 -> 从记录恢复的次数
+        self.resumed: dict[str, int] = {}
+
+    @staticmethod
+    def make_key(task_id: str, scene_id: Any, stage: str) -> str:
+        return f"{task_id}:{scene_id}:{stage}"
+
+    async def open(
+        self,
+        task_id: str | None,
+        scene_id: Any,
+        stage: str,
+        *inputs: Any,
+    ) -> IdempotencyRecord | None:
+        """
+        打开记录
+
+        Args:
+            task_id: 工作流任务 ID（为空时不记录，返回 None）
+            scene_id: 场景 ID
+            stage: 阶段（image / video 等）
+            inputs: 本阶段的输入，用于判断记录是否仍然有效
+        """
+        if not task_id:
+            return None
+
+        key = self.make_key(task_id, scene_id, stage)
+        fingerprint = make_cache_key(*inputs)
+        try:
+            data = await self.cache.get(key) or {}
+        except Exception as e:
+            logger.warning(f"读取幂等记录失败: {key}, error={e}")
+            data = {}
+
+        if data.pop("fingerprint", None) != fingerprint:
+            data = {}
+        return IdempotencyRecord(self, key, fingerprint, dict(data))
+
+    def stats(self) -> dict:
+        return {**self.cache.stats(), "resumed": dict(self.resumed)}
+
+
+def task_id_from_config(config: dict | None) -> str | None:
+    """工作流任务 ID：优先取 LangGraph 运行配置中的 thread_id（任务恢复时保持不变）"""
+    configurable = (config or {}).get("configurable") or {}
+    return configurable.get("thread_id") or get_task_id()
+
+
+_store: IdempotencyStore | None = None
+
+
+def get_idempotency_store() -> IdempotencyStore:
+    """获取幂等记录存储单例"""
+    global _store
+    if _store is None:
+        _store = IdempotencyStore(ttl=get_settings().idempotency_ttl)
+        register_metrics("idempotency", _store.stats)
+    return _store
@@ -1,34 +1,121 @@
 """
 图像生成服务 (文生图)
 """
+import asyncio
 import logging
 import hashlib
+import time
+from collections import deque
 from pathlib import Path
-import httpx
-
-from volcenginesdkarkruntime import Ark
 from ..config import get_settings
+from .cache import PersistentCache, make_cache_key
+from .governor import get_governor
+from .idempotency import IdempotencyRecord
+from .providers import create_ark_client
+from .metrics import register_metrics
+from .reference_images import get_reference_cache
 
 logger = logging.getLogger(__name__)
 
+# 预取结果未被消费时保留的时长（秒）
+_PREFETCH_TTL = 600.0
+
+# 对冲请求前至少需要的延迟样本数
+_HEDGE_MIN_SAMPLES = 10
+
 
 class ImageGenService:
     """图像生成服务"""
 
     def __init__(self):
         settings = get_settings()
-        self.client = Ark(
-            base_url="https://ark.cn-beijing.volces.com/api/v3",
-            api_key=settings.ark_api_key,
-        )
+        self.client = create_ark_client()
         self.model = "doubao-seedream-4-5-251128"  # 升级到 Seedream 4.5 以支持角色一致性
+        self._governor = get_governor("image")
 
-    @staticmethod
-    def _image_to_base64(image_path: str) -> str:
-        """将图像文件转换为 base64 编码"""
-        import base64
-        with open(image_path, 'rb') as f:
-            return base64.b64encode(f.read()).decode('utf-8')
+        # 内容寻址的生成结果缓存（命中时不再调用图像生成 API）
+        self._cache = (
+            PersistentCache("image", ttl=settings.image_cache_ttl)
+            if settings.image_cache_enabled else None
+        )
+        self._cloud_url_ttl = settings.image_cloud_url_ttl
+        self._batch_max_images = settings.image_batch_max_images
+        self._references = get_reference_cache()
+
+        # 对冲请求：调用耗时超过近期延迟的指定分位数时，以相同参数再发一次，先成功者胜出
+        self._hedge_enabled = settings.image_hedge_enabled
+        self._hedge_percentile = settings.image_hedge_percentile
+        self._hedge_budget = settings.image_hedge_budget
+        self._latencies: deque[float] = deque(maxlen=settings.image_hedge_window)
+        self.api_requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        register_metrics("image_hedging", lambda: {
+            "enabled": self._hedge_enabled,
+            "requests": self.api_requests,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedge_rate": self.hedges / self.api_requests if self.api_requests else 0.0,
+            "win_rate": self.hedge_wins / self.hedges if self.hedges else 0.0,
+            "hedge_delay": self._hedge_delay(),
+        })
+
+        # 进行中的请求（预取与正式请求共享同一次生成）
+        self._inflight: dict[str, asyncio.Task] = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        register_metrics("image_cache", lambda: {
+            "enabled": self._cache is not None,
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+        })
+
+    def _cache_key(
+        self,
+        prompt: str,
+        seed: int,
+        size: str,
+        ref_image_list: list[str] | None,
+    ) -> str:
+        """缓存键：(模型, 提示词, 种子, 尺寸, 参考图内容哈希)"""
+        ref_hashes = [self._references.digest(p) for p in (ref_image_list or [])]
+        return make_cache_key(self.model, prompt, seed, size, ref_hashes)
+
+    async def _get_cached(self, cache_key: str) -> tuple[str, str] | None:
+        """查询缓存，云端 URL 过期时基于 MinIO 对象重新签名"""
+        entry = await self._cache.get(cache_key)
+        if not entry:
+            self.cache_misses += 1
+            return None
+
+        from .storage import get_storage_service
+        storage = get_storage_service()
+        object_name = entry["object_name"]
+
+        try:
+            exists = await storage.aobject_exists(object_name)
+        except Exception as e:
+            logger.warning(f"检查缓存对象失败: {object_name}, error={e}")
+            exists = False
+        if not exists:
+            logger.info(f"缓存对象已不存在，重新生成: {object_name}")
+            await self._cache.delete(cache_key)
+            self.cache_misses += 1
+            return None
+
+        if entry.get("cloud_expires_at", 0) <= time.time():
+            # 云端 URL 已过期：为 MinIO 中的对象重新生成可供外部拉取的签名 URL
+            entry["cloud_url"] = storage.get_public_presigned_url(
+                object_name, expires=int(self._cloud_url_ttl)
+            )
+            entry["cloud_expires_at"] = time.time() + self._cloud_url_ttl
+            await self._cache.set(cache_key, entry)
+            logger.info(f"缓存云端 URL 已过期，已重新签名: {object_name}")
+
+        await storage.add_reference(object_name)
+        self.cache_hits += 1
+        logger.info(f"图像缓存命中: {entry['minio_url']}")
+        return entry["cloud_url"], entry["minio_url"]
 
     async def generate(
         self,
@@ -36,21 +123,190 @@ class ImageGenService:
         seed: int,
         size: str = "1920x1920",
         ref_image_list: list[str] | None = None,
+        use_cache: bool = True,
+        record: IdempotencyRecord | None = None,
     ) -> tuple[str, str]:
         """
         生成图像并上传到 MinIO
 
+        若相同参数的预取请求正在进行或已完成，直接复用其结果。
+
         Args:
             prompt: 图像生成提示词
             seed: 随机种子（用于风格一致性）
             size: 图像尺寸 (支持: "1080x1920", "2K" 等)
-            ref_image_list: 参考图像路径列表（用于角色一致性）
+            ref_image_list: 参考图像列表，本地路径或存储 URL（用于角色一致性）
+            use_cache: 是否使用生成结果缓存
+            record: 幂等记录（重试时复用上一次尝试已生成 / 已上传的图像）
 
         Returns:
             (cloud_url, minio_url) - 云端临时URL和MinIO公开URL
             - cloud_url: 火山引擎云存储临时URL（24小时有效，用于视频生成）
             - minio_url: 本地MinIO公开URL（用于前端展示）
         """
+        if record is not None and record.get("minio_url") and record.get("cloud_expires_at", 0) > time.time():
+            logger.info(f"复用已上传的图像: {record.get('minio_url')}")
+            record.mark_resumed("image:done")
+            return record.get("cloud_url"), record.get("minio_url")
+
+        request_key = self._cache_key(prompt, seed, size, ref_image_list)
+
+        # 已有相同请求在进行中（如文案阶段的预取），直接等待其结果
+        task = self._inflight.pop(request_key, None)
+        if task is not None and not task.cancelled():
+            logger.info(f"复用进行中的图像请求: {prompt[:30]}...")
+            try:
+                cloud_url, public_url = await task
+            except Exception as e:
+                logger.warning(f"预取的图像请求失败，重新生成: {e}")
+            else:
+                if record is not None:
+                    # 预取结果同样写入幂等记录，任务恢复时不再重新生成
+                    await record.update(
+                        cloud_url=cloud_url,
+                        cloud_expires_at=time.time() + self._cloud_url_ttl,
+                        minio_url=public_url,
+                    )
+                return cloud_url, public_url
+
+        return await self._generate(prompt, seed, size, ref_image_list, use_cache, request_key, record)
+
+    def prefetch(
+        self,
+        prompt: str,
+        seed: int,
+        size: str = "1920x1920",
+        ref_image_list: list[str] | None = None,
+    ) -> str:
+        """
+        提前在后台发起图像生成
+
+        之后以相同参数调用 generate() 会直接复用该请求的结果。
+
+        Returns:
+            请求键（可用于 cancel_prefetch）
+        """
+        request_key = self._cache_key(prompt, seed, size, ref_image_list)
+        if request_key in self._inflight:
+            return request_key
+
+        task = asyncio.create_task(
+            self._generate(prompt, seed, size, ref_image_list, True, request_key)
+        )
+        # 取出结果避免未被消费时报 "exception was never retrieved"
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._inflight[request_key] = task
+
+        # 超时未被消费的预取结果自动丢弃
+        def _expire() -> None:
+            if self._inflight.get(request_key) is task:
+                del self._inflight[request_key]
+
+        asyncio.get_running_loop().call_later(_PREFETCH_TTL, _expire)
+        logger.info(f"预取图像: {prompt[:30]}...")
+        return request_key
+
+    def cancel_prefetch(self, request_keys: list[str]) -> None:
+        """取消尚未被消费的预取"""
+        for request_key in request_keys:
+            task = self._inflight.pop(request_key, None)
+            if task is not None and not task.done():
+                task.cancel()
+
+    async def _call_api(self, api_params: dict, started_event: asyncio.Event | None = None):
+        """单次调用图像生成 API（经过限流器），记录成功调用的耗时"""
+        async with self._governor.slot():
+            if started_event is not None:
+                started_event.set()
+            started = time.monotonic()
+            response = await self.client.images.generate(**api_params)
+        self._latencies.append(time.monotonic() - started)
+        return response
+
+    def _hedge_delay(self) -> float | None:
+        """对冲触发时间：近期延迟的指定分位数（样本不足时返回 None）"""
+        if len(self._latencies) < _HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[int(self._hedge_percentile * (len(ordered) - 1))]
+
+    async def _request(self, api_params: dict):
+        """
+        调用图像生成 API（可选对冲）
+
+        主请求（从拿到限流名额起计时）超过延迟分位数仍未返回、且对冲预算未用完时，
+        以相同参数（含种子）再发一次，先成功的结果胜出，另一个被取消。
+        """
+        self.api_requests += 1
+        delay = self._hedge_delay() if self._hedge_enabled else None
+        if delay is None:
+            return await self._call_api(api_params)
+
+        started = asyncio.Event()
+        primary = asyncio.create_task(self._call_api(api_params, started))
+        # 排队等待限流不计入对冲计时
+        waiter = asyncio.create_task(started.wait())
+        pending = {primary}
+        try:
+            await asyncio.wait({primary, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            waiter.cancel()
+            primary_started = time.monotonic()
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if done or self.hedges + 1 > self._hedge_budget * self.api_requests:
+                return await primary
+
+            self.hedges += 1
+            logger.info(f"图像请求超过 {delay:.1f}s，发出对冲请求")
+            hedge = asyncio.create_task(self._call_api(api_params))
+            pending.add(hedge)
+
+            error: BaseException | None = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedge_wins += 1
+                            # 被取消的慢请求不会记录耗时，按已等待的时间计入样本，避免分位数被对冲结果拉低
+                            self._latencies.append(time.monotonic() - primary_started)
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            waiter.cancel()
+            for task in pending:
+                task.cancel()
+
+    async def _generate(
+        self,
+        prompt: str,
+        seed: int,
+        size: str,
+        ref_image_list: list[str] | None,
+        use_cache: bool,
+        cache_key: str,
+        record: IdempotencyRecord | None = None,
+    ) -> tuple[str, str]:
+        """调用 API 生成图像并上传（带缓存）"""
+        if self._cache is not None and use_cache:
+            cached = await self._get_cached(cache_key)
+            if cached:
+                return cached
+
+        # 生成文件名
+        ref_hash = "".join([hashlib.md5(p.encode()).hexdigest()[:4] for p in (ref_image_list or [])])
+        prompt_hash = hashlib.md5(f"{prompt}_{seed}_{ref_hash}".encode()).hexdigest()[:12]
+        filename = f"{prompt_hash}.png"
+
+        # 上一次尝试已生成图像但上传失败：云端 URL 未过期时直接重新上传
+        if record is not None and record.get("cloud_url") and record.get("cloud_expires_at", 0) > time.time():
+            cloud_url = record.get("cloud_url")
+            logger.info(f"复用已生成的图像，重新上传: {cloud_url}")
+            record.mark_resumed("image:upload")
+            public_url = await self._store(cloud_url, record.get("cloud_expires_at"), filename, cache_key)
+            await record.update(minio_url=public_url)
+            return cloud_url, public_url
+
         # 基础 API 参数（官方标准调用方式）
         api_params = {
             "model": self.model,
@@ -65,7 +321,10 @@ class ImageGenService:
 
         # 添加参考图（用于角色一致性）- 需要通过 extra_body 传递
         if ref_image_list:
-            base64_images = [self._image_to_base64(img) for img in ref_image_list]
+            # 参考图编码结果在进程内复用（同一参考图在多个场景间只读取、编码一次）
+            base64_images = list(await asyncio.gather(*[
+                self._references.encode(ref) for ref in ref_image_list
+            ]))
             api_params["extra_body"] = {
                 "ref_image_list": base64_images,
             }
@@ -73,29 +332,152 @@ class ImageGenService:
 
         # 调用 API
         logger.info(f"调用图像生成 API: {prompt[:50]}...")
-        response = self.client.images.generate(**api_params)
+        response = await self._request(api_params)
 
         cloud_url = response.data[0].url
+        cloud_expires_at = time.time() + self._cloud_url_ttl
         logger.info(f"图像 API 返回 URL: {cloud_url}")
+        if record is not None:
+            await record.update(cloud_url=cloud_url, cloud_expires_at=cloud_expires_at)
 
-        # 下载图片内容
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            r = await client.get(cloud_url)
-            r.raise_for_status()
-            image_data = r.content
+        public_url = await self._store(cloud_url, cloud_expires_at, filename, cache_key)
+        if record is not None:
+            await record.update(minio_url=public_url)
+        return cloud_url, public_url
 
-        # 直接上传到 MinIO（不保存到本地）
+    async def _store(
+        self,
+        cloud_url: str,
+        cloud_expires_at: float,
+        filename: str,
+        cache_key: str,
+    ) -> str:
+        """把云端图像转存到 MinIO 并写入缓存，返回 MinIO URL"""
+        # 边下载边上传到 MinIO（复用共享连接池，不在内存中缓存整张图）
+        from .http import get_http_client
         from .storage import get_storage_service
         storage = get_storage_service()
 
-        # 生成文件名
-        ref_hash = "".join([hashlib.md5(p.encode()).hexdigest()[:4] for p in (ref_image_list or [])])
-        prompt_hash = hashlib.md5(f"{prompt}_{seed}_{ref_hash}".encode()).hexdigest()[:12]
-        filename = f"{prompt_hash}.png"
+        async with get_http_client().stream("GET", cloud_url) as r:
+            r.raise_for_status()
+            public_url = await storage.astream_upload(r.aiter_bytes(), filename, "image/png")
 
-        public_url = storage.upload_bytes(image_data, filename, "image/png")
         logger.info(f"图像已上传到 MinIO: {public_url}")
-        return cloud_url, public_url
+
+        if self._cache is not None:
+            await self._cache.set(cache_key, {
+                "object_name": storage.object_name_from_url(public_url),
+                "minio_url": public_url,
+                "cloud_url": cloud_url,
+                "cloud_expires_at": cloud_expires_at,
+            })
+
+        return public_url
+
+    @staticmethod
+    def _batch_prompt(prompts: list[str]) -> str:
+        """把多个场景提示词合并为一条组图提示词"""
+        lines = [f"生成一组共 {len(prompts)} 张连贯的分镜图片，同一角色的外貌、服装与画风保持一致，按顺序输出："]
+        lines += [f"图{i}：{prompt}" for i, prompt in enumerate(prompts, 1)]
+        return "\n".join(lines)
+
+    async def generate_batch(
+        self,
+        prompts: list[str],
+        seed: int,
+        size: str = "1920x1920",
+        use_cache: bool = True,
+    ) -> list[tuple[str, str] | None]:
+        """
+        组图模式：一次请求生成多个场景的图像
+
+        Seedream 4.x 的组图（sequential_image_generation=auto）在同一次生成中输出
+        一组相关图像，角色与画风天然一致。场景数超过单次上限时自动拆分为多批并发请求。
+
+        Args:
+            prompts: 各场景的图像提示词（按场景顺序）
+            seed: 随机种子
+            size: 图像尺寸
+            use_cache: 是否使用生成结果缓存
+
+        Returns:
+            与 prompts 一一对应的 (cloud_url, minio_url)，
+            提供商少返回或单张失败的位置为 None
+        """
+        max_images = max(1, self._batch_max_images)
+        chunks = [prompts[i:i + max_images] for i in range(0, len(prompts), max_images)]
+        if len(chunks) > 1:
+            logger.info(f"组图场景数 {len(prompts)} 超过单次上限 {max_images}，拆分为 {len(chunks)} 批")
+
+        results = await asyncio.gather(*[
+            self._generate_group(chunk, seed, size, use_cache) for chunk in chunks
+        ])
+        return [item for group in results for item in group]
+
+    async def _generate_group(
+        self,
+        prompts: list[str],
+        seed: int,
+        size: str,
+        use_cache: bool,
+    ) -> list[tuple[str, str] | None]:
+        """生成一批组图（不超过单次上限），整批缓存命中时不调用 API"""
+        cache_keys = [
+            make_cache_key(self.model, "group", prompts, seed, size, index)
+            for index in range(len(prompts))
+        ]
+        if self._cache is not None and use_cache:
+            cached = []
+            for cache_key in cache_keys:
+                entry = await self._get_cached(cache_key)
+                if entry is None:
+                    break
+                cached.append(entry)
+            if len(cached) == len(prompts):
+                return cached
+
+        from volcenginesdkarkruntime.types.images.images import SequentialImageGenerationOptions
+
+        api_params = {
+            "model": self.model,
+            "prompt": self._batch_prompt(prompts),
+            "size": size,
+            "seed": seed,
+            "sequential_image_generation": "auto",  # 组图模式
+            "sequential_image_generation_options": SequentialImageGenerationOptions(
+                max_images=len(prompts),
+            ),
+            "response_format": "url",
+            "stream": False,
+            "watermark": True,
+        }
+
+        logger.info(f"调用组图生成 API: {len(prompts)} 张")
+        self.api_requests += 1
+        # 组图耗时随张数增长，不参与延迟突增检测
+        async with self._governor.slot(track_latency=False):
+            response = await self.client.images.generate(**api_params)
+
+        images = [image for image in (response.data or []) if getattr(image, "url", None)]
+        if len(images) < len(prompts):
+            logger.warning(f"组图仅返回 {len(images)}/{len(prompts)} 张")
+        cloud_expires_at = time.time() + self._cloud_url_ttl
+
+        async def store(index: int) -> tuple[str, str] | None:
+            if index >= len(images):
+                return None
+            cloud_url = images[index].url
+            digest = hashlib.md5(f"{prompts[index]}_{seed}_group{len(prompts)}".encode()).hexdigest()[:12]
+            try:
+                public_url = await self._store(
+                    cloud_url, cloud_expires_at, f"{digest}.png", cache_keys[index]
+                )
+            except Exception as e:
+                logger.error(f"组图第 {index + 1} 张转存失败: {e}")
+                return None
+            return cloud_url, public_url
+
+        return list(await asyncio.gather(*[store(i) for i in range(len(prompts))]))
 
 
 _image_service: ImageGenService | None = None
@@ -1,46 +1,244 @@
 """
 LLM 服务
 """
+import copy
+import json
 import logging
-from volcenginesdkarkruntime import Ark
+import re
+from typing import AsyncIterator
+
 from ..config import get_settings
+from .cache import TieredCache, make_cache_key
+from .governor import get_governor
+from .providers import create_ark_client
+from .metrics import register_metrics
 
 logger = logging.getLogger(__name__)
 
 
+class JSONArrayStreamParser:
+    """
+    增量解析 JSON 中指定键的数组
+
+    随着文本分块到达，逐个返回数组中已完整的对象，
+    无需等待整段 JSON 生成结束。
+    """
+
+    def __init__(self, key: str):
+        self._key_pattern = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+        self._buffer = ""
+        self._pos = 0            # 下一个待扫描字符的位置
+        self._in_array = False
+        self._done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._item_start = -1
+
+    def feed(self, text: str) -> list[dict]:
+        """追加文本，返回新解析出的完整对象"""
+        if self._done:
+            return []
+        self._buffer += text
+
+        if not self._in_array:
+            match = self._key_pattern.search(self._buffer)
+            if not match:
+                return []
+            self._in_array = True
+            self._pos = match.end()
+
+        items = []
+        buffer = self._buffer
+        i = self._pos
+        while i < len(buffer):
+            ch = buffer[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                if self._depth == 0:
+                    self._item_start = i
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0 and self._item_start >= 0:
+                    try:
+                        items.append(json.loads(buffer[self._item_start:i + 1]))
+                    except json.JSONDecodeError as e:
+                        logger.warning(f"流式解析对象失败: {e}")
+                    self._item_start = -1
+            elif ch == "]" and self._depth == 0:
+                self._done = True
+                i += 1
+                break
+            i += 1
+
+        self._pos = i
+        return items
+
+
 class LLMService:
     """LLM 服务"""
 
     def __init__(self):
         settings = get_settings()
-        self.client = Ark(
-            base_url="https://ark.cn-beijing.volces.com/api/v3",
-            api_key=settings.ark_api_key,
-        )
+        # 异步客户端，避免阻塞事件循环
+        self.client = create_ark_client()
+        self.model = "doubao-seed-1-8-251228"
+        self._governor = get_governor("llm")
 
-    async def generate(self, prompt: str, system_prompt: str | None = None) -> str:
-        """生成文本"""
+        # JSON 结果缓存（键：规范化的用户提示词 + 系统提示词 + 模型）
+        self._cache = None
+        if settings.llm_cache_enabled:
+            self._cache = TieredCache("llm", maxsize=settings.llm_cache_size, ttl=settings.llm_cache_ttl)
+            register_metrics("llm_cache", self._cache.stats)
+
+    @staticmethod
+    def _build_messages(prompt: str, system_prompt: str | None) -> list[dict]:
         messages = []
         if system_prompt:
             messages.append({"role": "system", "content": system_prompt})
         messages.append({"role": "user", "content": prompt})
+        return messages
+
+    async def generate(self, prompt: str, system_prompt: str | None = None) -> str:
+        """生成文本"""
+        messages = self._build_messages(prompt, system_prompt)
 
-        response = self.client.chat.completions.create(
-            model="doubao-seed-1-8-251228",
-            messages=messages,
-            temperature=0.7,
-            max_tokens=4000,
-        )
+        async with self._governor.slot():
+            response = await self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=4000,
+            )
 
         return response.choices[0].message.content
 
-    async def generate_json(self, prompt: str, system_prompt: str | None = None) -> dict:
-        """生成 JSON"""
-        text = await self.generate(prompt + "\n\n输出 JSON 格式。", system_prompt)
+    async def stream(self, prompt: str, system_prompt: str | None = None) -> AsyncIterator[str]:
+        """流式生成文本，逐块返回增量内容"""
+        messages = self._build_messages(prompt, system_prompt)
+
+        # 流式输出耗时取决于生成长度，不参与延迟突增检测
+        async with self._governor.slot(track_latency=False):
+            stream = await self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=4000,
+                stream=True,
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+    @staticmethod
+    def _normalize(text: str | None) -> str:
+        """规范化提示词（合并空白）用于缓存键"""
+        return re.sub(r"\s+", " ", text or "").strip()
+
+    async def generate_json(
+        self,
+        prompt: str,
+        system_prompt: str | None = None,
+        use_cache: bool = False,
+        bypass_cache: bool = False,
+    ) -> dict:
+        """
+        生成 JSON
+
+        Args:
+            prompt: 用户提示词
+            system_prompt: 系统提示词
+            use_cache: 是否启用结果缓存
+            bypass_cache: 跳过缓存读取（仍会写入新结果）
+        """
+        cache_key = None
+        if use_cache and self._cache is not None:
+            cache_key = make_cache_key(
+                self.model, self._normalize(system_prompt), self._normalize(prompt)
+            )
+            if not bypass_cache:
+                cached = await self._cache.get(cache_key)
+                if cached is not None:
+                    logger.info(f"LLM 缓存命中: key={cache_key[:12]}")
+                    return copy.deepcopy(cached)
+
+        result = await self._generate_json(prompt, system_prompt)
+
+        if cache_key is not None:
+            await self._cache.set(cache_key, result)
+        return result
+
+    async def stream_json_items(
+        self,
+        prompt: str,
+        key: str,
+        system_prompt: str | None = None,
+        use_cache: bool = False,
+        bypass_cache: bool = False,
+    ) -> AsyncIterator[dict]:
+        """
+        流式生成 JSON，边生成边返回 result[key] 数组中的每个对象
 
-        import json
-        import re
+        与 generate_json 共用缓存：命中时直接返回缓存中的对象，
+        生成完成且完整解析成功后写入结果（输出被截断时不写入）。
+        """
+        cache_key = None
+        if use_cache and self._cache is not None:
+            cache_key = make_cache_key(
+                self.model, self._normalize(system_prompt), self._normalize(prompt)
+            )
+            if not bypass_cache:
+                cached = await self._cache.get(cache_key)
+                if cached is not None:
+                    logger.info(f"LLM 缓存命中: key={cache_key[:12]}")
+                    for item in copy.deepcopy(cached).get(key, []):
+                        yield item
+                    return
+
+        parser = JSONArrayStreamParser(key)
+        parts = []
+        emitted = []
+        async for delta in self.stream(prompt + "\n\n输出 JSON 格式。", system_prompt):
+            parts.append(delta)
+            for item in parser.feed(delta):
+                emitted.append(item)
+                yield item
+
+        text = "".join(parts)
+        try:
+            result = self._parse_json(text)
+        except (ValueError, json.JSONDecodeError):
+            if not emitted:
+                raise
+            # 输出被截断（达到 max_tokens 或连接中断）：已返回的对象照常使用，但不写入缓存
+            logger.warning(f"LLM 流式输出不完整，结果不写入缓存: items={len(emitted)}")
+            return
+
+        # 增量解析未能识别的结构，按完整结果补发
+        if not emitted:
+            for item in result.get(key, []):
+                yield item
+
+        if cache_key is not None:
+            await self._cache.set(cache_key, result)
+
+    async def _generate_json(self, prompt: str, system_prompt: str | None = None) -> dict:
+        """调用 LLM 并解析 JSON"""
+        text = await self.generate(prompt + "\n\n输出 JSON 格式。", system_prompt)
+        return self._parse_json(text)
 
+    @staticmethod
+    def _parse_json(text: str) -> dict:
+        """从模型输出中解析 JSON"""
         try:
             return json.loads(text)
         except json.JSONDecodeError:
@@ -0,0 +1,101 @@
+"""
+运行时指标
+
+各服务在初始化时注册采集函数，由 /api/v1/metrics 统一输出
+"""
+import asyncio
+import logging
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+_collectors: dict[str, Callable[[], dict]] = {}
+
+
+def register_metrics(name: str, collector: Callable[[], dict]) -> None:
+    """注册指标采集函数（同名覆盖）"""
+    _collectors[name] = collector
+
+
+def collect_metrics() -> dict[str, dict]:
+    """采集所有已注册的指标"""
+    snapshot = {}
+    for name, collector in list(_collectors.items()):
+        try:
+            snapshot[name] = collector()
+        except Exception as e:
+            logger.warning(f"采集指标失败: {name}, error={e}")
+            snapshot[name] = {"error": str(e)}
+    return snapshot
+
+
+class EventLoopMonitor:
+    """
+    事件循环阻塞监控
+
+    周期性休眠固定间隔，实际唤醒时间超出间隔的部分即为事件循环被阻塞的时长。
+    """
+
+    def __init__(self, interval: float = 0.1, threshold: float = 0.05):
+        self.interval = interval
+        self.threshold = threshold
+        self.samples = 0
+        self.stalls = 0
+        self.stall_seconds = 0.0
+        self.max_lag = 0.0
+        self.last_lag = 0.0
+        self._task: asyncio.Task | None = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            self.samples += 1
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            if lag >= self.threshold:
+                self.stalls += 1
+                self.stall_seconds += lag
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "samples": self.samples,
+            "stalls": self.stalls,
+            "stall_seconds": round(self.stall_seconds, 3),
+            "max_lag": round(self.max_lag, 4),
+            "last_lag": round(self.last_lag, 4),
+        }
+
+
+_loop_monitor: EventLoopMonitor | None = None
+
+
+def start_loop_monitor(interval: float, threshold: float) -> EventLoopMonitor:
+    """启动事件循环阻塞监控（指标名 event_loop）"""
+    global _loop_monitor
+    if _loop_monitor is None:
+        _loop_monitor = EventLoopMonitor(interval, threshold)
+        register_metrics("event_loop", _loop_monitor.stats)
+    _loop_monitor.start()
+    return _loop_monitor
+
+
+async def stop_loop_monitor() -> None:
+    """停止事件循环阻塞监控"""
+    if _loop_monitor is not None:
+        await _loop_monitor.stop()
@@ -0,0 +1,42 @@
+"""
+提供商选择
+
+服务层（LLM / 图像 / 视频 / TTS）只依赖提供商客户端的调用接口，
+具体实现由配置 PROVIDER 决定：
+
+- volcengine: 火山引擎 AsyncArk 与语音合成服务
+- fake: 本地模拟提供商（见 fakes.py），用于离线压测完整工作流
+
+缓存、限流、存储等逻辑在两种提供商下完全相同。
+"""
+from volcenginesdkarkruntime import AsyncArk
+
+from ..config import get_settings
+
+PROVIDERS = ("volcengine", "fake")
+
+ARK_BASE_URL = "https://ark.cn-beijing.volces.com/api/v3"
+
+
+def get_provider() -> str:
+    """当前提供商名称"""
+    provider = get_settings().provider
+    if provider not in PROVIDERS:
+        raise ValueError(f"未知的提供商: {provider}，可选 {', '.join(PROVIDERS)}")
+    return provider
+
+
+def create_ark_client():
+    """创建 Ark 客户端（模拟提供商下返回进程内共享的模拟客户端）"""
+    if get_provider() == "fake":
+        from .fakes import get_fake_ark_client
+        return get_fake_ark_client()
+    return AsyncArk(base_url=ARK_BASE_URL, api_key=get_settings().ark_api_key)
+
+
+def get_tts_client():
+    """模拟提供商下返回模拟 TTS 客户端，否则返回 None（使用火山引擎语音合成）"""
+    if get_provider() == "fake":
+        from .fakes import get_fake_tts_client
+        return get_fake_tts_client()
+    return None
@@ -0,0 +1,173 @@
+"""
+参考图编码缓存
+
+角色一致性生成时，同一张参考图会随多个场景的请求反复发送。参考图在首次使用时
+读取、（可选）缩小并编码为 base64，之后各场景直接复用内存中的编码结果：
+
+- 支持本地路径和存储 URL（URL 直接读入内存，不经过临时文件）
+- 按编码后大小限制总量，超出时按 LRU 淘汰
+- 安装了 Pillow 时，长边超过上限的参考图会等比缩小（未安装时原样发送）
+"""
+import asyncio
+import base64
+import hashlib
+import io
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from ..config import get_settings
+from .metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+
+
+def is_url(ref: str) -> bool:
+    return ref.startswith(("http://", "https://"))
+
+
+def _downscale(data: bytes, max_side: int) -> bytes:
+    """长边超过 max_side 时等比缩小（需要 Pillow，未安装时原样返回）"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return data
+
+    with Image.open(io.BytesIO(data)) as image:
+        if max(image.size) <= max_side:
+            return data
+        original_size = image.size
+        image_format = image.format or "PNG"
+        image.thumbnail((max_side, max_side))
+        out = io.BytesIO()
+        image.save(out, format=image_format)
+    logger.info(f"参考图已缩小: {original_size} -> {image.size}")
+    return out.getvalue()
+
+
+class ReferenceImageCache:
+    """
+    参考图编码结果的内存 LRU 缓存
+
+    Args:
+        max_bytes: 编码结果总大小上限（字节）
+        max_side: 参考图长边上限（像素，<= 0 表示不缩小）
+    """
+
+    def __init__(self, max_bytes: int, max_side: int = 0):
+        self.max_bytes = max_bytes
+        self.max_side = max_side
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, str] = OrderedDict()
+        self._digests: dict[str, str] = {}
+        # 正在读取/编码的参考图（并发场景共享同一次编码）
+        self._pending: dict[str, asyncio.Future] = {}
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _ref_key(self, ref: str) -> str:
+        """缓存键：URL 本身（存储对象按内容寻址），本地文件按路径 + 修改时间 + 大小"""
+        if is_url(ref):
+            return ref
+        stat = os.stat(ref)
+        return f"{os.path.abspath(ref)}:{stat.st_mtime_ns}:{stat.st_size}"
+
+    def digest(self, ref: str) -> str:
+        """参考图内容标识（用于生成结果缓存键），本地文件的哈希只计算一次"""
+        if is_url(ref):
+            return hashlib.md5(ref.encode("utf-8")).hexdigest()
+
+        key = self._ref_key(ref)
+        digest = self._digests.get(key)
+        if digest is None:
+            with open(ref, "rb") as f:
+                digest = hashlib.md5(f.read()).hexdigest()
+            self._digests[key] = digest
+        return digest
+
+    async def encode(self, ref: str) -> str:
+        """获取参考图的 base64 编码（首次使用时读取并编码）"""
+        key = self._ref_key(ref)
+        with self._lock:
+            encoded = self._entries.get(key)
+            if encoded is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return encoded
+
+        pending = self._pending.get(key)
+        if pending is None:
+            self.misses += 1
+            pending = self._pending[key] = asyncio.ensure_future(self._load(ref, key))
+            pending.add_done_callback(lambda _: self._pending.pop(key, None))
+        return await asyncio.shield(pending)
+
+    async def _load(self, ref: str, key: str) -> str:
+        if is_url(ref):
+            from .storage import get_storage_service
+            data = await get_storage_service().afetch_bytes(ref)
+        else:
+            data = await asyncio.to_thread(self._read_file, ref)
+
+        encoded = await asyncio.to_thread(self._encode, data)
+        self._put(key, encoded)
+        return encoded
+
+    @staticmethod
+    def _read_file(path: str) -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+
+    def _encode(self, data: bytes) -> str:
+        if self.max_side > 0:
+            try:
+                data = _downscale(data, self.max_side)
+            except Exception as e:
+                logger.warning(f"参考图缩小失败，使用原图: {e}")
+        return base64.b64encode(data).decode("utf-8")
+
+    def _put(self, key: str, encoded: str) -> None:
+        size = len(encoded)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= len(old)
+            self._entries[key] = encoded
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self.total_bytes -= len(evicted)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+_reference_cache: ReferenceImageCache | None = None
+
+
+def get_reference_cache() -> ReferenceImageCache:
+    """获取参考图编码缓存单例"""
+    global _reference_cache
+    if _reference_cache is None:
+        settings = get_settings()
+        _reference_cache = ReferenceImageCache(
+            max_bytes=settings.image_ref_cache_max_bytes,
+            max_side=settings.image_ref_max_side,
+        )
+        register_metrics("reference_images", _reference_cache.stats)
+    return _reference_cache
@@ -1,24 +1,460 @@
 """
-MinIO 对象存储服务
+对象存储服务
+
+- StorageService: 存储后端接口（公共的异步封装、指标与引用记录）
+- MinIOStorageService: MinIO 对象存储
+- LocalStorageService: 本地文件系统（单机部署，通过 /outputs 静态服务访问）
+
+由 Settings.storage_backend 选择后端。同步接口直接执行 I/O；异步接口
+（aupload_bytes / aupload_file / astream_upload 等）在专用的有界线程池中执行，不阻塞事件循环。
+
+对象按内容寻址（{prefix}/{blake2b}.{ext}），相同内容只上传一次；
+异步接口会把对象记录到当前任务的引用表中。
 """
+import asyncio
+import errno
+import functools
 import logging
 import hashlib
+import os
+import shutil
+import threading
+import time
 import urllib.parse
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 from pathlib import Path
-from typing import BinaryIO, Optional
+from typing import AsyncIterator, Optional
 
 from minio import Minio
+from minio.commonconfig import CopySource
 from minio.error import S3Error
 
 from ..config import get_settings
+from .artifact_cache import ArtifactCache, get_artifact_cache, link_or_copy
+from .metrics import register_metrics
 
 logger = logging.getLogger(__name__)
 
+# 流式上传的分片大小（S3 multipart 最小 5MiB）
+STREAM_PART_SIZE = 8 * 1024 * 1024
+
+# 计算文件哈希时的读取块大小
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+# 内容哈希长度（字节）
+_DIGEST_SIZE = 16
+
+
+def content_hasher():
+    """内容寻址使用的哈希（BLAKE2b-128）"""
+    return hashlib.blake2b(digest_size=_DIGEST_SIZE)
+
+
+class _AsyncChunkReader:
+    """
+    将异步分块迭代器适配为同步可读流
+
+    在工作线程中被 MinIO 客户端调用，通过事件循环拉取下一个分块，
+    同时计算内容哈希，内存中只保留当前分片的数据。
+    """
+
+    def __init__(self, chunks: AsyncIterator[bytes], loop: asyncio.AbstractEventLoop):
+        self._chunks = chunks.__aiter__()
+        self._loop = loop
+        self._buffer = bytearray()
+        self._eof = False
+        self.hasher = content_hasher()
+        self.size = 0
+
+    async def _next_chunk(self) -> bytes | None:
+        try:
+            return await self._chunks.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            chunk = asyncio.run_coroutine_threadsafe(self._next_chunk(), self._loop).result()
+            if chunk is None:
+                self._eof = True
+                break
+            self.hasher.update(chunk)
+            self.size += len(chunk)
+            self._buffer += chunk
+
+        if size < 0 or size >= len(self._buffer):
+            data = bytes(self._buffer)
+            self._buffer.clear()
+        else:
+            data = bytes(self._buffer[:size])
+            del self._buffer[:size]
+        return data
+
+
+class StorageService(ABC):
+    """
+    存储后端接口
+
+    子类实现同步的对象操作；本类提供线程池上的异步封装、传输指标和任务引用记录。
+    对象名按内容寻址：{prefix}/{blake2b}.{ext}
+    """
+
+    # 公开 URL 前缀（{base_url}/{object_name}），由子类设置
+    base_url: str = ""
+
+    # 本地产物缓存（上传时写入，afetch_to_file 时优先读取），由子类决定是否启用
+    _artifacts: ArtifactCache | None = None
+
+    def __init__(self):
+        settings = get_settings()
+
+        # 异步接口使用的有界线程池
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.storage_max_workers,
+            thread_name_prefix="storage",
+        )
+
+        # 传输指标
+        self.uploads = 0
+        self.dedup_hits = 0
+        self.dedup_bytes = 0
+        self.upload_bytes_total = 0
+        self.upload_seconds = 0.0
+        self.downloads = 0
+        self.download_bytes_total = 0
+        self.download_seconds = 0.0
+        self.inflight = 0
+        register_metrics("storage", self.stats)
+
+    # ------------------------------------------------------------------
+    # 后端实现
+    # ------------------------------------------------------------------
+
+    @abstractmethod
+    def upload_bytes(
+        self,
+        data: bytes,
+        filename: str,
+        content_type: str = "application/octet-stream",
+    ) -> str:
+        """
+        上传字节数据
+
+        Args:
+            data: 字节数据
+            filename: 文件名
+            content_type: MIME 类型
+
+        Returns:
+            公开访问 URL
+        """
+
+    @abstractmethod
+    def upload_file(
+        self,
+        file_path: str | Path,
+        content_type: Optional[str] = None,
+    ) -> str:
+        """
+        上传文件
+
+        Args:
+            file_path: 文件路径
+            content_type: MIME 类型（可选，自动检测）
+
+        Returns:
+            公开访问 URL
+        """
+
+    @abstractmethod
+    async def _astream_upload(
+        self,
+        chunks: AsyncIterator[bytes],
+        filename: str,
+        content_type: str,
+    ) -> str:
+        """流式上传，返回公开访问 URL"""
+
+    @abstractmethod
+    def download_file(self, object_name: str, dest: str | Path) -> Path:
+        """下载对象到本地文件"""
+
+    @abstractmethod
+    def read_bytes(self, object_name: str) -> bytes:
+        """读取对象内容到内存（仅用于小对象，如参考图）"""
+
+    @abstractmethod
+    def delete_file(self, object_name: str) -> bool:
+        """删除文件"""
+
+    @abstractmethod
+    def object_exists(self, object_name: str) -> bool:
+        """检查对象是否存在"""
+
+    @abstractmethod
+    def get_public_presigned_url(self, object_name: str, expires: int = 86400) -> str:
+        """生成可供外部服务（如火山引擎）拉取的 URL"""
+
+    @abstractmethod
+    def get_presigned_url(self, object_name: str, expires: int = 3600) -> str:
+        """获取预签名 URL（用于私有文件）"""
+
+    # ------------------------------------------------------------------
+    # 公共实现
+    # ------------------------------------------------------------------
+
+    def stats(self) -> dict:
+        """传输吞吐指标"""
+        return {
+            "uploads": self.uploads,
+            "dedup_hits": self.dedup_hits,
+            "dedup_bytes": self.dedup_bytes,
+            "upload_bytes": self.upload_bytes_total,
+            "upload_seconds": round(self.upload_seconds, 3),
+            "upload_mbps": (
+                self.upload_bytes_total / self.upload_seconds / 1e6 if self.upload_seconds else 0.0
+            ),
+            "downloads": self.downloads,
+            "download_bytes": self.download_bytes_total,
+            "download_seconds": round(self.download_seconds, 3),
+            "download_mbps": (
+                self.download_bytes_total / self.download_seconds / 1e6 if self.download_seconds else 0.0
+            ),
+            "inflight": self.inflight,
+        }
+
+    def _record_upload(self, size: int, started: float) -> None:
+        self.uploads += 1
+        self.upload_bytes_total += size
+        self.upload_seconds += time.perf_counter() - started
+
+    async def _run(self, fn, *args, **kwargs):
+        """在存储线程池中执行同步调用"""
+        loop = asyncio.get_running_loop()
+        self.inflight += 1
+        try:
+            return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+        finally:
+            self.inflight -= 1
+
+    def close(self) -> None:
+        """关闭线程池"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _get_prefix(content_type: str) -> str:
+        """根据 MIME 类型确定对象前缀"""
+        if "image" in content_type:
+            return "images"
+        if "video" in content_type:
+            return "videos"
+        if "audio" in content_type:
+            return "audio"
+        return "files"
+
+    @staticmethod
+    def _get_object_name(prefix: str, digest: str, ext: str) -> str:
+        """内容寻址的对象名称"""
+        return f"{prefix}/{digest}.{ext}"
+
+    def _url(self, object_name: str) -> str:
+        return f"{self.base_url}/{object_name}"
+
+    def _record_download(self, size: int, started: float) -> None:
+        self.downloads += 1
+        self.download_bytes_total += size
+        self.download_seconds += time.perf_counter() - started
+
+    @staticmethod
+    def _hash_file(file_path: Path) -> str:
+        """分块计算文件内容哈希，不将整个文件读入内存"""
+        hasher = content_hasher()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+                hasher.update(block)
+        return hasher.hexdigest()
+
+    @staticmethod
+    def _guess_content_type(file_path: Path, content_type: Optional[str]) -> str:
+        if content_type is None:
+            import mimetypes
+            content_type = mimetypes.guess_type(file_path.name)[0] or "application/octet-stream"
+        return content_type
+
+    def _record_dedup(self, size: int) -> None:
+        self.dedup_hits += 1
+        self.dedup_bytes += size
+
+    def object_name_from_url(self, url: str) -> str | None:
+        """从公开 URL 解析对象名，非本存储的 URL 返回 None"""
+        prefix = f"{self.base_url}/"
+        if not url.startswith(prefix):
+            return None
+        return urllib.parse.unquote(url[len(prefix):])
+
+    async def aupload_bytes(
+        self,
+        data: bytes,
+        filename: str,
+        content_type: str = "application/octet-stream",
+    ) -> str:
+        """upload_bytes 的异步版本（在存储线程池中执行）"""
+        url = await self._run(self.upload_bytes, data, filename, content_type)
+        if self._artifacts is not None:
+            await self._cache_artifact(self._artifacts.put_bytes, url, data)
+        await self.add_reference(url)
+        return url
+
+    async def aupload_file(
+        self,
+        file_path: str | Path,
+        content_type: Optional[str] = None,
+    ) -> str:
+        """upload_file 的异步版本（在存储线程池中执行）"""
+        url = await self._run(self.upload_file, file_path, content_type)
+        if self._artifacts is not None:
+            await self._cache_artifact(self._artifacts.put_file, url, Path(file_path))
+        await self.add_reference(url)
+        return url
+
+    async def astream_upload(
+        self,
+        chunks: AsyncIterator[bytes],
+        filename: str,
+        content_type: str = "application/octet-stream",
+    ) -> str:
+        """
+        流式上传（不在内存中缓存完整内容）
+
+        Args:
+            chunks: 异步字节分块迭代器（如 httpx 响应的 aiter_bytes()）
+            filename: 文件名
+            content_type: MIME 类型
+
+        Returns:
+            公开访问 URL
+        """
+        if self._artifacts is None:
+            url = await self._astream_upload(chunks, filename, content_type)
+        else:
+            # 上传的同时写入本地产物缓存
+            temp = self._artifacts.new_temp_path()
+            try:
+                with open(temp, "wb") as f:
+                    async def tee():
+                        async for chunk in chunks:
+                            await asyncio.to_thread(f.write, chunk)  # 不在事件循环上做磁盘写入
+                            yield chunk
+
+                    url = await self._astream_upload(tee(), filename, content_type)
+                await self._cache_artifact(self._artifacts.put_file, url, temp, True)
+            finally:
+                temp.unlink(missing_ok=True)
+
+        await self.add_reference(url)
+        return url
+
+    async def _cache_artifact(self, put, url: str, *args) -> None:
+        """写入本地产物缓存（失败不影响上传结果）"""
+        try:
+            await self._run(put, url, *args)
+        except Exception as e:
+            logger.warning(f"写入产物缓存失败: {url}, error={e}")
+
+    async def add_reference(self, url_or_name: str, task_id: str | None = None) -> None:
+        """
+        记录任务对对象的引用
+
+        Args:
+            url_or_name: 公开 URL 或对象名称
+            task_id: 任务 ID（默认取当前任务上下文，不在任务中时不记录）
+        """
+        from .context import get_task_id
+        task_id = task_id or get_task_id()
+        if not task_id:
+            return
+
+        object_name = self.object_name_from_url(url_or_name) or url_or_name
+        from ..db.repository import ObjectReferenceRepository
+        from ..db.session import get_session_maker
+
+        try:
+            async with get_session_maker()() as session:
+                await ObjectReferenceRepository.add(session, task_id, object_name)
+                await session.commit()
+        except Exception as e:
+            logger.warning(f"记录对象引用失败: task_id={task_id}, object={object_name}, error={e}")
+
+    async def aobject_exists(self, object_name: str) -> bool:
+        """object_exists 的异步版本"""
+        return await self._run(self.object_exists, object_name)
+
+    async def adownload_file(self, object_name: str, dest: str | Path) -> Path:
+        """download_file 的异步版本"""
+        return await self._run(self.download_file, object_name, dest)
+
+    async def afetch_bytes(self, url: str) -> bytes:
+        """
+        把 URL 指向的内容读到内存（小对象，如参考图）
+
+        依次尝试本地产物缓存、本存储中的对象、HTTP 下载，不经过临时文件。
+        """
+        if self._artifacts is not None:
+            path = await self._run(self._artifacts.get, url)
+            if path is not None:
+                try:
+                    return await self._run(path.read_bytes)
+                except FileNotFoundError:
+                    pass  # 刚好被淘汰
 
-class StorageService:
+        object_name = self.object_name_from_url(url)
+        if object_name:
+            try:
+                return await self._run(self.read_bytes, object_name)
+            except Exception as e:
+                logger.warning(f"读取存储对象失败，改为 HTTP 下载: {object_name}, error={e}")
+
+        from .http import get_http_client
+        started = time.perf_counter()
+        response = await get_http_client().get(url)
+        response.raise_for_status()
+        self._record_download(len(response.content), started)
+        return response.content
+
+    async def adelete_file(self, object_name: str) -> bool:
+        """delete_file 的异步版本"""
+        return await self._run(self.delete_file, object_name)
+
+    async def afetch_to_file(self, url: str, dest: str | Path) -> Path:
+        """
+        把 URL 指向的内容取到本地文件
+
+        优先使用本地产物缓存；未命中时通过 HTTP 下载并放入缓存。
+        本地存储后端会对自己的对象直接建立硬链接。
+        """
+        from .http import download_to_file
+
+        dest = Path(dest)
+        if self._artifacts is not None:
+            if await self._run(self._artifacts.copy_to, url, dest) is not None:
+                logger.info(f"产物缓存命中: {url}")
+                return dest
+
+        await download_to_file(url, dest)
+
+        if self._artifacts is not None:
+            await self._cache_artifact(self._artifacts.put_file, url, dest)
+        return dest
+
+
+class MinIOStorageService(StorageService):
     """MinIO 对象存储服务"""
 
     def __init__(self):
+        super().__init__()
         settings = get_settings()
         self.endpoint = settings.minio_endpoint
         self.access_key = settings.minio_access_key
@@ -26,8 +462,15 @@ class StorageService:
         self.bucket = settings.minio_bucket
         self.use_ssl = settings.minio_use_ssl
         self.public_url = settings.minio_public_url
+        self.region = settings.minio_region
+        self.part_size = settings.storage_part_size
+        self.parallel_uploads = settings.storage_parallel_uploads
+        self.base_url = f"{self.public_url}/{self.bucket}"
+        self._public_client: Minio | None = None
+        if settings.artifact_cache_enabled:
+            self._artifacts = get_artifact_cache()
 
-        # 初始化 MinIO 客户端
+        # 初始化 MinIO 客户端（不访问网络）
         self.client = Minio(
             self.endpoint,
             access_key=self.access_key,
@@ -35,11 +478,21 @@ class StorageService:
             secure=self.use_ssl,
         )
 
-        # 确保 bucket 存在
-        self._ensure_bucket_exists()
+        # bucket 在首次使用时检查（在线程池中执行，避免阻塞事件循环）
+        self._bucket_ready = False
+        self._bucket_lock = threading.Lock()
 
     def _ensure_bucket_exists(self):
-        """确保 bucket 存在"""
+        """确保 bucket 存在（仅首次调用时访问 MinIO）"""
+        if self._bucket_ready:
+            return
+        with self._bucket_lock:
+            if self._bucket_ready:
+                return
+            self._create_bucket_if_missing()
+            self._bucket_ready = True
+
+    def _create_bucket_if_missing(self):
         try:
             if not self.client.bucket_exists(self.bucket):
                 self.client.make_bucket(self.bucket)
@@ -64,17 +517,6 @@ class StorageService:
             logger.error(f"MinIO bucket 初始化失败: {e}")
             raise
 
-    def _get_object_name(self, prefix: str, content: bytes | BinaryIO, ext: str = "") -> str:
-        """生成对象名称（带缓存友好命名）"""
-        if isinstance(content, bytes):
-            content_hash = hashlib.md5(content).hexdigest()[:12]
-        else:
-            # 对于文件对象，使用位置信息作为 hash
-            content_hash = hashlib.md5(str(content).encode()).hexdigest()[:12]
-
-        timestamp = hashlib.md5(str(hash(content)).encode()).hexdigest()[:8]
-        return f"{prefix}/{content_hash}-{timestamp}.{ext}"
-
     def upload_bytes(
         self,
         data: bytes,
@@ -93,21 +535,25 @@ class StorageService:
             公开访问 URL
         """
         try:
+            self._ensure_bucket_exists()
+            started = time.perf_counter()
+
             # 确定前缀和扩展名
             ext = Path(filename).suffix or ".bin"
-            if "image" in content_type:
-                prefix = "images"
-            elif "video" in content_type:
-                prefix = "videos"
-            elif "audio" in content_type:
-                prefix = "audio"
-            else:
-                prefix = "files"
+            prefix = self._get_prefix(content_type)
+
+            # 生成对象名（内容寻址）
+            digest = hashlib.blake2b(data, digest_size=_DIGEST_SIZE).hexdigest()
+            object_name = self._get_object_name(prefix, digest, ext.lstrip("."))
+            url = self._url(object_name)
 
-            # 生成对象名
-            object_name = self._get_object_name(prefix, data, ext.lstrip("."))
+            # 相同内容已存在时跳过上传
+            if self.object_exists(object_name):
+                self._record_dedup(len(data))
+                logger.info(f"对象已存在，跳过上传: {filename} -> {url}")
+                return url
 
-            # 上传
+            # 上传（大于分片大小时按分片并行上传）
             from io import BytesIO
             self.client.put_object(
                 self.bucket,
@@ -115,10 +561,11 @@ class StorageService:
                 BytesIO(data),
                 length=len(data),
                 content_type=content_type,
+                part_size=self.part_size,
+                num_parallel_uploads=self.parallel_uploads,
             )
+            self._record_upload(len(data), started)
 
-            # 返回公开 URL
-            url = f"{self.public_url}/{self.bucket}/{object_name}"
             logger.info(f"上传成功: {filename} -> {url}")
             return url
 
@@ -145,15 +592,114 @@ class StorageService:
         if not file_path.exists():
             raise FileNotFoundError(f"文件不存在: {file_path}")
 
-        # 读取文件
-        data = file_path.read_bytes()
+        content_type = self._guess_content_type(file_path, content_type)
 
-        # 自动检测 content_type
-        if content_type is None:
-            import mimetypes
-            content_type = mimetypes.guess_type(file_path.name)[0] or "application/octet-stream"
+        self._ensure_bucket_exists()
+        started = time.perf_counter()
+
+        ext = (file_path.suffix or ".bin").lstrip(".")
+        prefix = self._get_prefix(content_type)
+        object_name = self._get_object_name(prefix, self._hash_file(file_path), ext)
+        url = self._url(object_name)
+        size = file_path.stat().st_size
 
-        return self.upload_bytes(data, file_path.name, content_type)
+        try:
+            # 相同内容已存在时跳过上传
+            if self.object_exists(object_name):
+                self._record_dedup(size)
+                logger.info(f"对象已存在，跳过上传: {file_path.name} -> {url}")
+                return url
+
+            # 大文件按分片并行上传
+            self.client.fput_object(
+                self.bucket,
+                object_name,
+                str(file_path),
+                content_type=content_type,
+                part_size=self.part_size,
+                num_parallel_uploads=self.parallel_uploads,
+            )
+        except S3Error as e:
+            logger.error(f"上传失败: {file_path.name}, error={e}")
+            raise
+
+        self._record_upload(size, started)
+        logger.info(f"上传成功: {file_path.name} -> {url}")
+        return url
+
+    async def _astream_upload(
+        self,
+        chunks: AsyncIterator[bytes],
+        filename: str,
+        content_type: str,
+    ) -> str:
+        """
+        multipart 流式上传
+
+        先以临时对象名分片上传，同时计算内容哈希，
+        完成后在服务端复制为内容寻址的对象名（已存在时跳过）并删除临时对象。
+        """
+        ext = (Path(filename).suffix or ".bin").lstrip(".")
+        prefix = self._get_prefix(content_type)
+        temp_name = f"{prefix}/.incoming/{uuid.uuid4().hex}.{ext}"
+
+        await self._run(self._ensure_bucket_exists)
+        started = time.perf_counter()
+        reader = _AsyncChunkReader(chunks, asyncio.get_running_loop())
+        try:
+            await self._run(
+                self.client.put_object,
+                self.bucket,
+                temp_name,
+                reader,
+                length=-1,
+                part_size=STREAM_PART_SIZE,
+                content_type=content_type,
+            )
+
+            object_name = self._get_object_name(prefix, reader.hasher.hexdigest(), ext)
+            if await self._run(self.object_exists, object_name):
+                self._record_dedup(reader.size)
+            else:
+                await self._run(
+                    self.client.copy_object,
+                    self.bucket,
+                    object_name,
+                    CopySource(self.bucket, temp_name),
+                )
+        except S3Error as e:
+            logger.error(f"流式上传失败: {filename}, error={e}")
+            raise
+        finally:
+            try:
+                await self._run(self.client.remove_object, self.bucket, temp_name)
+            except S3Error:
+                pass
+
+        self._record_upload(reader.size, started)
+        url = self._url(object_name)
+        logger.info(f"流式上传成功: {filename} ({reader.size} bytes) -> {url}")
+        return url
+
+    def download_file(self, object_name: str, dest: str | Path) -> Path:
+        """下载对象到本地文件"""
+        started = time.perf_counter()
+        self.client.fget_object(self.bucket, object_name, str(dest))
+        dest = Path(dest)
+        self._record_download(dest.stat().st_size, started)
+        return dest
+
+    def read_bytes(self, object_name: str) -> bytes:
+        """读取对象内容到内存"""
+        started = time.perf_counter()
+        response = self.client.get_object(self.bucket, object_name)
+        try:
+            data = response.read()
+        finally:
+            response.close()
+            response.release_conn()
+        self._record_download(len(data), started)
+        return data
 
     def delete_file(self, object_name: str) -> bool:
         """删除文件"""
@@ -165,6 +711,37 @@ class StorageService:
             logger.error(f"删除失败: {object_name}, error={e}")
             return False
 
+    def object_exists(self, object_name: str) -> bool:
+        """检查对象是否存在"""
+        try:
+            self.client.stat_object(self.bucket, object_name)
+            return True
+        except S3Error as e:
+            if e.code in ("NoSuchKey", "NoSuchObject", "NotFound"):
+                return False
+            raise
+
+    def get_public_presigned_url(self, object_name: str, expires: int = 86400) -> str:
+        """
+        基于公开地址生成预签名 URL（供外部服务如火山引擎拉取）
+
+        预签名在本地离线完成，不访问 MinIO。
+        """
+        if self._public_client is None:
+            parsed = urllib.parse.urlparse(self.public_url)
+            self._public_client = Minio(
+                parsed.netloc,
+                access_key=self.access_key,
+                secret_key=self.secret_key,
+                secure=parsed.scheme == "https",
+                region=self.region,
+            )
+        return self._public_client.presigned_get_object(
+            self.bucket,
+            object_name,
+            expires=timedelta(seconds=expires),
+        )
+
     def get_presigned_url(self, object_name: str, expires: int = 3600) -> str:
         """获取预签名 URL（用于私有文件）"""
         try:
@@ -178,6 +755,197 @@ class StorageService:
             raise
 
 
+class LocalStorageService(StorageService):
+    """
+    本地文件系统存储（单机部署）
+
+    对象保存在 {output_dir}/storage 下，通过应用的 /outputs 静态文件服务访问。
+    上传时优先硬链接或重命名，不复制文件内容。
+    """
+
+    def __init__(self):
+        super().__init__()
+        settings = get_settings()
+        # 对象本身就在本地磁盘，无需产物缓存
+        self.root = (settings.output_dir / "storage").resolve()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.base_url = f"{settings.local_storage_public_url.rstrip('/')}/outputs/storage"
+
+    def _path(self, object_name: str) -> Path:
+        """对象名对应的本地路径（禁止越出存储根目录）"""
+        path = (self.root / object_name).resolve()
+        if not path.is_relative_to(self.root):
+            raise ValueError(f"非法对象名: {object_name}")
+        return path
+
+    def _incoming_path(self, ext: str) -> Path:
+        incoming = self.root / ".incoming"
+        incoming.mkdir(parents=True, exist_ok=True)
+        return incoming / f"{uuid.uuid4().hex}.{ext}"
+
+    def _commit(self, src: Path, object_name: str, move: bool) -> bool:
+        """
+        把文件放到对象路径
+
+        Args:
+            src: 源文件
+            object_name: 对象名称
+            move: True 时重命名（源文件被消费），否则硬链接
+
+        Returns:
+            是否新建了对象（False 表示相同内容已存在）
+        """
+        dest = self._path(object_name)
+        if dest.exists():
+            if move:
+                src.unlink(missing_ok=True)
+            return False
+
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        if move:
+            try:
+                os.replace(src, dest)
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+                shutil.move(src, dest)
+            return True
+
+        # 先链接到临时路径再原子替换，避免读取到不完整的文件
+        temp = self._incoming_path(dest.suffix.lstrip(".") or "bin")
+        link_or_copy(src, temp)
+        os.replace(temp, dest)
+        return True
+
+    def upload_bytes(
+        self,
+        data: bytes,
+        filename: str,
+        content_type: str = "application/octet-stream",
+    ) -> str:
+        started = time.perf_counter()
+        ext = (Path(filename).suffix or ".bin").lstrip(".")
+        digest = hashlib.blake2b(data, digest_size=_DIGEST_SIZE).hexdigest()
+        object_name = self._get_object_name(self._get_prefix(content_type), digest, ext)
+        url = self._url(object_name)
+
+        if self._path(object_name).exists():
+            self._record_dedup(len(data))
+            return url
+
+        temp = self._incoming_path(ext)
+        temp.write_bytes(data)
+        if self._commit(temp, object_name, move=True):
+            self._record_upload(len(data), started)
+        else:
+            self._record_dedup(len(data))
+        logger.info(f"保存成功: {filename} -> {url}")
+        return url
+
+    def upload_file(
+        self,
+        file_path: str | Path,
+        content_type: Optional[str] = None,
+    ) -> str:
+        file_path = Path(file_path)
+        if not file_path.exists():
+            raise FileNotFoundError(f"文件不存在: {file_path}")
+
+        content_type = self._guess_content_type(file_path, content_type)
+        started = time.perf_counter()
+
+        ext = (file_path.suffix or ".bin").lstrip(".")
+        object_name = self._get_object_name(self._get_prefix(content_type), self._hash_file(file_path), ext)
+        url = self._url(object_name)
+        size = file_path.stat().st_size
+
+        if self._commit(file_path, object_name, move=False):
+            self._record_upload(size, started)
+            logger.info(f"保存成功: {file_path.name} -> {url}")
+        else:
+            self._record_dedup(size)
+            logger.info(f"对象已存在，跳过保存: {file_path.name} -> {url}")
+        return url
+
+    async def _astream_upload(
+        self,
+        chunks: AsyncIterator[bytes],
+        filename: str,
+        content_type: str,
+    ) -> str:
+        """边接收边写入临时文件并计算哈希，完成后重命名为对象路径"""
+        ext = (Path(filename).suffix or ".bin").lstrip(".")
+        temp = self._incoming_path(ext)
+        hasher = content_hasher()
+        size = 0
+        started = time.perf_counter()
+
+        try:
+            f = await self._run(open, temp, "wb")
+            try:
+                async for chunk in chunks:
+                    hasher.update(chunk)
+                    size += len(chunk)
+                    await self._run(f.write, chunk)
+            finally:
+                await self._run(f.close)
+
+            object_name = self._get_object_name(self._get_prefix(content_type), hasher.hexdigest(), ext)
+            created = await self._run(self._commit, temp, object_name, True)
+        finally:
+            temp.unlink(missing_ok=True)
+
+        if created:
+            self._record_upload(size, started)
+        else:
+            self._record_dedup(size)
+        url = self._url(object_name)
+        logger.info(f"流式保存成功: {filename} ({size} bytes) -> {url}")
+        return url
+
+    def download_file(self, object_name: str, dest: str | Path) -> Path:
+        """硬链接对象到目标路径（无法链接时复制）"""
+        started = time.perf_counter()
+        src = self._path(object_name)
+        dest = Path(dest)
+        dest.unlink(missing_ok=True)
+        link_or_copy(src, dest)
+        self._record_download(dest.stat().st_size, started)
+        return dest
+
+    def read_bytes(self, object_name: str) -> bytes:
+        started = time.perf_counter()
+        data = self._path(object_name).read_bytes()
+        self._record_download(len(data), started)
+        return data
+
+    def delete_file(self, object_name: str) -> bool:
+        try:
+            self._path(object_name).unlink()
+            logger.info(f"删除成功: {object_name}")
+            return True
+        except OSError as e:
+            logger.error(f"删除失败: {object_name}, error={e}")
+            return False
+
+    def object_exists(self, object_name: str) -> bool:
+        return self._path(object_name).is_file()
+
+    def get_public_presigned_url(self, object_name: str, expires: int = 86400) -> str:
+        # 本地文件通过静态服务公开访问，无需签名
+        return self._url(object_name)
+
+    def get_presigned_url(self, object_name: str, expires: int = 3600) -> str:
+        return self._url(object_name)
+
+    async def afetch_to_file(self, url: str, dest: str | Path) -> Path:
+        """本存储的对象直接硬链接，其他 URL 通过 HTTP 下载"""
+        object_name = self.object_name_from_url(url)
+        if object_name and await self.aobject_exists(object_name):
+            return await self.adownload_file(object_name, dest)
+        return await super().afetch_to_file(url, dest)
+
+
 _storage_service: StorageService | None = None
 
 
@@ -185,5 +953,19 @@ def get_storage_service() -> StorageService:
     """获取存储服务单例"""
     global _storage_service
     if _storage_service is None:
-        _storage_service = StorageService()
+        backend = get_settings().storage_backend
+        if backend == "local":
+            _storage_service = LocalStorageService()
+        elif backend == "minio":
+            _storage_service = MinIOStorageService()
+        else:
+            raise ValueError(f"未知的存储后端: {backend}")
     return _storage_service
+
+
+def shutdown_storage() -> None:
+    """关闭存储服务线程池（应用关闭时调用）"""
+    global _storage_service
+    if _storage_service is not None:
+        _storage_service.close()
+        _storage_service = None
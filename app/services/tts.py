@@ -1,22 +1,71 @@
 """
 TTS 服务 - 火山引擎豆包 TTS 2.0 语音合成
-使用 HTTP 协议
+默认使用 WebSocket 二进制协议流式接收音频，不可用时回退到 HTTP 协议
 """
 import base64
+import gzip
 import hashlib
 import hmac
 import json
 import logging
-import time
+import tempfile
+import unicodedata
 import uuid
 import httpx
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, Optional
 
 from ..config import get_settings
+from .cache import TieredCache, make_cache_key
+from .governor import get_governor, is_rate_limited
+from .providers import get_tts_client
+from .metrics import register_metrics
 
 logger = logging.getLogger(__name__)
 
+# WebSocket 二进制协议
+# 请求头：版本 1 / 头长 4 字节；完整客户端请求；JSON 序列化 + gzip 压缩
+_WS_REQUEST_HEADER = bytes([0x11, 0x10, 0x11, 0x00])
+_WS_MSG_AUDIO = 0xB  # 仅音频响应
+_WS_MSG_ERROR = 0xF  # 错误响应
+
+
+def build_ws_request(payload: dict) -> bytes:
+    """构建 WebSocket 二进制请求帧"""
+    body = gzip.compress(json.dumps(payload).encode("utf-8"))
+    return _WS_REQUEST_HEADER + len(body).to_bytes(4, "big") + body
+
+
+def parse_ws_response(frame: bytes) -> tuple[int, int, bytes]:
+    """
+    解析 WebSocket 二进制响应帧
+
+    Returns:
+        (消息类型, 序号, 负载)；音频帧序号为负表示最后一帧，无序号的确认帧序号为 0
+    """
+    header_size = (frame[0] & 0x0F) * 4
+    message_type = frame[1] >> 4
+    flags = frame[1] & 0x0F
+    compression = frame[2] & 0x0F
+    payload = frame[header_size:]
+
+    if message_type == _WS_MSG_AUDIO:
+        if flags == 0:
+            return message_type, 0, b""
+        sequence = int.from_bytes(payload[:4], "big", signed=True)
+        size = int.from_bytes(payload[4:8], "big")
+        return message_type, sequence, payload[8:8 + size]
+
+    if message_type == _WS_MSG_ERROR:
+        code = int.from_bytes(payload[:4], "big")
+        size = int.from_bytes(payload[4:8], "big")
+        message = payload[8:8 + size]
+        if compression == 1:
+            message = gzip.decompress(message)
+        raise Exception(f"TTS 服务错误: code={code}, message={message.decode('utf-8', 'replace')}")
+
+    return message_type, 0, payload
+
 
 class TTSService:
     """语音合成服务"""
@@ -28,6 +77,10 @@ class TTSService:
         self.secret_key = settings.tts_secret_key
         self.cluster = settings.tts_cluster
         self.endpoint = settings.tts_endpoint or "https://openspeech.bytedance.com/api/v1/tts"
+        self.ws_endpoint = settings.tts_ws_endpoint
+        self.transport = settings.tts_transport
+        # 模拟提供商（离线压测），为 None 时调用火山引擎语音合成
+        self._fake_client = get_tts_client()
 
         # 默认配置 - 女声音色
         self.voice_type = settings.tts_voice or "zh_female_jitangnv_saturn_bigtts"
@@ -36,6 +89,21 @@ class TTSService:
         self.volume_ratio = 1.0
         self.pitch_ratio = 1.0
 
+        # 配音缓存：相同文本/音色/韵律参数直接复用 MinIO 中已有的音频对象
+        # 内存层按 LRU 淘汰，持久层按 TTL 过期
+        self._cache = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.chars_saved = 0
+        if settings.tts_cache_enabled:
+            self._cache = TieredCache("tts", maxsize=settings.tts_cache_size, ttl=settings.tts_cache_ttl)
+            register_metrics("tts_cache", lambda: {
+                **self._cache.stats(),
+                "hits": self.cache_hits,
+                "misses": self.cache_misses,
+                "chars_saved": self.chars_saved,
+            })
+
     def _generate_signature(self, reqid: str, timestamp: str) -> str:
         """生成签名"""
         # 签名字符串格式: appid + reqid + timestamp + cluster
@@ -48,36 +116,16 @@ class TTSService:
         ).hexdigest()
         return signature
 
-    async def synthesize(
+    def _build_request(
         self,
+        reqid: str,
         text: str,
-        voice_type: Optional[str] = None,
-        speed_ratio: Optional[float] = None,
-    ) -> str:
-        """
-        合成语音并上传到 MinIO
-
-        Args:
-            text: 要转换的文本
-            voice_type: 音色（可选）
-            speed_ratio: 语速（可选）
-
-        Returns:
-            MinIO 公开访问 URL
-        """
-        if voice_type:
-            self.voice_type = voice_type
-        if speed_ratio is not None:
-            self.speed_ratio = speed_ratio
-
-        reqid = str(uuid.uuid4())
-        timestamp = str(int(time.time()))
-
-        # 生成签名
-        signature = self._generate_signature(reqid, timestamp)
-
-        # 构建请求
-        request_json = {
+        voice_type: str,
+        speed_ratio: float,
+        operation: str = "query",
+    ) -> dict:
+        """构建 TTS 请求体"""
+        return {
             "app": {
                 "appid": self.appid,
                 "token": self.access_token,
@@ -87,9 +135,9 @@ class TTSService:
                 "uid": "user-001",
             },
             "audio": {
-                "voice_type": self.voice_type,
+                "voice_type": voice_type,
                 "encoding": self.encoding,
-                "speed_ratio": self.speed_ratio,
+                "speed_ratio": speed_ratio,
                 "volume_ratio": self.volume_ratio,
                 "pitch_ratio": self.pitch_ratio,
             },
@@ -97,55 +145,282 @@ class TTSService:
                 "reqid": reqid,
                 "text": text,
                 "text_type": "plain",
-                "operation": "query",
+                "operation": operation,
             },
         }
 
+    @staticmethod
+    def _normalize(text: str) -> str:
+        """规范化文本（全半角统一、合并空白）用于缓存键"""
+        return " ".join(unicodedata.normalize("NFKC", text).split())
+
+    def _cache_key(self, text: str, voice_type: str, speed_ratio: float) -> str:
+        """缓存键：(规范化文本, 音色, 语速, 音调, 音量, 编码)"""
+        return make_cache_key(
+            self._normalize(text),
+            voice_type,
+            speed_ratio,
+            self.pitch_ratio,
+            self.volume_ratio,
+            self.encoding,
+        )
+
+    async def _get_cached(self, cache_key: str) -> dict | None:
+        """查询缓存，对应的 MinIO 对象已被删除时视为未命中"""
+        entry = await self._cache.get(cache_key)
+        if entry is not None:
+            from .storage import get_storage_service
+            try:
+                exists = await get_storage_service().aobject_exists(entry["object_name"])
+            except Exception as e:
+                logger.warning(f"检查配音缓存对象失败: {entry['object_name']}, error={e}")
+                exists = False
+            if exists:
+                await get_storage_service().add_reference(entry["object_name"])
+                return entry
+            await self._cache.delete(cache_key)
+
+        self.cache_misses += 1
+        return None
+
+    async def _store(self, cache_key: str, text: str, path: Path) -> str:
+        """上传音频到 MinIO 并写入缓存，返回公开 URL"""
+        from .storage import get_storage_service
+        storage = get_storage_service()
+
+        minio_url = await storage.aupload_file(path, "audio/mpeg")
+        logger.info(f"音频已上传到 MinIO: {minio_url}")
+
+        if self._cache is not None:
+            await self._cache.set(cache_key, {
+                "object_name": storage.object_name_from_url(minio_url),
+                "url": minio_url,
+                "size": path.stat().st_size,
+            })
+        return minio_url
+
+    def _record_hit(self, text: str, entry: dict) -> None:
+        self.cache_hits += 1
+        self.chars_saved += len(text)
+        logger.info(f"配音缓存命中: {entry['url']}")
+
+    async def synthesize(
+        self,
+        text: str,
+        voice_type: Optional[str] = None,
+        speed_ratio: Optional[float] = None,
+    ) -> str:
+        """
+        合成语音并上传到 MinIO
+
+        Args:
+            text: 要转换的文本
+            voice_type: 音色（可选）
+            speed_ratio: 语速（可选）
+
+        Returns:
+            MinIO 公开访问 URL
+        """
+        voice_type = voice_type or self.voice_type
+        speed_ratio = speed_ratio if speed_ratio is not None else self.speed_ratio
+        cache_key = self._cache_key(text, voice_type, speed_ratio)
+
+        if self._cache is not None:
+            entry = await self._get_cached(cache_key)
+            if entry is not None:
+                self._record_hit(text, entry)
+                return entry["url"]
+
+        temp_file = Path(tempfile.gettempdir()) / f"{uuid.uuid4().hex}.{self.encoding}"
+        try:
+            await self._synthesize(text, temp_file, voice_type, speed_ratio)
+            return await self._store(cache_key, text, temp_file)
+        finally:
+            temp_file.unlink(missing_ok=True)
+
+    async def synthesize_to_file(
+        self,
+        text: str,
+        dest: Path,
+        voice_type: Optional[str] = None,
+        speed_ratio: Optional[float] = None,
+    ) -> Path:
+        """
+        合成语音并写入本地文件
+
+        命中配音缓存时直接从 MinIO 下载，未命中时合成后上传并写入缓存。
+
+        Args:
+            text: 要转换的文本
+            dest: 输出文件路径
+            voice_type: 音色（可选，默认使用服务配置）
+            speed_ratio: 语速（可选，默认使用服务配置）
+
+        Returns:
+            输出文件路径
+        """
+        # 使用局部变量，避免并发请求互相覆盖配置
+        voice_type = voice_type or self.voice_type
+        speed_ratio = speed_ratio if speed_ratio is not None else self.speed_ratio
+
+        if self._cache is None:
+            return await self._synthesize(text, dest, voice_type, speed_ratio)
+
+        cache_key = self._cache_key(text, voice_type, speed_ratio)
+        entry = await self._get_cached(cache_key)
+        if entry is not None:
+            from .storage import get_storage_service
+            try:
+                await get_storage_service().adownload_file(entry["object_name"], dest)
+                self._record_hit(text, entry)
+                return dest
+            except Exception as e:
+                logger.warning(f"读取配音缓存失败，重新合成: {e}")
+                self.cache_misses += 1
+
+        await self._synthesize(text, dest, voice_type, speed_ratio)
+        try:
+            await self._store(cache_key, text, dest)
+        except Exception as e:
+            logger.warning(f"写入配音缓存失败: {e}")
+        return dest
+
+    async def _synthesize(
+        self,
+        text: str,
+        dest: Path,
+        voice_type: str,
+        speed_ratio: float,
+    ) -> Path:
+        """调用 TTS 服务合成（优先 WebSocket，失败回退 HTTP）"""
+        async with get_governor("tts").slot():
+            if self._fake_client is not None:
+                return await self._fake_client.synthesize(text, dest, voice_type, speed_ratio)
+
+            if self.transport == "websocket":
+                try:
+                    return await self._synthesize_ws(text, dest, voice_type, speed_ratio)
+                except Exception as e:
+                    if is_rate_limited(e):
+                        raise
+                    logger.warning(f"WebSocket TTS 不可用，回退到 HTTP: {e}")
+
+            return await self._synthesize_http(text, dest, voice_type, speed_ratio)
+
+    async def stream_audio(
+        self,
+        text: str,
+        voice_type: Optional[str] = None,
+        speed_ratio: Optional[float] = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        通过 WebSocket 流式合成，音频分块生成后立即返回
+
+        Args:
+            text: 要转换的文本
+            voice_type: 音色（可选）
+            speed_ratio: 语速（可选）
+        """
+        from websockets.asyncio.client import connect
+
+        voice_type = voice_type or self.voice_type
+        speed_ratio = speed_ratio if speed_ratio is not None else self.speed_ratio
+
+        reqid = str(uuid.uuid4())
+        request = self._build_request(reqid, text, voice_type, speed_ratio, operation="submit")
+        headers = {"Authorization": f"Bearer; {self.access_token}"}
+
+        logger.info(f"TTS WebSocket 请求: voice_type={voice_type}, text_length={len(text)}")
+
+        async with connect(self.ws_endpoint, additional_headers=headers, max_size=None) as ws:
+            await ws.send(build_ws_request(request))
+            async for frame in ws:
+                if isinstance(frame, str):
+                    continue
+                message_type, sequence, payload = parse_ws_response(frame)
+                if message_type != _WS_MSG_AUDIO:
+                    continue
+                if payload:
+                    yield payload
+                if sequence < 0:
+                    return
+
+        raise Exception("TTS WebSocket 连接在音频结束前关闭")
+
+    async def _synthesize_ws(
+        self,
+        text: str,
+        dest: Path,
+        voice_type: str,
+        speed_ratio: float,
+    ) -> Path:
+        """WebSocket 流式合成，音频分块直接写入文件"""
+        size = 0
+        try:
+            with open(dest, "wb") as f:
+                async for chunk in self.stream_audio(text, voice_type, speed_ratio):
+                    f.write(chunk)
+                    size += len(chunk)
+        except BaseException:
+            dest.unlink(missing_ok=True)
+            raise
+
+        if size == 0:
+            dest.unlink(missing_ok=True)
+            raise Exception("生成的音频数据为空")
+
+        logger.info(f"音频流式生成成功, 大小: {size} bytes")
+        return dest
+
+    async def _synthesize_http(
+        self,
+        text: str,
+        dest: Path,
+        voice_type: str,
+        speed_ratio: float,
+    ) -> Path:
+        """HTTP 合成（一次性返回 base64 音频）"""
+        reqid = str(uuid.uuid4())
+        request_json = self._build_request(reqid, text, voice_type, speed_ratio)
+
         # 构建请求头 - 使用 Authorization 头部（注意分号后有空格）
         headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer; {self.access_token}",
         }
 
-        logger.info(f"TTS 请求: voice_type={self.voice_type}, text_length={len(text)}")
+        logger.info(f"TTS 请求: voice_type={voice_type}, text_length={len(text)}")
 
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    self.endpoint,
-                    json=request_json,
-                    headers=headers,
-                )
-
-                logger.info(f"TTS 响应: status={response.status_code}")
-
-                if response.status_code != 200:
-                    error_data = response.json()
-                    raise Exception(f"TTS 服务错误: {error_data}")
-
-                result = response.json()
+            from .http import get_http_client
+            response = await get_http_client().post(
+                self.endpoint,
+                json=request_json,
+                headers=headers,
+                timeout=30.0,
+            )
 
-                if result.get("code") != 3000:
-                    error_msg = result.get("message", "未知错误")
-                    raise Exception(f"TTS 合成失败: {error_msg}")
+            logger.info(f"TTS 响应: status={response.status_code}")
 
-                # 解码 base64 音频数据
-                audio_data = base64.b64decode(result["data"])
+            if response.status_code != 200:
+                error_data = response.json()
+                raise Exception(f"TTS 服务错误: {error_data}")
 
-                if len(audio_data) == 0:
-                    raise Exception("生成的音频数据为空")
+            result = response.json()
 
-                logger.info(f"音频生成成功, 大小: {len(audio_data)} bytes")
+            if result.get("code") != 3000:
+                error_msg = result.get("message", "未知错误")
+                raise Exception(f"TTS 合成失败: {error_msg}")
 
-                # 直接上传到 MinIO
-                from .storage import get_storage_service
-                storage = get_storage_service()
+            # 解码 base64 音频数据
+            audio_data = base64.b64decode(result["data"])
 
-                filename = f"{reqid}.mp3"
-                minio_url = storage.upload_bytes(audio_data, filename, "audio/mpeg")
-                logger.info(f"音频已上传到 MinIO: {minio_url}")
+            if len(audio_data) == 0:
+                raise Exception("生成的音频数据为空")
 
-                return minio_url
+            logger.info(f"音频生成成功, 大小: {len(audio_data)} bytes")
+            dest.write_bytes(audio_data)
+            return dest
 
         except httpx.HTTPError as e:
             logger.error(f"HTTP 请求失败: {e}")
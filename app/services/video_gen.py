@@ -2,13 +2,14 @@
 视频生成服务
 """
 import logging
-import time
 import asyncio
 from pathlib import Path
-import httpx
 
-from volcenginesdkarkruntime import Ark
 from ..config import get_settings
+from .governor import get_governor
+from .idempotency import IdempotencyRecord
+from .providers import create_ark_client
+from .video_poller import SeedanceTaskPoller
 
 logger = logging.getLogger(__name__)
 
@@ -17,98 +18,176 @@ class VideoGenService:
     """视频生成服务"""
 
     def __init__(self):
-        settings = get_settings()
-        self.client = Ark(
-            base_url="https://ark.cn-beijing.volces.com/api/v3",
-            api_key=settings.ark_api_key,
-        )
+        self.client = create_ark_client()
         self.model = "doubao-seedance-1-0-pro-fast-251015"
+        # 限流器名额覆盖任务从创建到结束的全过程（限制提供商侧同时运行的任务数）
+        self._governor = get_governor("video")
+        self._poller: SeedanceTaskPoller | None = None
+        self._poller_loop: asyncio.AbstractEventLoop | None = None
 
     async def generate(
         self,
         image_url: str,
         prompt: str,
         duration: float = 5.0,
+        record: IdempotencyRecord | None = None,
     ) -> str:
-        """生成视频并上传到 MinIO"""
+        """
+        生成视频并上传到 MinIO
+
+        Args:
+            record: 幂等记录（重试时复用已创建的任务 / 已生成的视频，而不是重新生成）
+        """
+        if record is not None:
+            minio_url = record.get("minio_url")
+            if minio_url:
+                logger.info(f"复用已上传的视频: {minio_url}")
+                record.mark_resumed("video:done")
+                return minio_url
+
+            # 上一次尝试已拿到视频但上传失败：直接重新上传
+            video_url = record.get("video_url")
+            task_id = record.get("provider_task_id")
+            if video_url and task_id:
+                logger.info(f"复用已生成的视频，重新上传: task_id={task_id}")
+                record.mark_resumed("video:upload")
+                try:
+                    public_url = await self._download_and_upload(video_url, task_id)
+                except Exception as e:
+                    # 临时 URL 可能已过期，重新查询任务获取新的 URL
+                    logger.warning(f"重新上传失败，重新查询任务: task_id={task_id}, error={e}")
+                    await record.discard("video_url")
+                else:
+                    await record.update(minio_url=public_url)
+                    return public_url
+
+        video_url, task_id = await self._run_task(image_url, prompt, record)
+
+        logger.info(f"视频生成成功，开始下载并上传到 MinIO: {video_url}")
+        # 下载并上传到 MinIO
+        public_url = await self._download_and_upload(video_url, task_id)
+        if record is not None:
+            await record.update(minio_url=public_url)
+        return public_url
+
+    async def _run_task(
+        self,
+        image_url: str,
+        prompt: str,
+        record: IdempotencyRecord | None,
+    ) -> tuple[str, str]:
+        """创建视频任务（或恢复已创建的任务）并等待结束，返回 (视频 URL, 任务 ID)"""
         # 创建任务（移除 duration 参数，该模型不支持）
         motion_prompt = f"{prompt}, --camerafixed false --watermark true"
 
-        response = self.client.content_generation.tasks.create(
-            model=self.model,
-            content=[
-                {"type": "text", "text": motion_prompt},
-                {"type": "image_url", "image_url": {"url": image_url}},
-            ]
+        # 任务耗时差异大，不参与延迟突增检测
+        async with self._governor.slot(track_latency=False):
+            task_id = record.get("provider_task_id") if record is not None else None
+            result = None
+            if task_id:
+                logger.info(f"恢复轮询已有视频任务: task_id={task_id}")
+                record.mark_resumed("video:poll")
+                try:
+                    result = await self._get_poller().wait(task_id)
+                except TimeoutError:
+                    # 任务仍在提供商侧运行，保留任务 ID，下次重试继续等待
+                    raise
+                except Exception as e:
+                    logger.warning(f"已有视频任务失败，重新创建: task_id={task_id}, error={e}")
+                    await record.discard("provider_task_id", "video_url")
+                    task_id = None
+
+            if task_id is None:
+                response = await self.client.content_generation.tasks.create(
+                    model=self.model,
+                    content=[
+                        {"type": "text", "text": motion_prompt},
+                        {"type": "image_url", "image_url": {"url": image_url}},
+                    ]
+                )
+
+                task_id = response.id
+                logger.info(f"视频任务已创建: task_id={task_id}")
+                if record is not None:
+                    # 创建后立即记录，之后任何一步失败重试时都不会再创建新任务
+                    await record.update(provider_task_id=task_id)
+
+                # 交给全局轮询器，等待任务结束
+                try:
+                    result = await self._get_poller().wait(task_id)
+                except Exception as e:
+                    if record is not None and not isinstance(e, TimeoutError):
+                        await record.discard("provider_task_id")
+                    raise
+
+        video_url = self._extract_video_url(result)
+        if not video_url:
+            logger.error(f"视频任务成功但无法提取video_url: task_id={task_id}, result类型={type(result)}")
+            # 打印完整结果结构用于调试
+            import pprint
+            logger.error(f"完整结果: {pprint.pformat(result)}")
+            raise Exception("视频生成成功但无法提取video_url")
+
+        if record is not None:
+            await record.update(video_url=video_url)
+        return video_url, task_id
+
+    @staticmethod
+    def _extract_video_url(result) -> str | None:
+        """从任务结果中提取视频 URL"""
+        # 检查响应结构 - 可能是 result.content.video_url 或直接在 result 上
+        video_url = None
+
+        # 方法1: 检查 content 属性
+        if hasattr(result, 'content') and result.content:
+            if hasattr(result.content, 'video_url'):
+                video_url = result.content.video_url
+            # 或者 content 本身就是 URL 字符串
+            elif isinstance(result.content, str) and result.content.startswith('http'):
+                video_url = result.content
+        # 方法2: 直接检查 result 上的属性
+        elif hasattr(result, 'video_url'):
+            video_url = result.video_url
+        # 方法3: 检查 content 对象中的 video_url 字段
+        elif hasattr(result, 'content') and hasattr(result.content, '__dict__'):
+            content_dict = result.content.__dict__
+            video_url = content_dict.get('video_url')
+
+        return video_url
+
+    def _get_poller(self) -> SeedanceTaskPoller:
+        """获取当前事件循环上的任务轮询器"""
+        loop = asyncio.get_running_loop()
+        if self._poller is None or self._poller_loop is not loop:
+            settings = get_settings()
+            self._poller = SeedanceTaskPoller(
+                self._fetch_tasks,
+                batch_size=settings.video_poll_batch_size,
+                min_interval=settings.video_poll_min_interval,
+                max_interval=settings.video_poll_max_interval,
+                timeout=settings.video_task_timeout,
+            )
+            self._poller_loop = loop
+        return self._poller
+
+    async def _fetch_tasks(self, task_ids: list[str]) -> dict:
+        """批量查询任务状态（由单个轮询器串行调用，不经过限流器）"""
+        response = await self.client.content_generation.tasks.list(
+            task_ids=task_ids,
+            page_size=len(task_ids),
         )
-
-        task_id = response.id
-
-        # 轮询状态
-        max_wait = 300  # 5分钟
-        start_time = time.time()
-
-        while time.time() - start_time < max_wait:
-            result = self.client.content_generation.tasks.get(task_id=task_id)
-
-            logger.info(f"视频任务状态: task_id={task_id}, status={result.status}")
-
-            if result.status == "succeeded":
-                # 检查响应结构 - 可能是 result.content.video_url 或直接在 result 上
-                video_url = None
-
-                # 方法1: 检查 content 属性
-                if hasattr(result, 'content') and result.content:
-                    if hasattr(result.content, 'video_url'):
-                        video_url = result.content.video_url
-                    # 或者 content 本身就是 URL 字符串
-                    elif isinstance(result.content, str) and result.content.startswith('http'):
-                        video_url = result.content
-                # 方法2: 直接检查 result 上的属性
-                elif hasattr(result, 'video_url'):
-                    video_url = result.video_url
-                # 方法3: 检查 content 对象中的 video_url 字段
-                elif hasattr(result, 'content') and hasattr(result.content, '__dict__'):
-                    content_dict = result.content.__dict__
-                    video_url = content_dict.get('video_url')
-
-                if not video_url:
-                    logger.error(f"视频任务成功但无法提取video_url: task_id={task_id}, result类型={type(result)}")
-                    # 打印完整结果结构用于调试
-                    import pprint
-                    logger.error(f"完整结果: {pprint.pformat(result)}")
-                    raise Exception("视频生成成功但无法提取video_url")
-
-                logger.info(f"视频生成成功，开始下载并上传到 MinIO: {video_url}")
-                # 下载并上传到 MinIO
-                return await self._download_and_upload(video_url, task_id)
-
-            elif result.status == "failed":
-                error_msg = getattr(result, 'error', '未知错误')
-                logger.error(f"视频任务失败: task_id={task_id}, error={error_msg}")
-                raise Exception(f"视频生成失败: {error_msg}")
-            elif result.status in ("pending", "processing"):
-                logger.debug(f"视频任务处理中: task_id={task_id}, status={result.status}")
-            else:
-                logger.warning(f"视频任务未知状态: task_id={task_id}, status={result.status}")
-
-            await asyncio.sleep(3)
-
-        raise TimeoutError("视频生成超时")
+        return {item.id: item for item in response.items}
 
     async def _download_and_upload(self, url: str, task_id: str) -> str:
-        """下载视频并上传到 MinIO（不保存到本地）"""
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            r = await client.get(url)
-            r.raise_for_status()
-            video_data = r.content
-
-        # 直接上传到 MinIO
+        """边下载边上传到 MinIO（不保存到本地，也不在内存中缓存整段视频）"""
+        from .http import get_http_client
         from .storage import get_storage_service
         storage = get_storage_service()
 
         filename = f"{task_id[:12]}.mp4"
-        public_url = storage.upload_bytes(video_data, filename, "video/mp4")
+        async with get_http_client().stream("GET", url, timeout=120.0) as r:
+            r.raise_for_status()
+            public_url = await storage.astream_upload(r.aiter_bytes(), filename, "video/mp4")
         logger.info(f"视频已上传到 MinIO: {public_url}")
         return public_url
 
@@ -122,3 +201,9 @@ def get_video_service() -> VideoGenService:
     if _video_service is None:
         _video_service = VideoGenService()
     return _video_service
+
+
+async def shutdown_video_poller() -> None:
+    """停止视频任务轮询器（在应用关闭时调用）"""
+    if _video_service is not None and _video_service._poller is not None:
+        await _video_service._poller.aclose()
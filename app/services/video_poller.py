@@ -0,0 +1,187 @@
+"""
+Seedance 视频任务批量轮询器
+
+进程内只有一个后台轮询循环：跟踪所有未完成的任务 ID，按批次查询状态，
+并根据历史完成耗时自适应调整轮询间隔，任务结束时唤醒对应的 Future。
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+# 批量查询函数：task_ids -> {task_id: task_result}
+FetchBatch = Callable[[list[str]], Awaitable[dict[str, Any]]]
+
+
+@dataclass
+class _TrackedTask:
+    """被跟踪的任务"""
+    task_id: str
+    future: asyncio.Future
+    created_at: float = field(default_factory=time.monotonic)
+    next_poll_at: float = 0.0
+
+
+class SeedanceTaskPoller:
+    """批量轮询 Seedance 任务状态"""
+
+    def __init__(
+        self,
+        fetch_batch: FetchBatch,
+        batch_size: int = 50,
+        min_interval: float = 2.0,
+        max_interval: float = 15.0,
+        timeout: float = 300.0,
+        initial_estimate: float = 60.0,
+    ):
+        self._fetch_batch = fetch_batch
+        self.batch_size = batch_size
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.timeout = timeout
+
+        # 典型完成耗时（指数移动平均）
+        self._typical_duration = initial_estimate
+
+        self._tasks: dict[str, _TrackedTask] = {}
+        self._wakeup = asyncio.Event()
+        self._runner: asyncio.Task | None = None
+
+    @property
+    def typical_duration(self) -> float:
+        return self._typical_duration
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._tasks)
+
+    def watch(self, task_id: str) -> asyncio.Future:
+        """登记任务，返回任务结束时完成的 Future"""
+        tracked = self._tasks.get(task_id)
+        if tracked is not None:
+            return tracked.future
+
+        loop = asyncio.get_running_loop()
+        tracked = _TrackedTask(task_id=task_id, future=loop.create_future())
+        tracked.next_poll_at = tracked.created_at + self._next_delay(0.0)
+        self._tasks[task_id] = tracked
+
+        if self._runner is None or self._runner.done():
+            self._runner = loop.create_task(self._run())
+        self._wakeup.set()
+        return tracked.future
+
+    async def wait(self, task_id: str) -> Any:
+        """等待任务结束并返回最终结果"""
+        return await asyncio.shield(self.watch(task_id))
+
+    def _next_delay(self, elapsed: float) -> float:
+        """根据已等待时间和典型完成耗时计算下一次轮询间隔"""
+        remaining = self._typical_duration - elapsed
+        if remaining > 0:
+            # 离预期完成还早：等剩余时间的一半
+            delay = remaining / 2
+        else:
+            # 已超过预期：逐步放缓
+            delay = self.min_interval + (-remaining) / 10
+        return max(self.min_interval, min(delay, self.max_interval))
+
+    def _record_completion(self, duration: float) -> None:
+        self._typical_duration = 0.8 * self._typical_duration + 0.2 * duration
+
+    async def _run(self) -> None:
+        """后台轮询循环"""
+        while self._tasks:
+            now = time.monotonic()
+            self._expire(now)
+
+            # 即将到期的任务顺带一起查询，减少请求次数
+            horizon = now + self.min_interval
+            due = [t for t in self._tasks.values() if t.next_poll_at <= horizon]
+            for i in range(0, len(due), self.batch_size):
+                await self._poll_batch(due[i:i + self.batch_size])
+
+            if not self._tasks:
+                break
+
+            next_at = min(t.next_poll_at for t in self._tasks.values())
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(),
+                    timeout=max(0.0, next_at - time.monotonic()),
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    def _expire(self, now: float) -> None:
+        """超时任务直接失败"""
+        for task_id, tracked in list(self._tasks.items()):
+            if now - tracked.created_at >= self.timeout:
+                del self._tasks[task_id]
+                if not tracked.future.done():
+                    tracked.future.set_exception(TimeoutError("视频生成超时"))
+
+    async def _poll_batch(self, batch: list[_TrackedTask]) -> None:
+        """批量查询一组任务"""
+        task_ids = [t.task_id for t in batch]
+        try:
+            results = await self._fetch_batch(task_ids)
+        except Exception as e:
+            logger.warning(f"批量查询视频任务失败: count={len(task_ids)}, error={e}")
+            results = {}
+
+        now = time.monotonic()
+        for tracked in batch:
+            result = results.get(tracked.task_id)
+            status = getattr(result, "status", None)
+            elapsed = now - tracked.created_at
+
+            if status == "succeeded":
+                logger.info(f"视频任务完成: task_id={tracked.task_id}, elapsed={elapsed:.1f}s")
+                self._record_completion(elapsed)
+                self._finish(tracked, result=result)
+            elif status in ("failed", "cancelled", "expired"):
+                error_msg = getattr(result, "error", None) or status
+                logger.error(f"视频任务失败: task_id={tracked.task_id}, error={error_msg}")
+                self._finish(tracked, error=Exception(f"视频生成失败: {error_msg}"))
+            else:
+                if status not in (None, "queued", "pending", "running", "processing"):
+                    logger.warning(f"视频任务未知状态: task_id={tracked.task_id}, status={status}")
+                tracked.next_poll_at = now + self._next_delay(elapsed)
+
+        logger.debug(
+            f"批量轮询: batch={len(batch)}, pending={len(self._tasks)}, "
+            f"typical={self._typical_duration:.1f}s"
+        )
+
+    def _finish(
+        self,
+        tracked: _TrackedTask,
+        result: Any = None,
+        error: Exception | None = None,
+    ) -> None:
+        self._tasks.pop(tracked.task_id, None)
+        if tracked.future.done():
+            return
+        if error is not None:
+            tracked.future.set_exception(error)
+        else:
+            tracked.future.set_result(result)
+
+    async def aclose(self) -> None:
+        """停止轮询，取消所有等待中的任务"""
+        runner, self._runner = self._runner, None
+        if runner is not None and not runner.done():
+            runner.cancel()
+            try:
+                await runner
+            except asyncio.CancelledError:
+                pass
+        for tracked in self._tasks.values():
+            if not tracked.future.done():
+                tracked.future.cancel()
+        self._tasks.clear()
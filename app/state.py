@@ -50,6 +50,8 @@ class AgentState(TypedDict):
     total_videos: NotRequired[int]
     composed_video_url: NotRequired[str]
     audio_url: NotRequired[str]
+    # 配音时间轴：scene_id -> (开始秒, 结束秒)
+    narration_timings: NotRequired[dict[str, tuple[float, float]]]
     final_video_url: NotRequired[str]
     errors: NotRequired[list[str]]
     # 图像任务结果（使用 reducer 合并）
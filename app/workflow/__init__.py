@@ -1,6 +1,20 @@
 """
 LangGraph 工作流层
 """
-from .graph import create_graph, generate_video
+from .graph import (
+    create_graph,
+    generate_video,
+    get_checkpointer,
+    get_graph,
+    get_task_graph,
+    warm_graphs,
+)
 
-__all__ = ["create_graph", "generate_video"]
+__all__ = [
+    "create_graph",
+    "get_graph",
+    "get_task_graph",
+    "get_checkpointer",
+    "warm_graphs",
+    "generate_video",
+]
@@ -0,0 +1,367 @@
+"""
+工作流检查点存储
+
+LangGraph 默认的 MemorySaver 只把检查点保存在进程内存中，进程重启或任务在合成阶段崩溃时，
+已付费生成的图像和视频全部丢失。SQLCheckpointSaver 把检查点写入 DATABASE_URL 对应的数据库
+（复用应用的数据库引擎），任务可以通过 /api/v1/tasks/{task_id}/resume 从最后完成的节点继续。
+
+- 每个超步结束时保存完整状态（workflow_checkpoints）
+- 超步内已完成节点的输出单独保存（workflow_checkpoint_writes），恢复时这些节点不会重新执行
+
+CHECKPOINT_BACKEND=memory 时使用 BoundedMemorySaver：在 MemorySaver 基础上限制线程数、
+按 TTL 淘汰空闲线程，并可只保留每个线程的最新检查点，避免常驻进程的内存随任务数增长。
+"""
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+    writes_sort_key,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+
+logger = logging.getLogger(__name__)
+
+
+class SQLCheckpointSaver(BaseCheckpointSaver[str]):
+    """
+    基于 SQLAlchemy 的检查点存储（仅实现异步接口）
+
+    工作流只通过 astream / ainvoke 执行，同步接口沿用基类（未实现）。
+    """
+
+    def _tuple(self, row, writes) -> CheckpointTuple:
+        """数据库记录 -> CheckpointTuple"""
+        writes = sorted(writes, key=lambda w: writes_sort_key(w.task_path, w.task_id, w.idx))
+        return CheckpointTuple(
+            config=self._config(row.thread_id, row.checkpoint_ns, row.checkpoint_id),
+            checkpoint=self.serde.loads_typed((row.checkpoint_type, row.checkpoint)),
+            metadata=self.serde.loads_typed((row.metadata_type, row.metadata_)),
+            parent_config=(
+                self._config(row.thread_id, row.checkpoint_ns, row.parent_checkpoint_id)
+                if row.parent_checkpoint_id
+                else None
+            ),
+            pending_writes=[
+                (w.task_id, w.channel, self.serde.loads_typed((w.value_type, w.value)))
+                for w in writes
+            ],
+        )
+
+    @staticmethod
+    def _config(thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> RunnableConfig:
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint_id,
+            }
+        }
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        from ..db.repository import CheckpointRepository
+        from ..db.session import get_session_maker
+
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+
+        async with get_session_maker()() as session:
+            row = await CheckpointRepository.get(
+                session, thread_id, checkpoint_ns, get_checkpoint_id(config)
+            )
+            if row is None:
+                return None
+            writes = await CheckpointRepository.get_writes(
+                session, thread_id, checkpoint_ns, row.checkpoint_id
+            )
+        return self._tuple(row, writes)
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        from ..db.repository import CheckpointRepository
+        from ..db.session import get_session_maker
+
+        if limit is not None and limit <= 0:
+            return
+
+        configurable = (config or {}).get("configurable", {})
+        async with get_session_maker()() as session:
+            # 元数据是序列化保存的，有过滤条件时只能读出后在内存中过滤，之后再截断
+            rows = await CheckpointRepository.list_checkpoints(
+                session,
+                thread_id=configurable.get("thread_id"),
+                checkpoint_ns=configurable.get("checkpoint_ns"),
+                checkpoint_id=get_checkpoint_id(config) if config else None,
+                before_id=get_checkpoint_id(before) if before else None,
+                limit=None if filter else limit,
+            )
+            if filter:
+                rows = [
+                    row for row in rows
+                    if all(
+                        self.serde.loads_typed((row.metadata_type, row.metadata_)).get(key) == value
+                        for key, value in filter.items()
+                    )
+                ][:limit]
+            writes = await CheckpointRepository.get_writes_for(session, rows)
+
+        for row in rows:
+            yield self._tuple(row, writes[(row.thread_id, row.checkpoint_ns, row.checkpoint_id)])
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        from ..db.models import WorkflowCheckpoint
+        from ..db.repository import CheckpointRepository
+        from ..db.session import get_session_maker
+
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        checkpoint_type, checkpoint_data = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_data = self.serde.dumps_typed(
+            get_checkpoint_metadata(config, metadata)
+        )
+
+        async with get_session_maker()() as session:
+            await CheckpointRepository.put(session, WorkflowCheckpoint(
+                thread_id=thread_id,
+                checkpoint_ns=checkpoint_ns,
+                checkpoint_id=checkpoint["id"],
+                parent_checkpoint_id=configurable.get("checkpoint_id"),
+                checkpoint_type=checkpoint_type,
+                checkpoint=checkpoint_data,
+                metadata_type=metadata_type,
+                metadata_=metadata_data,
+            ))
+            await session.commit()
+
+        return self._config(thread_id, checkpoint_ns, checkpoint["id"])
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        from ..db.models import WorkflowCheckpointWrite
+        from ..db.repository import CheckpointRepository
+        from ..db.session import get_session_maker
+
+        configurable = config["configurable"]
+        async with get_session_maker()() as session:
+            for idx, (channel, value) in enumerate(writes):
+                value_type, value_data = self.serde.dumps_typed(value)
+                write_idx = WRITES_IDX_MAP.get(channel, idx)
+                await CheckpointRepository.put_write(
+                    session,
+                    WorkflowCheckpointWrite(
+                        thread_id=configurable["thread_id"],
+                        checkpoint_ns=configurable.get("checkpoint_ns", ""),
+                        checkpoint_id=configurable["checkpoint_id"],
+                        task_id=task_id,
+                        idx=write_idx,
+                        channel=channel,
+                        value_type=value_type,
+                        value=value_data,
+                        task_path=task_path,
+                    ),
+                    # 特殊通道（错误、中断等）以最新写入为准，普通写入保留首次结果
+                    overwrite=write_idx < 0,
+                )
+            await session.commit()
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        from ..db.repository import CheckpointRepository
+        from ..db.session import get_session_maker
+
+        async with get_session_maker()() as session:
+            await CheckpointRepository.delete_thread(session, thread_id)
+            await session.commit()
+
+    def get_next_version(self, current: str | None, channel: None) -> str:
+        """通道版本号（与 MemorySaver 相同的格式）"""
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """
+    有界的内存检查点存储
+
+    Args:
+        max_threads: 最多保留的线程数（超出时淘汰最久未使用的线程，<= 0 表示不限制）
+        ttl: 线程空闲超过该时间（秒）后淘汰（<= 0 表示不过期）
+        keep_latest: 每个线程只保留最新的检查点及其写入（不支持历史回溯）
+    """
+
+    def __init__(self, max_threads: int = 0, ttl: float = 0, keep_latest: bool = False):
+        super().__init__()
+        self.max_threads = max_threads
+        self.ttl = ttl
+        self.keep_latest = keep_latest
+        self._lock = threading.RLock()
+        # thread_id -> 最近一次读写时间（按时间排序，最久未使用的在前）
+        self._last_used: OrderedDict[str, float] = OrderedDict()
+        self.expired = 0
+        self.evicted = 0
+        self.pruned = 0
+
+    def _touch(self, thread_id: str) -> None:
+        self._last_used[thread_id] = time.monotonic()
+        self._last_used.move_to_end(thread_id)
+
+    def _evict(self, keep: str) -> None:
+        """淘汰过期线程和超出数量上限的线程（不淘汰正在写入的线程）"""
+        dropped = self.expired + self.evicted
+        if self.ttl > 0:
+            deadline = time.monotonic() - self.ttl
+            for thread_id, last_used in list(self._last_used.items()):
+                if last_used > deadline:
+                    break
+                if thread_id != keep:
+                    self._drop(thread_id)
+                    self.expired += 1
+
+        if self.max_threads > 0:
+            for thread_id in list(self._last_used):
+                if len(self._last_used) <= self.max_threads:
+                    break
+                if thread_id != keep:
+                    self._drop(thread_id)
+                    self.evicted += 1
+
+        dropped = self.expired + self.evicted - dropped
+        if dropped:
+            logger.info(f"检查点已淘汰 {dropped} 个线程，剩余 {len(self._last_used)} 个")
+
+    def _drop(self, thread_id: str) -> None:
+        self._last_used.pop(thread_id, None)
+        super().delete_thread(thread_id)
+
+    def _prune(self, thread_id: str, checkpoint_ns: str, checkpoint: Checkpoint) -> None:
+        """只保留最新的检查点、其写入和其引用的通道值"""
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        for checkpoint_id in [cid for cid in checkpoints if cid != checkpoint["id"]]:
+            del checkpoints[checkpoint_id]
+            self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+            self.pruned += 1
+
+        versions = checkpoint["channel_versions"]
+        for key in [
+            k for k in self.blobs
+            if k[0] == thread_id and k[1] == checkpoint_ns and versions.get(k[2]) != k[3]
+        ]:
+            del self.blobs[key]
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        with self._lock:
+            result = super().put(config, checkpoint, metadata, new_versions)
+            if self.keep_latest:
+                self._prune(thread_id, config["configurable"]["checkpoint_ns"], checkpoint)
+            self._touch(thread_id)
+            self._evict(keep=thread_id)
+        return result
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        with self._lock:
+            super().put_writes(config, writes, task_id, task_path)
+            self._touch(thread_id)
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        thread_id = config["configurable"]["thread_id"]
+        with self._lock:
+            if thread_id not in self.storage:
+                return None
+            # 已过期的线程视为不存在
+            last_used = self._last_used.get(thread_id)
+            if last_used is not None and self.ttl > 0 and time.monotonic() - last_used > self.ttl:
+                self._drop(thread_id)
+                self.expired += 1
+                return None
+            return super().get_tuple(config)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._drop(thread_id)
+
+    def stats(self) -> dict:
+        """常驻内存统计（序列化后的字节数，用于估算进程内存）"""
+        with self._lock:
+            checkpoint_count = 0
+            checkpoint_bytes = 0
+            for namespaces in self.storage.values():
+                for checkpoints in namespaces.values():
+                    for checkpoint, metadata, _ in checkpoints.values():
+                        checkpoint_count += 1
+                        checkpoint_bytes += len(checkpoint[1]) + len(metadata[1])
+            write_count = 0
+            write_bytes = 0
+            for writes in self.writes.values():
+                for _, _, value, _ in writes.values():
+                    write_count += 1
+                    write_bytes += len(value[1])
+            blob_bytes = sum(len(value[1]) for value in self.blobs.values())
+            threads = len(self._last_used)
+
+        resident_bytes = checkpoint_bytes + write_bytes + blob_bytes
+        return {
+            "threads": threads,
+            "max_threads": self.max_threads,
+            "ttl": self.ttl,
+            "keep_latest": self.keep_latest,
+            "checkpoints": checkpoint_count,
+            "writes": write_count,
+            "blobs": len(self.blobs),
+            "checkpoint_bytes": checkpoint_bytes,
+            "write_bytes": write_bytes,
+            "blob_bytes": blob_bytes,
+            "resident_bytes": resident_bytes,
+            "bytes_per_thread": resident_bytes / threads if threads else 0.0,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "pruned_checkpoints": self.pruned,
+        }
@@ -5,17 +5,23 @@ import logging
 import uuid
 
 from langgraph.graph import StateGraph, START, END
-from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph.state import CompiledStateGraph
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.types import RetryPolicy, Send
 
+from ..config import get_settings
 from ..state import AgentState
 from .nodes import (
     init_node,
     writer_node,
     generate_image_node,
+    generate_images_batch_node,
     aggregate_images_node,
+    build_image_task,
     generate_video_node,
     aggregate_videos_node,
+    generate_scene_node,
+    aggregate_scenes_node,
     compose_node,
     narrator_node,
     add_audio_node,
@@ -23,12 +29,15 @@ from .nodes import (
 
 logger = logging.getLogger(__name__)
 
+# 工作流变体
+GRAPH_VARIANTS = ("pipelined", "scene", "batch")
+
 
 # ============================================================================
 # 条件路由函数
 # ============================================================================
 
-def route_images(state: AgentState):
+def route_images(state: AgentState, node: str = "generate_image"):
     """分发图像生成任务 - 返回 Send 对象列表或字符串"""
     scenes = state.get("scenes", [])
     style_seed = state.get("style_seed", 0)
@@ -37,7 +46,12 @@ def route_images(state: AgentState):
         return END
 
     # 为每个场景创建一个 Send 对象
-    return [Send("generate_image", {"scene": s, "style_seed": style_seed}) for s in scenes]
+    return [Send(node, build_image_task(s, style_seed)) for s in scenes]
+
+
+def route_scenes(state: AgentState):
+    """流水线模式：每个场景一个 Send，场景内依次生成图像和视频"""
+    return route_images(state, node="generate_scene")
 
 
 def route_videos(state: AgentState):
@@ -53,6 +67,20 @@ def route_videos(state: AgentState):
     return [Send("generate_video", {"scene": s}) for s in scenes_with_images]
 
 
+def route_images_batch(state: AgentState) -> str:
+    """组图模式：有场景时进入组图生成"""
+    if not state.get("scenes"):
+        return END
+    return "generate_images_batch"
+
+
+def route_narration(state: AgentState) -> str:
+    """配音只依赖文案：有场景时与图像/视频生成并行合成配音"""
+    if not state.get("scenes"):
+        return END
+    return "narrator"
+
+
 def should_continue_to_compose(state: AgentState) -> str:
     """判断是否继续到合成"""
     completed = state.get("completed_videos", 0)
@@ -66,8 +94,26 @@ def should_continue_to_compose(state: AgentState) -> str:
 # 工作流构建
 # ============================================================================
 
-def create_graph():
-    """创建 LangGraph 工作流"""
+def create_graph(
+    variant: str | None = None,
+    checkpointer: BaseCheckpointSaver | None = None,
+) -> CompiledStateGraph:
+    """
+    创建 LangGraph 工作流
+
+    请求处理中请使用 get_graph()，复用进程内已编译的工作流。
+
+    Args:
+        variant: 工作流变体，默认取配置 GRAPH_VARIANT
+            - pipelined: 每个场景图像完成后立即生成视频，只在合成前汇合
+            - scene: 每个场景单独生成图像（Send 并发分发）
+            - batch: 组图模式，一次请求生成所有场景的图像
+        checkpointer: 检查点存储，默认使用进程共享的 get_checkpointer()
+    """
+    variant = variant or get_settings().graph_variant
+    if variant not in GRAPH_VARIANTS:
+        raise ValueError(f"未知的工作流变体: {variant}，可选 {', '.join(GRAPH_VARIANTS)}")
+
     workflow = StateGraph(AgentState)
 
     # 重试策略
@@ -82,11 +128,18 @@ def create_graph():
     workflow.add_node("init", init_node)
     workflow.add_node("writer", writer_node)
 
-    workflow.add_node("generate_image", generate_image_node, retry_policy=retry_policy)
-    workflow.add_node("aggregate_images", aggregate_images_node)
+    if variant == "pipelined":
+        workflow.add_node("generate_scene", generate_scene_node, retry_policy=retry_policy)
+        workflow.add_node("aggregate_scenes", aggregate_scenes_node)
+    else:
+        if variant == "batch":
+            workflow.add_node("generate_images_batch", generate_images_batch_node, retry_policy=retry_policy)
+        else:
+            workflow.add_node("generate_image", generate_image_node, retry_policy=retry_policy)
+        workflow.add_node("aggregate_images", aggregate_images_node)
 
-    workflow.add_node("generate_video", generate_video_node, retry_policy=retry_policy)
-    workflow.add_node("aggregate_videos", aggregate_videos_node)
+        workflow.add_node("generate_video", generate_video_node, retry_policy=retry_policy)
+        workflow.add_node("aggregate_videos", aggregate_videos_node)
 
     workflow.add_node("compose", compose_node)
     workflow.add_node("narrator", narrator_node)
@@ -96,29 +149,105 @@ def create_graph():
     workflow.add_edge(START, "init")
     workflow.add_edge("init", "writer")
 
-    # 图像生成（并发 - 使用 map-reduce 模式）
-    workflow.add_conditional_edges("writer", route_images, ["generate_image"])
-    workflow.add_edge("generate_image", "aggregate_images")
-
-    # 视频生成（并发 - 使用 map-reduce 模式）
-    workflow.add_conditional_edges("aggregate_images", route_videos, ["generate_video"])
-    workflow.add_edge("generate_video", "aggregate_videos")
+    if variant == "pipelined":
+        # 场景流水线（并发 - 每个场景 图像 → 视频，只等待视频全部结束）
+        workflow.add_conditional_edges("writer", route_scenes, ["generate_scene", END])
+        workflow.add_edge("generate_scene", "aggregate_scenes")
+        last_aggregate = "aggregate_scenes"
+    else:
+        if variant == "batch":
+            # 图像生成（组图 - 一次请求生成所有场景）
+            workflow.add_conditional_edges("writer", route_images_batch, ["generate_images_batch", END])
+            workflow.add_edge("generate_images_batch", "aggregate_images")
+        else:
+            # 图像生成（并发 - 使用 map-reduce 模式）
+            workflow.add_conditional_edges("writer", route_images, ["generate_image", END])
+            workflow.add_edge("generate_image", "aggregate_images")
+
+        # 视频生成（并发 - 使用 map-reduce 模式）
+        workflow.add_conditional_edges("aggregate_images", route_videos, ["generate_video", END])
+        workflow.add_edge("generate_video", "aggregate_videos")
+        last_aggregate = "aggregate_videos"
 
     # 判断是否继续合成
     workflow.add_conditional_edges(
-        "aggregate_videos",
+        last_aggregate,
         should_continue_to_compose,
         {"continue": "compose", "skip": END},
     )
 
-    # 合成后进行语音合成
-    workflow.add_edge("compose", "narrator")
-    workflow.add_edge("narrator", "add_audio")
+    # 语音合成（与图像/视频生成并行，在 add_audio 处与合成视频汇合）
+    workflow.add_conditional_edges("writer", route_narration, ["narrator", END])
+    workflow.add_edge(["compose", "narrator"], "add_audio")
     workflow.add_edge("add_audio", END)
 
     # 编译
-    checkpointer = MemorySaver()
-    return workflow.compile(checkpointer=checkpointer)
+    return workflow.compile(checkpointer=checkpointer or get_checkpointer())
+
+
+# ============================================================================
+# 已编译工作流注册表
+# ============================================================================
+
+_checkpointer: BaseCheckpointSaver | None = None
+_graphs: dict[str, CompiledStateGraph] = {}
+
+
+def get_checkpointer() -> BaseCheckpointSaver:
+    """
+    获取进程共享的检查点存储（各任务按 thread_id 隔离）
+
+    CHECKPOINT_BACKEND=database 时写入数据库，进程重启后任务仍可恢复；
+    memory 时保存在进程内存中（有界，按任务数与 TTL 淘汰）。
+    """
+    global _checkpointer
+    if _checkpointer is None:
+        backend = get_settings().checkpoint_backend
+        if backend == "database":
+            from .checkpointer import SQLCheckpointSaver
+            _checkpointer = SQLCheckpointSaver()
+        elif backend == "memory":
+            from ..services.metrics import register_metrics
+            from .checkpointer import BoundedMemorySaver
+            settings = get_settings()
+            _checkpointer = BoundedMemorySaver(
+                max_threads=settings.checkpoint_max_threads,
+                ttl=settings.checkpoint_ttl,
+                keep_latest=settings.checkpoint_keep_latest,
+            )
+            register_metrics("checkpoints", _checkpointer.stats)
+        else:
+            raise ValueError(f"未知的检查点存储: {backend}，可选 database, memory")
+    return _checkpointer
+
+
+def get_graph(variant: str | None = None) -> CompiledStateGraph:
+    """
+    获取已编译的工作流（按变体缓存，所有请求共享）
+
+    编译后的工作流不保存运行状态，可被多个任务并发调用。
+    """
+    variant = variant or get_settings().graph_variant
+    graph = _graphs.get(variant)
+    if graph is None:
+        graph = _graphs[variant] = create_graph(variant)
+        logger.info(f"工作流已编译: variant={variant}")
+    return graph
+
+
+async def get_task_graph(thread_id: str) -> CompiledStateGraph | None:
+    """按任务检查点中记录的变体获取工作流（任务没有检查点时返回 None）"""
+    checkpoint = await get_checkpointer().aget({"configurable": {"thread_id": thread_id}})
+    if checkpoint is None:
+        return None
+    task_config = checkpoint["channel_values"].get("config") or {}
+    return get_graph(task_config.get("graph_variant"))
+
+
+def warm_graphs() -> None:
+    """预编译所有工作流变体（在应用启动时调用）"""
+    for variant in GRAPH_VARIANTS:
+        get_graph(variant)
 
 
 async def generate_video(
@@ -129,6 +258,7 @@ async def generate_video(
     science_type: str | None = None,  # 向后兼容
     style_preset: str | None = None,  # 向后兼容
     thread_id: str | None = None,
+    bypass_cache: bool = False,
 ) -> dict:
     """
     生成视频
@@ -141,11 +271,12 @@ async def generate_video(
         science_type: 向后兼容参数
         style_preset: 向后兼容参数（映射到style）
         thread_id: 会话ID
+        bypass_cache: 跳过文案缓存，强制重新生成
 
     Returns:
         生成结果字典
     """
-    graph = create_graph()
+    graph = get_graph()
 
     config = {
         "configurable": {"thread_id": thread_id or uuid.uuid4().hex}
@@ -170,9 +301,12 @@ async def generate_video(
             "philosopher": philosopher,
             "science_type": science_type,
             "style_preset": style_preset,
+            "bypass_cache": bypass_cache,
+            # 任务恢复时按该变体取工作流
+            "graph_variant": get_settings().graph_variant,
         },
         "step": "init",
     }
 
-    result = await graph.ainvoke(initial_state, config)
+    result = await graph.ainvoke(initial_state, config, durability=get_settings().checkpoint_durability)
     return result
@@ -3,8 +3,16 @@
 """
 from .init import init_node
 from .writer import writer_node
-from .images import route_images_node, generate_image_node, aggregate_images_node
+from .images import (
+    route_images_node,
+    generate_image_node,
+    generate_images_batch_node,
+    aggregate_images_node,
+    build_image_task,
+    prefetch_image,
+)
 from .videos import route_videos_node, generate_video_node, aggregate_videos_node
+from .scenes import generate_scene_node, aggregate_scenes_node
 from .compose import compose_node
 from .audio import narrator_node, add_audio_node
 
@@ -13,10 +21,15 @@ __all__ = [
     "writer_node",
     "route_images_node",
     "generate_image_node",
+    "generate_images_batch_node",
     "aggregate_images_node",
+    "build_image_task",
+    "prefetch_image",
     "route_videos_node",
     "generate_video_node",
     "aggregate_videos_node",
+    "generate_scene_node",
+    "aggregate_scenes_node",
     "compose_node",
     "narrator_node",
     "add_audio_node",
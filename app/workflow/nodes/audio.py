@@ -5,6 +5,7 @@ import logging
 import uuid
 import asyncio
 import json
+import shutil
 import tempfile
 from pathlib import Path
 
@@ -15,17 +16,17 @@ logger = logging.getLogger(__name__)
 
 
 async def _download_to_temp(url: str) -> Path:
-    """下载 MinIO 文件到临时目录"""
-    import httpx
-
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        r = await client.get(url)
-        r.raise_for_status()
+    """下载存储中的文件到临时目录（本地存储后端直接硬链接）"""
+    from ...services import get_storage_service
 
     # 创建临时文件
     suffix = Path(url).suffix or ".mp4"
     temp_file = Path(tempfile.gettempdir()) / f"{uuid.uuid4().hex}{suffix}"
-    temp_file.write_bytes(r.content)
+    try:
+        await get_storage_service().afetch_to_file(url, temp_file)
+    except Exception:
+        temp_file.unlink(missing_ok=True)
+        raise
     return temp_file
 
 
@@ -50,51 +51,122 @@ async def get_media_duration(file_path: str) -> float:
     return float(result["format"]["duration"])
 
 
-async def narrator_node(state: AgentState) -> dict:
-    """TTS 生成配音"""
-    scenes = state.get("scenes", [])
-    composed_url = state.get("composed_video_url")
+async def _synthesize_scene(tts, scene: dict, work_dir: Path, semaphore: asyncio.Semaphore) -> Path:
+    """合成单个场景的配音（失败时单独重试该场景）"""
+    settings = get_settings()
+    dest = work_dir / f"scene_{scene['id']}.{tts.encoding}"
+    attempts = settings.tts_scene_retries + 1
 
-    if not composed_url:
-        return {
-            "step": "failed",
-            "errors": ["没有已合成的视频"],
-        }
+    for attempt in range(1, attempts + 1):
+        try:
+            async with semaphore:
+                return await tts.synthesize_to_file(text=scene["text"], dest=dest)
+        except Exception as e:
+            if attempt >= attempts:
+                raise
+            logger.warning(f"场景 {scene['id']} 配音失败，重试 {attempt}/{attempts - 1}: {e}")
+            await asyncio.sleep(attempt)
+
+
+async def _concat_audio(paths: list[Path], output_path: Path) -> None:
+    """按顺序拼接多段音频"""
+    list_file = output_path.with_suffix(".txt")
+    list_file.write_text("".join(f"file '{p}'\n" for p in paths))
+
+    cmd = [
+        "ffmpeg",
+        "-f", "concat",
+        "-safe", "0",
+        "-i", str(list_file),
+        "-c", "copy",
+        "-y",
+        str(output_path),
+    ]
+
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+
+    stdout, stderr = await process.communicate()
 
-    # 合并所有文案
-    full_text = " ".join([s["text"] for s in scenes])
+    if process.returncode != 0:
+        raise RuntimeError(f"FFmpeg 音频拼接失败: {stderr.decode()}")
+
+
+async def narrator_node(state: AgentState) -> dict:
+    """
+    TTS 生成配音（逐场景并发合成后拼接，并记录每个场景的时间区间）
+
+    配音只依赖文案，与图像/视频生成并行执行，不写入 step（避免与并行分支冲突），
+    由 add_audio 汇合。失败时 audio_url 为空，add_audio 直接输出无配音的视频。
+    """
+    scenes = state.get("scenes", [])
 
     from ...services import get_tts_service
     tts = get_tts_service()
 
+    settings = get_settings()
+    semaphore = asyncio.Semaphore(settings.tts_max_concurrency)
+    narrated = [s for s in scenes if s.get("text", "").strip()]
+    work_dir = Path(tempfile.mkdtemp(prefix="narration-"))
+
     try:
-        audio_url = await tts.synthesize(text=full_text)
+        # 逐场景并发合成
+        paths = await asyncio.gather(*[
+            _synthesize_scene(tts, scene, work_dir, semaphore) for scene in narrated
+        ])
+        durations = await asyncio.gather(*[get_media_duration(p) for p in paths])
+
+        # 拼接为完整配音
+        narration_path = work_dir / f"narration.{tts.encoding}"
+        await _concat_audio(paths, narration_path)
+
+        # 场景 -> (开始, 结束) 时间映射
+        timings = {}
+        cursor = 0.0
+        for scene, duration in zip(narrated, durations, strict=True):
+            timings[str(scene["id"])] = (round(cursor, 3), round(cursor + duration, 3))
+            cursor += duration
+        logger.info(f"配音合成完成: {len(narrated)} 段, 总时长 {cursor:.2f}秒")
+
+        from ...services.storage import get_storage_service
+        storage = get_storage_service()
+        audio_url = await storage.aupload_file(narration_path, "audio/mpeg")
 
         return {
             "audio_url": audio_url,
-            "step": "adding_audio",
+            "narration_timings": timings,
         }
 
     except Exception as e:
         logger.error(f"语音合成失败: {e}")
-        # Fallback: 直接使用合成视频作为最终视频
-        logger.info(f"TTS服务不可用，使用无音频视频作为最终输出: {composed_url}")
         return {
-            "final_video_url": composed_url,  # 直接使用合成视频
-            "audio_url": "",  # 清空音频URL，触发直接完成
-            "step": "done",  # 跳过add_audio步骤
+            "audio_url": "",  # 清空音频URL，add_audio 直接使用合成视频
         }
 
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
 
 async def add_audio_node(state: AgentState) -> dict:
     """将配音混合到视频，自动适配时长，并添加背景音乐"""
     composed_url = state.get("composed_video_url")
     audio_url = state.get("audio_url")
 
-    if not composed_url or not audio_url:
+    if not composed_url:
         return {
             "step": "failed",
-            "errors": ["缺少视频或音频"],
+            "errors": ["没有已合成的视频"],
+        }
+
+    if not audio_url:
+        # Fallback: 配音失败时直接使用合成视频作为最终视频
+        logger.info(f"TTS服务不可用，使用无音频视频作为最终输出: {composed_url}")
+        return {
+            "final_video_url": composed_url,
+            "step": "done",
         }
 
     settings = get_settings()
@@ -188,7 +260,7 @@ async def add_audio_node(state: AgentState) -> dict:
         from ...services.storage import get_storage_service
         storage = get_storage_service()
 
-        minio_url = storage.upload_file(output_path, "video/mp4")
+        minio_url = await storage.aupload_file(output_path, "video/mp4")
         logger.info(f"最终视频已上传到 MinIO: {minio_url}")
 
         return {
@@ -14,17 +14,17 @@ logger = logging.getLogger(__name__)
 
 
 async def _download_to_temp(url: str) -> Path:
-    """下载 MinIO 文件到临时目录"""
-    import httpx
-
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        r = await client.get(url)
-        r.raise_for_status()
+    """下载存储中的文件到临时目录（本地存储后端直接硬链接）"""
+    from ...services import get_storage_service
 
     # 创建临时文件
     suffix = Path(url).suffix or ".mp4"
     temp_file = Path(tempfile.gettempdir()) / f"{uuid.uuid4().hex}{suffix}"
-    temp_file.write_bytes(r.content)
+    try:
+        await get_storage_service().afetch_to_file(url, temp_file)
+    except Exception:
+        temp_file.unlink(missing_ok=True)
+        raise
     return temp_file
 
 
@@ -93,12 +93,12 @@ async def compose_node(state: AgentState) -> dict:
         from ...services.storage import get_storage_service
         storage = get_storage_service()
 
-        minio_url = storage.upload_file(output_path, "video/mp4")
+        minio_url = await storage.aupload_file(output_path, "video/mp4")
         logger.info(f"合成视频已上传到 MinIO: {minio_url}")
 
         return {
             "composed_video_url": minio_url,
-            "step": "narrating",
+            "step": "adding_audio",  # 配音已在 writer 之后并行合成
         }
 
     finally:
@@ -1,10 +1,13 @@
 """
 图像生成节点 - 支持角色一致性
 """
+import asyncio
 import logging
 from typing import Literal
 
+from langchain_core.runnables import RunnableConfig
 from langgraph.types import Send
+from ...config import get_settings
 from ...state import AgentState, Scene
 from ...style_base import build_character_card
 
@@ -66,9 +69,53 @@ def route_images_node(state: AgentState):
     return sends
 
 
-async def generate_image_node(task: dict) -> dict:
+def build_image_task(scene: Scene, style_seed: int) -> dict:
+    """构建单个场景的图像生成任务（Send 负载）"""
+    return {"scene": scene, "style_seed": style_seed}
+
+
+def build_image_request(task: dict) -> dict:
+    """根据图像生成任务构建图像服务的请求参数"""
+    from ...style_base import build_stylized_prompt_with_character
+
+    scene = task["scene"]
+    ref_image_path = task.get("ref_image_path")  # 串行模式下的参考图路径
+
+    # 构建增强提示词（含角色卡）
+    enhanced_prompt = build_stylized_prompt_with_character(
+        base_prompt=scene["image_prompt"],
+        emotion=scene.get("emotion", "共鸣"),
+        character_card=task.get("character_card"),
+        style=task.get("style", "camus"),  # 获取风格，默认为camus
+        include_camera=True,
+    )
+
+    return {
+        "prompt": enhanced_prompt,
+        "seed": task["style_seed"],
+        "ref_image_list": [ref_image_path] if ref_image_path else None,
+    }
+
+
+def prefetch_image(task: dict) -> str:
     """
-    生成单个图像
+    在后台提前发起图像生成（文案流式生成阶段调用）
+
+    之后 generate_image_node 处理同一任务时会直接复用该请求。
+    """
+    from ...services import get_image_service
+    return get_image_service().prefetch(**build_image_request(task))
+
+
+async def generate_image_node(task: dict, config: RunnableConfig) -> dict:
+    """生成单个图像，结果写入 image_tasks"""
+    entry = await run_image_task(task, config)
+    return {"image_tasks": {str(task["scene"]["id"]): entry}}
+
+
+async def run_image_task(task: dict, config: RunnableConfig) -> dict:
+    """
+    生成单个图像，返回 image_tasks 中该场景的结果
 
     支持角色一致性：
     - 角色卡模式：在提示词中嵌入角色描述
@@ -76,68 +123,106 @@ async def generate_image_node(task: dict) -> dict:
 
     支持多风格：
     - camus/healing/knowledge/humor/growth/minimal 等风格
+
+    失败时在节点内重试，已生成但未上传成功的图像通过幂等记录复用。
     """
     scene = task["scene"]
-    style_seed = task["style_seed"]
     scene_id = str(scene["id"])
-    character_card = task.get("character_card")
-    style_name = task.get("style", "camus")  # 获取风格，默认为camus
-    serial_generation = task.get("serial_generation", False)
-    ref_image_path = task.get("ref_image_path")  # 串行模式下的参考图路径
 
     from ...services import get_image_service
-    from ...style_base import build_stylized_prompt_with_character
+    from ...services.idempotency import get_idempotency_store, task_id_from_config
     image_service = get_image_service()
 
+    attempts = get_settings().image_scene_retries + 1
     try:
-        # 构建增强提示词（含角色卡）
-        enhanced_prompt = build_stylized_prompt_with_character(
-            base_prompt=scene["image_prompt"],
-            emotion=scene.get("emotion", "共鸣"),
-            character_card=character_card,
-            style=style_name,  # 传递风格参数
-            include_camera=True,
+        request = build_image_request(task)
+        record = await get_idempotency_store().open(
+            task_id_from_config(config), scene["id"], "image",
+            request["prompt"], request["seed"], request["ref_image_list"],
         )
 
-        # 准备参考图列表
-        ref_image_list = [ref_image_path] if ref_image_path else None
-
         logger.info(f"开始生成图像 scene {scene_id}: {scene['image_prompt'][:50]}...")
-        if ref_image_list:
-            logger.info(f"  使用参考图: {ref_image_path}")
+        if request["ref_image_list"]:
+            logger.info(f"  使用参考图: {request['ref_image_list'][0]}")
 
         # 获取云 URL（用于视频生成）和 MinIO URL（用于前端展示）
-        cloud_url, minio_url = await image_service.generate(
-            prompt=enhanced_prompt,
-            seed=style_seed,
-            ref_image_list=ref_image_list,
-        )
+        for attempt in range(1, attempts + 1):
+            try:
+                cloud_url, minio_url = await image_service.generate(**request, record=record)
+                break
+            except Exception as e:
+                if attempt >= attempts:
+                    raise
+                logger.warning(f"场景 {scene_id} 图像生成失败，重试 {attempt}/{attempts - 1}: {e}")
+                await asyncio.sleep(attempt)
 
         logger.info(f"图像生成成功 scene {scene_id}: cloud_url={cloud_url[:80]}..., minio_url={minio_url}")
 
         return {
-            "image_tasks": {
-                scene_id: {
-                    "status": "completed",
-                    "image_url": minio_url,          # 前端展示用 MinIO URL
-                    "image_cloud_url": cloud_url,    # 视频生成用云 URL
-                    "scene_id": scene["id"],
-                }
-            }
+            "status": "completed",
+            "image_url": minio_url,          # 前端展示用 MinIO URL
+            "image_cloud_url": cloud_url,    # 视频生成用云 URL
+            "scene_id": scene["id"],
         }
 
     except Exception as e:
         logger.error(f"图像生成失败 (scene {scene_id}): {e}", exc_info=True)
         return {
-            "image_tasks": {
-                scene_id: {
-                    "status": "failed",
-                    "error": str(e),
-                    "scene_id": scene["id"],
-                }
+            "status": "failed",
+            "error": str(e),
+            "scene_id": scene["id"],
+        }
+
+
+async def generate_images_batch_node(state: AgentState) -> dict:
+    """
+    组图模式：一次请求生成所有场景的图像
+
+    替代逐场景的 Send 分发。同一组图由模型一次生成，角色与画风天然一致；
+    场景数超过单次上限时由图像服务自动拆分。结果写入 image_tasks，交给 aggregate_images 聚合。
+    """
+    scenes = state.get("scenes", [])
+    style_seed = state.get("style_seed", 0)
+
+    from ...services import get_image_service
+    image_service = get_image_service()
+
+    requests = [build_image_request(build_image_task(scene, style_seed)) for scene in scenes]
+    logger.info(f"组图生成: {len(scenes)} 个场景, seed={style_seed}")
+
+    try:
+        results = await image_service.generate_batch(
+            prompts=[request["prompt"] for request in requests],
+            seed=style_seed,
+        )
+    except Exception as e:
+        logger.error(f"组图生成失败: {e}", exc_info=True)
+        results = [None] * len(scenes)
+        error = str(e)
+    else:
+        error = "组图未返回该场景的图像"
+
+    image_tasks = {}
+    for scene, result in zip(scenes, results, strict=True):
+        scene_id = str(scene["id"])
+        if result is None:
+            image_tasks[scene_id] = {
+                "status": "failed",
+                "error": error,
+                "scene_id": scene["id"],
             }
+            continue
+
+        cloud_url, minio_url = result
+        image_tasks[scene_id] = {
+            "status": "completed",
+            "image_url": minio_url,
+            "image_cloud_url": cloud_url,
+            "scene_id": scene["id"],
         }
 
+    return {"image_tasks": image_tasks}
+
 
 async def aggregate_images_node(state: AgentState) -> dict:
     """聚合图像结果"""
@@ -0,0 +1,77 @@
+"""
+场景流水线节点 - 每个场景独立完成 图像 → 视频
+"""
+import logging
+
+from langchain_core.runnables import RunnableConfig
+
+from ...state import AgentState
+from .images import run_image_task
+from .videos import run_video_task
+
+logger = logging.getLogger(__name__)
+
+
+async def generate_scene_node(task: dict, config: RunnableConfig) -> dict:
+    """
+    生成单个场景的图像和视频
+
+    图像完成后立即为该场景创建视频任务，不等待其他场景的图像；
+    图像失败的场景不生成视频。任务负载与 generate_image 相同（见 build_image_task）。
+    """
+    scene = task["scene"]
+    scene_id = str(scene["id"])
+
+    image_entry = await run_image_task(task, config)
+    result = {"image_tasks": {scene_id: image_entry}}
+    if image_entry["status"] != "completed":
+        return result
+
+    scene_with_image = {
+        **scene,
+        "image_url": image_entry["image_url"],
+        "image_cloud_url": image_entry["image_cloud_url"],
+    }
+    result["video_tasks"] = {scene_id: await run_video_task(scene_with_image, config)}
+    return result
+
+
+async def aggregate_scenes_node(state: AgentState) -> dict:
+    """聚合各场景的图像和视频结果"""
+    scenes = state.get("scenes", [])
+    image_tasks = state.get("image_tasks", {})
+    video_tasks = state.get("video_tasks", {})
+
+    completed_images = 0
+    completed_videos = 0
+    updated_scenes = []
+
+    for scene in scenes:
+        scene_id = str(scene["id"])
+        updated_scene = dict(scene)
+
+        image_result = image_tasks.get(scene_id)
+        if image_result and image_result.get("status") == "completed":
+            updated_scene["image_url"] = image_result.get("image_url")
+            updated_scene["image_cloud_url"] = image_result.get("image_cloud_url", "")
+            completed_images += 1
+        elif image_result:
+            logger.warning(f"场景 {scene_id} 图像生成失败: {image_result.get('error')}")
+
+        video_result = video_tasks.get(scene_id)
+        if video_result and video_result.get("status") == "completed":
+            updated_scene["video_url"] = video_result.get("video_url")
+            completed_videos += 1
+        elif video_result:
+            logger.warning(f"场景 {scene_id} 视频生成失败: {video_result.get('error')}")
+
+        updated_scenes.append(updated_scene)
+
+    logger.info(f"场景聚合完成: 图像 {completed_images}/{len(scenes)}, 视频 {completed_videos}/{len(scenes)}")
+
+    return {
+        "scenes": updated_scenes,
+        "completed_images": completed_images,
+        "completed_videos": completed_videos,
+        "step": "composing" if completed_videos > 0 else "failed",
+    }
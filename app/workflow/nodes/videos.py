@@ -1,10 +1,13 @@
 """
 视频生成节点
 """
+import asyncio
 import logging
 from typing import Literal
 
+from langchain_core.runnables import RunnableConfig
 from langgraph.types import Send
+from ...config import get_settings
 from ...state import AgentState, Scene
 
 logger = logging.getLogger(__name__)
@@ -26,48 +29,65 @@ def route_videos_node(state: AgentState):
     return sends
 
 
-async def generate_video_node(task: dict) -> dict:
-    """生成单个视频"""
-    scene = task["scene"]
+async def generate_video_node(task: dict, config: RunnableConfig) -> dict:
+    """生成单个视频，结果写入 video_tasks"""
+    entry = await run_video_task(task["scene"], config)
+    return {"video_tasks": {str(task["scene"]["id"]): entry}}
+
+
+async def run_video_task(scene: Scene, config: RunnableConfig) -> dict:
+    """
+    生成单个视频，返回 video_tasks 中该场景的结果
+
+    失败时在节点内重试；每一步的中间结果（Seedance 任务 ID、视频 URL、MinIO URL）
+    写入幂等记录，重试时从断点继续，不会重复创建付费任务。
+    """
     # 使用云存储 URL（火山引擎可以访问）
     image_url = scene.get("image_cloud_url", "")
 
     from ...services import get_video_service
+    from ...services.idempotency import get_idempotency_store, task_id_from_config
     video_service = get_video_service()
 
     # 测试模式：限制视频时长为 2 秒
     test_duration = min(scene.get("duration", 2.0), 2.0)
 
+    attempts = get_settings().video_scene_retries + 1
     try:
-        logger.info(f"开始生成视频 scene {scene['id']}, cloud_url={image_url[:50] if image_url else 'None'}...")
-        video_url = await video_service.generate(
-            image_url=image_url,
-            prompt=scene["image_prompt"],
-            duration=test_duration,
+        record = await get_idempotency_store().open(
+            task_id_from_config(config), scene["id"], "video", image_url, scene["image_prompt"],
         )
 
+        logger.info(f"开始生成视频 scene {scene['id']}, cloud_url={image_url[:50] if image_url else 'None'}...")
+        for attempt in range(1, attempts + 1):
+            try:
+                video_url = await video_service.generate(
+                    image_url=image_url,
+                    prompt=scene["image_prompt"],
+                    duration=test_duration,
+                    record=record,
+                )
+                break
+            except Exception as e:
+                if attempt >= attempts:
+                    raise
+                logger.warning(f"场景 {scene['id']} 视频生成失败，重试 {attempt}/{attempts - 1}: {e}")
+                await asyncio.sleep(attempt)
+
         logger.info(f"视频生成成功 scene {scene['id']}: {video_url}")
 
         return {
-            "video_tasks": {
-                str(scene['id']): {
-                    "status": "completed",
-                    "video_url": video_url,
-                    "scene_id": scene["id"],
-                }
-            }
+            "status": "completed",
+            "video_url": video_url,
+            "scene_id": scene["id"],
         }
 
     except Exception as e:
         logger.error(f"视频生成失败 (scene {scene['id']}): {e}", exc_info=True)
         return {
-            "video_tasks": {
-                str(scene['id']): {
-                    "status": "failed",
-                    "error": str(e),
-                    "scene_id": scene["id"],
-                }
-            }
+            "status": "failed",
+            "error": str(e),
+            "scene_id": scene["id"],
         }
 
 
@@ -6,6 +6,7 @@
 import logging
 import random
 
+from ...config import get_settings
 from ...state import AgentState, Scene
 from ...style_base import (
     build_stylized_prompt,
@@ -29,11 +30,12 @@ from ...style.presets import STYLE_PRESETS
 logger = logging.getLogger(__name__)
 
 
-def _get_hook_template(hook_type: str) -> str:
+def _get_hook_template(hook_type: str, rng: random.Random | None = None) -> str:
     """获取钩子模板"""
+    rng = rng or random
     if hook_type in GOLDEN_3S_HOOKS:
-        return random.choice(GOLDEN_3S_HOOKS[hook_type]["templates"])
-    return random.choice(GOLDEN_3S_HOOKS["curiosity"]["templates"])
+        return rng.choice(GOLDEN_3S_HOOKS[hook_type]["templates"])
+    return rng.choice(GOLDEN_3S_HOOKS["curiosity"]["templates"])
 
 
 def _get_cta_hook(cta_type: str = "question") -> str:
@@ -80,53 +82,62 @@ async def writer_node(state: AgentState) -> dict:
     from ...services import get_llm_service
     llm = get_llm_service()
 
-    # 构建用户提示词
+    # 构建用户提示词（钩子/金句的随机选择由风格种子决定，
+    # 相同主题/风格/子主题得到相同提示词，从而可以命中缓存）
     user_prompt = _build_user_prompt(
         topic=topic,
         style=style_name,
         theme=theme,
         style_config=style_config,
+        rng=random.Random(f"{style_seed}:{style_name}:{theme}"),
     )
 
+    bypass_cache = config.get("bypass_cache", False)
+    prefetch_keys: list[str] = []
+
     try:
-        result = await llm.generate_json(
-            prompt=user_prompt,
-            system_prompt=system_prompt,
-        )
+        raw_scenes = []
+        settings = get_settings()
+        if settings.llm_stream_scenes:
+            # 流式生成：每解析出一个完整场景就提前发起该场景的图像生成（组图模式在文案完成后统一生成）
+            from .images import build_image_task, prefetch_image
+            prefetch = settings.graph_variant != "batch"
+
+            async for s in llm.stream_json_items(
+                prompt=user_prompt,
+                key="scenes",
+                system_prompt=system_prompt,
+                use_cache=True,
+                bypass_cache=bypass_cache,
+            ):
+                raw_scenes.append(s)
+                if not prefetch:
+                    continue
+                try:
+                    base_scene = _build_scene(s, s["text"], style_name)
+                    prefetch_keys.append(prefetch_image(build_image_task(base_scene, style_seed)))
+                except Exception as e:
+                    logger.warning(f"场景图像预取失败 (scene {s.get('id')}): {e}")
+        else:
+            result = await llm.generate_json(
+                prompt=user_prompt,
+                system_prompt=system_prompt,
+                use_cache=True,
+                bypass_cache=bypass_cache,
+            )
+            raw_scenes = result.get("scenes", [])
 
         scenes = []
-        scene_list = result.get("scenes", [])
-
-        for i, s in enumerate(scene_list, 1):
-            original_text = s["text"]
-            emotion = s.get("emotion", "共鸣")
-            scene_type = s.get("type", "hook")
-
+        for i, s in enumerate(raw_scenes, 1):
             # 风格适配（对于需要适配的风格）
             adapted_text = _adapt_text_by_style(
-                original_text=original_text,
-                emotion=emotion,
+                original_text=s["text"],
+                emotion=s.get("emotion", "共鸣"),
                 style_name=style_name,
-                is_last_scene=(i == len(scene_list)),
+                is_last_scene=(i == len(raw_scenes)),
                 style_config=style_config,
             )
-
-            # 增强图像提示词
-            enhanced_prompt = build_stylized_prompt(
-                s["image_prompt"],
-                emotion,
-                style=style_name,
-            )
-
-            scene: Scene = {
-                "id": s["id"],
-                "text": adapted_text,
-                "type": s["type"],
-                "duration": float(s["duration"]),
-                "emotion": emotion,
-                "image_prompt": enhanced_prompt,
-            }
-            scenes.append(scene)
+            scenes.append(_build_scene(s, adapted_text, style_name))
 
         logger.info(f"{style_name} 风格文案生成成功: {len(scenes)} 句 (主题={theme or style_name})")
 
@@ -138,25 +149,51 @@ async def writer_node(state: AgentState) -> dict:
 
     except Exception as e:
         logger.error(f"文案生成失败: {e}")
+        if prefetch_keys:
+            from ...services import get_image_service
+            get_image_service().cancel_prefetch(prefetch_keys)
         return {
             "step": "failed",
             "errors": [f"文案生成失败: {str(e)}"],
         }
 
 
+def _build_scene(raw: dict, text: str, style_name: str) -> Scene:
+    """根据 LLM 输出的原始场景构建 Scene（增强图像提示词）"""
+    emotion = raw.get("emotion", "共鸣")
+
+    # 增强图像提示词
+    enhanced_prompt = build_stylized_prompt(
+        raw["image_prompt"],
+        emotion,
+        style=style_name,
+    )
+
+    return {
+        "id": raw["id"],
+        "text": text,
+        "type": raw["type"],
+        "duration": float(raw["duration"]),
+        "emotion": emotion,
+        "image_prompt": enhanced_prompt,
+    }
+
+
 def _build_user_prompt(
     topic: str,
     style: str,
     theme: str,
     style_config,
+    rng: random.Random | None = None,
 ) -> str:
     """构建用户提示词"""
+    rng = rng or random
     parts = []
 
     # 添加风格特定的钩子指导
     if style_config.hook_types:
-        hook_type = random.choice(style_config.hook_types)
-        hook_template = _get_hook_template(hook_type)
+        hook_type = rng.choice(style_config.hook_types)
+        hook_template = _get_hook_template(hook_type, rng)
         parts.append(f"【开头钩子参考】\n{hook_template}\n")
 
     # 添加框架指导
@@ -173,7 +210,7 @@ def _build_user_prompt(
         quote_theme = theme or list(style_config.quotes.keys())[0]
         quotes = style_config.quotes.get(quote_theme, [])
         if quotes:
-            quote = random.choice(quotes)
+            quote = rng.choice(quotes)
             parts.append(f"【参考金句】\n「{quote}」\n")
 
     parts.append(f"【主题】\n{topic}")
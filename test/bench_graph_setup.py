@@ -0,0 +1,61 @@
+"""
+工作流构建开销压测
+
+对比每个请求调用 create_graph()（重新构建 StateGraph、编译并创建检查点存储）
+与 get_graph()（复用进程内已编译的工作流）的单次耗时。只测构建开销，不执行工作流。
+
+用法:
+    python test/bench_graph_setup.py --iterations 200
+"""
+import argparse
+import statistics
+import time
+
+from conftest import apply_env_defaults
+
+# 只构建工作流，不访问外部服务
+apply_env_defaults()
+
+
+def _measure(fn, iterations: int) -> list[float]:
+    """执行 iterations 次，返回每次耗时（毫秒）"""
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def _report(name: str, samples: list[float]) -> None:
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+    print(f"{name:<28} mean={statistics.mean(samples):8.3f}ms  p50={statistics.median(samples):8.3f}ms  p95={p95:8.3f}ms")
+
+
+def main(iterations: int, variant: str | None) -> None:
+    from langgraph.checkpoint.memory import MemorySaver
+
+    from app.config import get_settings
+    from app.workflow import create_graph, get_graph, warm_graphs
+
+    variant = variant or get_settings().graph_variant
+    print(f"===== 工作流构建开销: variant={variant}, iterations={iterations} =====")
+
+    # 之前：每个请求重新构建并编译，且各自创建检查点存储
+    _report("create_graph() 每请求", _measure(lambda: create_graph(variant, checkpointer=MemorySaver()), iterations))
+
+    # 之后：启动时预编译，请求只做注册表查找
+    started = time.perf_counter()
+    warm_graphs()
+    print(f"{'warm_graphs() 启动一次':<28} {(time.perf_counter() - started) * 1000:8.3f}ms")
+    _report("get_graph() 每请求", _measure(lambda: get_graph(variant), iterations))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="工作流构建开销压测")
+    parser.add_argument("--iterations", type=int, default=200, help="每种方式的执行次数")
+    parser.add_argument("--variant", default=None, help="工作流变体（默认取 GRAPH_VARIANT）")
+    args = parser.parse_args()
+
+    main(args.iterations, args.variant)
@@ -0,0 +1,89 @@
+"""
+完整工作流压测（模拟提供商）
+
+使用本地模拟提供商（PROVIDER=fake）和本地存储（STORAGE_BACKEND=local），
+不消耗真实配额，在笔记本上即可压测 create_graph() 的完整流程（需要 ffmpeg / ffprobe）。
+
+用法:
+    python test/bench_pipeline.py --runs 20 --concurrency 5
+    FAKE_VIDEO_LATENCY=5 FAKE_FAILURE_RATE=0.05 FAKE_RPM=120 python test/bench_pipeline.py --variant batch
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+from conftest import apply_env_defaults
+
+# 压测默认使用模拟提供商与本地存储；依赖数据库的生成结果缓存默认关闭，工作流检查点保存在内存中
+apply_env_defaults({
+    "PROVIDER": "fake",
+    "STORAGE_BACKEND": "local",
+    "LLM_CACHE_ENABLED": "false",
+    "IMAGE_CACHE_ENABLED": "false",
+    "TTS_CACHE_ENABLED": "false",
+    "BGM_ENABLED": "false",
+    "CHECKPOINT_BACKEND": "memory",
+    "VIDEO_POLL_MIN_INTERVAL": "0.5",
+})
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def _run_one(index: int, semaphore: asyncio.Semaphore) -> tuple[float, bool]:
+    from app.services.context import set_task_id
+    from app.workflow import generate_video
+
+    async with semaphore:
+        set_task_id(f"bench-{index}")
+        started = time.perf_counter()
+        try:
+            result = await generate_video(topic=f"压测主题 {index}", style="minimal")
+            ok = bool(result.get("final_video_url"))
+        except Exception as e:
+            print(f"  run {index} 失败: {e}")
+            ok = False
+        return time.perf_counter() - started, ok
+
+
+async def main(runs: int, concurrency: int) -> None:
+    from app.config import get_settings
+    from app.services.metrics import collect_metrics
+
+    semaphore = asyncio.Semaphore(concurrency)
+    started = time.perf_counter()
+    results = await asyncio.gather(*[_run_one(i, semaphore) for i in range(runs)])
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for latency, _ in results]
+    succeeded = sum(1 for _, ok in results if ok)
+
+    print(f"\n===== 工作流压测: variant={get_settings().graph_variant}, runs={runs}, concurrency={concurrency} =====")
+    print(f"成功: {succeeded}/{runs}, 总耗时: {elapsed:.1f}s, 吞吐: {runs / elapsed * 60:.1f} 条/分钟")
+    print(
+        f"单条耗时: p50={statistics.median(latencies):.1f}s, "
+        f"p95={_percentile(latencies, 0.95):.1f}s, max={max(latencies):.1f}s"
+    )
+
+    metrics = collect_metrics()
+    for name in ("fake_provider", "governor", "storage", "checkpoints", "event_loop"):
+        if name in metrics:
+            print(f"\n[{name}]")
+            print(json.dumps(metrics[name], ensure_ascii=False, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="完整工作流压测（模拟提供商）")
+    parser.add_argument("--runs", type=int, default=10, help="生成的视频条数")
+    parser.add_argument("--concurrency", type=int, default=5, help="同时运行的工作流数")
+    parser.add_argument("--variant", default=None, help="工作流变体（默认取 GRAPH_VARIANT）")
+    args = parser.parse_args()
+    if args.variant:
+        os.environ["GRAPH_VARIANT"] = args.variant
+
+    asyncio.run(main(args.runs, args.concurrency))
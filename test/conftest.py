@@ -0,0 +1,47 @@
+"""
+测试公共配置
+"""
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# 测试和压测不访问真实服务，必填的凭证配置使用占位值
+ENV_DEFAULTS = {
+    "ARK_API_KEY": "test",
+    "VOLC_TTS_APPID": "test",
+    "VOLC_TTS_ACCESS_TOKEN": "test",
+    "VOLC_TTS_SECRET_KEY": "test",
+}
+
+
+def apply_env_defaults(extra: dict[str, str] | None = None) -> None:
+    """设置环境变量默认值（已设置的不覆盖）"""
+    for key, value in {**ENV_DEFAULTS, **(extra or {})}.items():
+        os.environ.setdefault(key, value)
+
+
+apply_env_defaults()
+
+
+@pytest.fixture
+def fake_ark(tmp_path):
+    """
+    模拟 Ark 客户端工厂
+
+    make(name, median, sigma=0.0, failure_rate=0.0, seed=0) 返回 (客户端, 行为)，
+    LLM / 图像 / 视频共用同一个行为；name 参与随机数派生。
+    """
+    from app.services.fakes import FakeArkClient, FakeBehavior, FakeMediaStore
+
+    def make(name: str, median: float, sigma: float = 0.0, failure_rate: float = 0.0, seed: int = 0):
+        behavior = FakeBehavior(name, median=median, sigma=sigma, failure_rate=failure_rate, rpm=0, seed=seed)
+        behaviors = dict.fromkeys(("llm", "image", "video"), behavior)
+        client = FakeArkClient(behaviors, FakeMediaStore(tmp_path / "media"), scene_count=1, video_duration=1.0)
+        return client, behavior
+
+    return make
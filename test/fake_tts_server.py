@@ -0,0 +1,91 @@
+"""
+本地 TTS WebSocket 模拟服务（实现火山引擎二进制协议的最小子集）
+
+用于测试流式 TTS，可单独运行：
+    python test/fake_tts_server.py --port 8765
+"""
+import argparse
+import asyncio
+import gzip
+import json
+
+from websockets.asyncio.server import serve
+
+
+def _audio_frame(sequence: int, chunk: bytes) -> bytes:
+    # 版本 1 / 头长 4；仅音频响应（0xb），带序号标志；无压缩
+    header = bytes([0x11, 0xB1 if sequence > 0 else 0xB2, 0x00, 0x00])
+    return (
+        header
+        + sequence.to_bytes(4, "big", signed=True)
+        + len(chunk).to_bytes(4, "big")
+        + chunk
+    )
+
+
+def _error_frame(code: int, message: str) -> bytes:
+    body = gzip.compress(message.encode("utf-8"))
+    header = bytes([0x11, 0xF0, 0x11, 0x00])
+    return header + code.to_bytes(4, "big") + len(body).to_bytes(4, "big") + body
+
+
+class FakeTTSServer:
+    """
+    模拟 TTS 服务：收到 submit 请求后把文本按块作为"音频"返回
+
+    Args:
+        chunk_count: 每次请求返回的音频帧数
+        delay: 帧间隔（秒）
+        fail: 为 True 时返回错误帧
+    """
+
+    def __init__(self, chunk_count: int = 4, delay: float = 0.01, fail: bool = False):
+        self.chunk_count = chunk_count
+        self.delay = delay
+        self.fail = fail
+        self.requests: list[dict] = []
+        self._server = None
+
+    async def _handle(self, ws) -> None:
+        frame = await ws.recv()
+        header_size = (frame[0] & 0x0F) * 4
+        size = int.from_bytes(frame[header_size:header_size + 4], "big")
+        request = json.loads(gzip.decompress(frame[header_size + 4:header_size + 4 + size]))
+        self.requests.append(request)
+
+        if self.fail:
+            await ws.send(_error_frame(3001, "fake failure"))
+            return
+
+        audio = request["request"]["text"].encode("utf-8")
+        step = max(1, -(-len(audio) // self.chunk_count))
+        chunks = [audio[i:i + step] for i in range(0, len(audio), step)]
+        for index, chunk in enumerate(chunks, 1):
+            sequence = -index if index == len(chunks) else index
+            await ws.send(_audio_frame(sequence, chunk))
+            await asyncio.sleep(self.delay)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """启动服务，返回 ws:// 地址"""
+        self._server = await serve(self._handle, host, port)
+        port = self._server.sockets[0].getsockname()[1]
+        return f"ws://{host}:{port}"
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+
+async def _main(port: int) -> None:
+    server = FakeTTSServer()
+    url = await server.start(port=port)
+    print(f"Fake TTS server listening on {url}")
+    await asyncio.Future()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    asyncio.run(_main(parser.parse_args().port))
@@ -0,0 +1,71 @@
+"""
+有界内存检查点存储测试
+"""
+import operator
+from typing import Annotated, TypedDict
+
+from langgraph.graph import END, START, StateGraph
+
+from app.workflow.checkpointer import BoundedMemorySaver
+
+
+class _State(TypedDict):
+    items: Annotated[list, operator.add]
+
+
+def _make_graph(saver: BoundedMemorySaver):
+    workflow = StateGraph(_State)
+    workflow.add_node("a", lambda state: {"items": ["a"]})
+    workflow.add_node("b", lambda state: {"items": ["b"]})
+    workflow.add_edge(START, "a")
+    workflow.add_edge("a", "b")
+    workflow.add_edge("b", END)
+    return workflow.compile(checkpointer=saver)
+
+
+def _config(thread_id: str) -> dict:
+    return {"configurable": {"thread_id": thread_id}}
+
+
+async def test_keep_latest_keeps_one_checkpoint_per_thread():
+    saver = BoundedMemorySaver(keep_latest=True)
+    graph = _make_graph(saver)
+
+    await graph.ainvoke({"items": []}, _config("t1"))
+
+    stats = saver.stats()
+    assert stats["threads"] == 1
+    assert stats["checkpoints"] == 1
+    assert stats["pruned_checkpoints"] > 0
+    # 只保留最新检查点后状态仍然完整
+    state = await graph.aget_state(_config("t1"))
+    assert state.values["items"] == ["a", "b"]
+
+
+async def test_max_threads_evicts_least_recently_used():
+    saver = BoundedMemorySaver(max_threads=2, keep_latest=True)
+    graph = _make_graph(saver)
+
+    for thread_id in ("t1", "t2", "t3"):
+        await graph.ainvoke({"items": []}, _config(thread_id))
+
+    assert saver.stats()["threads"] == 2
+    assert saver.stats()["evicted"] == 1
+    assert await saver.aget_tuple(_config("t1")) is None
+    assert await saver.aget_tuple(_config("t3")) is not None
+
+
+async def test_ttl_expires_idle_threads(monkeypatch):
+    saver = BoundedMemorySaver(ttl=60)
+    graph = _make_graph(saver)
+    await graph.ainvoke({"items": []}, _config("t1"))
+
+    import app.workflow.checkpointer as checkpointer
+    now = checkpointer.time.monotonic()
+    monkeypatch.setattr(checkpointer.time, "monotonic", lambda: now + 120)
+
+    assert await saver.aget_tuple(_config("t1")) is None
+    stats = saver.stats()
+    assert stats["threads"] == 0
+    assert stats["resident_bytes"] == 0
+    assert stats["expired"] == 1
@@ -0,0 +1,93 @@
+"""
+图像请求对冲测试（使用模拟提供商）
+"""
+import asyncio
+import shutil
+
+import pytest
+
+import app.config
+import app.services.governor
+from app.services.fakes import FakeProviderError
+from app.services.image_gen import _HEDGE_MIN_SAMPLES, ImageGenService
+
+# 该种子下同一请求第 1 次尝试约 1.2s、第 2 次约 0.03s（中位数 0.05s，sigma 2.0）
+_SEED = 6
+_API_PARAMS = {"model": "fake", "prompt": "a stick figure", "seed": 7, "size": "1080x1920"}
+
+
+def _make_service(fake_ark, monkeypatch, budget: float, failure_rate: float = 0.0):
+    monkeypatch.setenv("IMAGE_HEDGE_ENABLED", "true")
+    monkeypatch.setenv("IMAGE_HEDGE_BUDGET", str(budget))
+    monkeypatch.setenv("IMAGE_CACHE_ENABLED", "false")
+    monkeypatch.setenv("IMAGE_HEDGE_WINDOW", str(_HEDGE_MIN_SAMPLES))
+    monkeypatch.setattr(app.config, "_settings", None)
+    monkeypatch.setattr(app.services.governor, "_governors", {})
+
+    service = ImageGenService()
+    service.client, behavior = fake_ark("image", 0.05, sigma=2.0, failure_rate=failure_rate, seed=_SEED)
+    # 近期延迟都是 0.05s，超过即触发对冲
+    service._latencies.extend([0.05] * _HEDGE_MIN_SAMPLES)
+    return service, behavior
+
+
+async def _other_tasks() -> set[asyncio.Task]:
+    await asyncio.sleep(0)
+    return asyncio.all_tasks() - {asyncio.current_task()}
+
+
+async def test_no_hedge_when_budget_exhausted(fake_ark, monkeypatch):
+    if shutil.which("ffmpeg") is None:
+        pytest.skip("需要 ffmpeg")
+    service, behavior = _make_service(fake_ark, monkeypatch, budget=0.0)
+
+    response = await service._request(dict(_API_PARAMS))
+
+    assert response.data[0].url
+    assert service.hedges == 0
+    assert behavior.calls == 1
+    assert not await _other_tasks()
+
+
+async def test_hedge_wins_and_primary_is_cancelled(fake_ark, monkeypatch):
+    if shutil.which("ffmpeg") is None:
+        pytest.skip("需要 ffmpeg")
+    service, behavior = _make_service(fake_ark, monkeypatch, budget=1.0)
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    response = await service._request(dict(_API_PARAMS))
+
+    assert response.data[0].url
+    assert loop.time() - started < 1.0  # 未等待慢的主请求
+    assert service.hedges == 1
+    assert service.hedge_wins == 1
+    assert behavior.calls == 2
+    assert not await _other_tasks()
+
+
+async def test_hedge_delay_does_not_fall_after_hedge_wins(fake_ark, monkeypatch):
+    """对冲胜出时慢请求的已等待时间也计入样本，触发阈值不会被快的对冲结果拉低"""
+    if shutil.which("ffmpeg") is None:
+        pytest.skip("需要 ffmpeg")
+    service, behavior = _make_service(fake_ark, monkeypatch, budget=1.0)
+    initial_delay = service._hedge_delay()
+
+    # 窗口内的样本全部替换为对冲请求产生的样本
+    for _ in range(_HEDGE_MIN_SAMPLES):
+        await service._request(dict(_API_PARAMS))
+
+    assert service.hedge_wins == _HEDGE_MIN_SAMPLES
+    assert service._hedge_delay() >= initial_delay
+
+
+async def test_both_attempts_fail(fake_ark, monkeypatch):
+    service, behavior = _make_service(fake_ark, monkeypatch, budget=1.0, failure_rate=1.0)
+
+    with pytest.raises(FakeProviderError):
+        await service._request(dict(_API_PARAMS))
+
+    assert service.hedges == 1
+    assert service.hedge_wins == 0
+    assert behavior.failures == 2
+    assert not await _other_tasks()
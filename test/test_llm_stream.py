@@ -0,0 +1,93 @@
+"""
+流式 JSON 场景解析测试
+"""
+import json
+
+from app.services.llm import JSONArrayStreamParser, LLMService
+
+SAMPLE = "```json\n" + json.dumps({
+    "title": "生命的意义",
+    "scenes": [
+        {"id": 1, "text": "带 \"引号\" 和 {括号} 的文案", "image_prompt": "a [b] c"},
+        {"id": 2, "text": "第二句", "meta": {"tags": [1, 2]}},
+        {"id": 3, "text": "最后一句"},
+    ],
+    "extra": [{"id": 99}],
+}, ensure_ascii=False) + "\n```"
+
+
+def _parse_in_chunks(text: str, size: int) -> list[tuple[int, int]]:
+    """按固定大小分块喂给解析器，返回 (到达位置, 场景 id)"""
+    parser = JSONArrayStreamParser("scenes")
+    emitted = []
+    for pos in range(0, len(text), size):
+        for item in parser.feed(text[pos:pos + size]):
+            emitted.append((pos, item["id"]))
+    return emitted
+
+
+def test_parses_each_scene_once():
+    """任意分块大小都能完整解析出所有场景，且不包含其他数组"""
+    for size in (1, 2, 5, 17, len(SAMPLE)):
+        ids = [scene_id for _, scene_id in _parse_in_chunks(SAMPLE, size)]
+        assert ids == [1, 2, 3], f"chunk size {size}: {ids}"
+
+
+def test_emits_scene_before_stream_ends():
+    """第一个场景在整段文本到达之前就被解析出来"""
+    emitted = _parse_in_chunks(SAMPLE, 4)
+    first_pos, first_id = emitted[0]
+    assert first_id == 1
+    assert first_pos < SAMPLE.index('"id": 2')
+
+
+def test_missing_key_yields_nothing():
+    parser = JSONArrayStreamParser("scenes")
+    assert parser.feed('{"items": [{"id": 1}]}') == []
+
+
+class _RecordingCache:
+    """记录写入的缓存"""
+
+    def __init__(self):
+        self.data: dict[str, dict] = {}
+
+    async def get(self, key: str) -> dict | None:
+        return self.data.get(key)
+
+    async def set(self, key: str, value: dict) -> None:
+        self.data[key] = value
+
+
+def _make_service(monkeypatch, text: str) -> tuple[LLMService, _RecordingCache]:
+    """流式输出固定文本（按 16 字符分块）的 LLM 服务"""
+    service = LLMService()
+    cache = _RecordingCache()
+    service._cache = cache
+
+    async def stream(prompt, system_prompt=None):
+        for pos in range(0, len(text), 16):
+            yield text[pos:pos + 16]
+
+    monkeypatch.setattr(service, "stream", stream)
+    return service, cache
+
+
+async def test_complete_stream_is_cached(monkeypatch):
+    service, cache = _make_service(monkeypatch, SAMPLE)
+
+    items = [item async for item in service.stream_json_items("主题", "scenes", use_cache=True)]
+
+    assert [item["id"] for item in items] == [1, 2, 3]
+    assert [scene["id"] for scene in next(iter(cache.data.values()))["scenes"]] == [1, 2, 3]
+
+
+async def test_truncated_stream_is_not_cached(monkeypatch):
+    """输出在数组中途截断时，已完整的场景照常返回，但不写入缓存"""
+    truncated = SAMPLE[:SAMPLE.index('{"id": 3')]
+    service, cache = _make_service(monkeypatch, truncated)
+
+    items = [item async for item in service.stream_json_items("主题", "scenes", use_cache=True)]
+
+    assert [item["id"] for item in items] == [1, 2]
+    assert cache.data == {}
@@ -0,0 +1,120 @@
+"""
+数据库检查点存储测试（SQLite）
+"""
+import asyncio
+import operator
+from typing import Annotated, TypedDict
+
+import pytest
+from langgraph.graph import END, START, StateGraph
+from langgraph.types import Send
+
+import app.config
+import app.db.session
+from app.db.session import close_db, init_db
+from app.workflow.checkpointer import SQLCheckpointSaver
+
+
+class _State(TypedDict):
+    items: list[int]
+    results: Annotated[list, operator.add]
+
+
+@pytest.fixture
+async def saver(tmp_path, monkeypatch):
+    pytest.importorskip("aiosqlite")
+    monkeypatch.setenv("DATABASE_URL", f"sqlite+aiosqlite:///{tmp_path / 'checkpoints.db'}")
+    monkeypatch.setattr(app.config, "_settings", None)
+    monkeypatch.setattr(app.db.session, "_engine", None)
+    monkeypatch.setattr(app.db.session, "_async_session_maker", None)
+    await init_db()
+    yield SQLCheckpointSaver()
+    await close_db()
+
+
+def _config(thread_id: str) -> dict:
+    return {"configurable": {"thread_id": thread_id}}
+
+
+def _make_graph(saver: SQLCheckpointSaver, calls: list[int], failing: set[int]):
+    """fan-out 到每个 item 的 work 节点，failing 中的 item 在其他任务完成后失败"""
+
+    async def work(task: dict) -> dict:
+        item = task["item"]
+        calls.append(item)
+        if item in failing:
+            await asyncio.sleep(0.05)
+            raise RuntimeError(f"item {item} failed")
+        return {"results": [item]}
+
+    workflow = StateGraph(_State)
+    workflow.add_node("work", work)
+    workflow.add_node("collect", lambda state: {})
+    workflow.add_conditional_edges(
+        START, lambda state: [Send("work", {"item": i}) for i in state["items"]], ["work"]
+    )
+    workflow.add_edge("work", "collect")
+    workflow.add_edge("collect", END)
+    return workflow.compile(checkpointer=saver)
+
+
+async def test_checkpoint_roundtrip_and_list(saver):
+    graph = _make_graph(saver, calls=[], failing=set())
+    await graph.ainvoke({"items": [1, 2], "results": []}, _config("t1"), durability="sync")
+
+    latest = await saver.aget_tuple(_config("t1"))
+    assert latest is not None
+    assert sorted(latest.checkpoint["channel_values"]["results"]) == [1, 2]
+
+    history = [c async for c in saver.alist(_config("t1"))]
+    assert history[0].config["configurable"]["checkpoint_id"] == latest.config["configurable"]["checkpoint_id"]
+    assert len(history) > 1
+
+    limited = [c async for c in saver.alist(_config("t1"), limit=1)]
+    assert len(limited) == 1
+
+    older = [c async for c in saver.alist(_config("t1"), before=latest.config)]
+    assert len(older) == len(history) - 1
+
+    await saver.adelete_thread("t1")
+    assert await saver.aget_tuple(_config("t1")) is None
+
+
+async def test_resume_skips_finished_send_tasks(saver):
+    calls: list[int] = []
+    failing = {3}
+    graph = _make_graph(saver, calls, failing)
+
+    with pytest.raises(RuntimeError):
+        await graph.ainvoke({"items": [1, 2, 3], "results": []}, _config("t2"), durability="sync")
+    assert sorted(calls) == [1, 2, 3]
+
+    # 已完成任务的写入已保存，恢复时只重新执行失败的任务
+    latest = await saver.aget_tuple(_config("t2"))
+    assert len(latest.pending_writes) > 0
+
+    calls.clear()
+    failing.clear()
+    result = await graph.ainvoke(None, _config("t2"), durability="sync")
+
+    assert calls == [3]
+    assert sorted(result["results"]) == [1, 2, 3]
+
+
+async def test_list_filter_limit_and_pending_writes(saver):
+    graph = _make_graph(saver, calls=[], failing={3})
+    with pytest.raises(RuntimeError):
+        await graph.ainvoke({"items": [1, 2, 3], "results": []}, _config("t3"), durability="sync")
+
+    latest = await saver.aget_tuple(_config("t3"))
+    listed = [c async for c in saver.alist(_config("t3"), limit=1)]
+    assert len(listed) == 1
+    assert listed[0].config == latest.config
+    # 批量读取的写入与单独读取一致
+    assert listed[0].pending_writes == latest.pending_writes
+
+    inputs = [c async for c in saver.alist(_config("t3"), filter={"source": "input"})]
+    assert len(inputs) == 1
+    assert inputs[0].metadata["source"] == "input"
+    assert [c async for c in saver.alist(_config("t3"), filter={"source": "loop"}, limit=1)]
+    assert [c async for c in saver.alist(_config("t3"), limit=0)] == []
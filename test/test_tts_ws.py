@@ -0,0 +1,71 @@
+"""
+流式 TTS（WebSocket）测试，使用本地模拟服务
+"""
+import pytest
+from fake_tts_server import FakeTTSServer
+
+import app.config
+from app.services.tts import TTSService
+
+
+@pytest.fixture(autouse=True)
+def _disable_tts_cache(monkeypatch):
+    monkeypatch.setenv("TTS_CACHE_ENABLED", "false")
+    monkeypatch.setattr(app.config, "_settings", None)
+
+
+@pytest.fixture
+async def fake_server():
+    server = FakeTTSServer()
+    url = await server.start()
+    yield server, url
+    await server.stop()
+
+
+def _make_service(ws_endpoint: str) -> TTSService:
+    service = TTSService()
+    service.transport = "websocket"
+    service.ws_endpoint = ws_endpoint
+    return service
+
+
+async def test_stream_audio_yields_chunks(fake_server):
+    server, url = fake_server
+    service = _make_service(url)
+
+    chunks = [c async for c in service.stream_audio("你好，世界。这是一段流式合成测试。")]
+
+    assert len(chunks) == server.chunk_count
+    assert b"".join(chunks).decode("utf-8") == "你好，世界。这是一段流式合成测试。"
+    assert server.requests[0]["request"]["operation"] == "submit"
+
+
+async def test_synthesize_to_file_over_websocket(fake_server, tmp_path):
+    _, url = fake_server
+    service = _make_service(url)
+
+    dest = await service.synthesize_to_file("流式写入文件", tmp_path / "out.mp3")
+
+    assert dest.read_bytes().decode("utf-8") == "流式写入文件"
+
+
+async def test_falls_back_to_http_when_websocket_fails(tmp_path, monkeypatch):
+    server = FakeTTSServer(fail=True)
+    url = await server.start()
+    service = _make_service(url)
+
+    calls = []
+
+    async def fake_http(text, dest, voice_type, speed_ratio):
+        calls.append(text)
+        dest.write_bytes(b"http")
+        return dest
+
+    monkeypatch.setattr(service, "_synthesize_http", fake_http)
+    try:
+        dest = await service.synthesize_to_file("回退", tmp_path / "out.mp3")
+    finally:
+        await server.stop()
+
+    assert calls == ["回退"]
+    assert dest.read_bytes() == b"http"
@@ -0,0 +1,145 @@
+"""
+视频生成幂等记录与断点恢复测试（使用模拟提供商）
+"""
+import shutil
+
+import pytest
+
+import app.config
+import app.db.session
+import app.services.governor
+from app.db.session import close_db, init_db
+from app.services.idempotency import IdempotencyStore
+from app.services.video_gen import VideoGenService
+
+_IMAGE_URL = "http://example.invalid/scene-1.png"
+_PROMPT = "stick figure walking"
+
+requires_ffmpeg = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="需要 ffmpeg")
+
+
+@pytest.fixture
+async def store(tmp_path, monkeypatch):
+    """幂等记录存储（数据库层使用 SQLite）"""
+    pytest.importorskip("aiosqlite")
+    monkeypatch.setenv("DATABASE_URL", f"sqlite+aiosqlite:///{tmp_path / 'idempotency.db'}")
+    monkeypatch.setenv("VIDEO_POLL_MIN_INTERVAL", "0.01")
+    monkeypatch.setenv("VIDEO_POLL_MAX_INTERVAL", "0.05")
+    monkeypatch.setattr(app.config, "_settings", None)
+    monkeypatch.setattr(app.db.session, "_engine", None)
+    monkeypatch.setattr(app.db.session, "_async_session_maker", None)
+    monkeypatch.setattr(app.services.governor, "_governors", {})
+    await init_db()
+    yield IdempotencyStore(ttl=3600)
+    await close_db()
+
+
+class _Uploads:
+    """记录上传调用，fail 为真时模拟上传失败"""
+
+    def __init__(self):
+        self.calls: list[tuple[str, str]] = []
+        self.fail = False
+
+    async def __call__(self, url: str, task_id: str) -> str:
+        self.calls.append((url, task_id))
+        if self.fail:
+            raise ConnectionError("upload failed")
+        return f"http://storage.invalid/{task_id}.mp4"
+
+
+def _make_service(fake_ark, monkeypatch, latency: float = 0.05, failure_rate: float = 0.0):
+    service = VideoGenService()
+    service.client, behavior = fake_ark("video", latency, failure_rate=failure_rate)
+    uploads = _Uploads()
+    monkeypatch.setattr(service, "_download_and_upload", uploads)
+    return service, behavior, uploads
+
+
+async def _open(store: IdempotencyStore, image_url: str = _IMAGE_URL):
+    return await store.open("task-1", 1, "video", image_url, _PROMPT)
+
+
+@requires_ffmpeg
+async def test_polls_existing_provider_task(store, fake_ark, monkeypatch):
+    service, behavior, uploads = _make_service(fake_ark, monkeypatch)
+    response = await service.client.content_generation.tasks.create(model=service.model, content=[])
+    record = await _open(store)
+    await record.update(provider_task_id=response.id)
+
+    url = await service.generate(_IMAGE_URL, _PROMPT, record=record)
+
+    assert url == f"http://storage.invalid/{response.id}.mp4"
+    assert behavior.calls == 1  # 没有创建新任务
+    assert store.resumed == {"video:poll": 1}
+    assert record.get("minio_url") == url
+
+
+@requires_ffmpeg
+async def test_reuploads_after_upload_failure(store, fake_ark, monkeypatch):
+    service, behavior, uploads = _make_service(fake_ark, monkeypatch)
+    record = await _open(store)
+
+    uploads.fail = True
+    with pytest.raises(ConnectionError):
+        await service.generate(_IMAGE_URL, _PROMPT, record=record)
+    assert record.get("video_url")
+    assert record.get("provider_task_id")
+
+    # 重新打开记录（模拟节点重试）：不再创建任务，直接重新上传
+    uploads.fail = False
+    record = await _open(store)
+    url = await service.generate(_IMAGE_URL, _PROMPT, record=record)
+
+    assert behavior.calls == 1
+    assert store.resumed == {"video:upload": 1}
+    assert uploads.calls[0] == uploads.calls[1]
+    assert record.get("minio_url") == url
+
+
+async def test_provider_failure_discards_task_id(store, fake_ark, monkeypatch):
+    service, behavior, uploads = _make_service(fake_ark, monkeypatch, failure_rate=1.0)
+    record = await _open(store)
+
+    with pytest.raises(Exception, match="视频生成失败"):
+        await service.generate(_IMAGE_URL, _PROMPT, record=record)
+
+    assert record.get("provider_task_id") is None
+    assert (await _open(store)).get("provider_task_id") is None
+    assert not uploads.calls
+
+
+async def test_timeout_keeps_task_id(store, fake_ark, monkeypatch):
+    monkeypatch.setenv("VIDEO_TASK_TIMEOUT", "0.1")
+    monkeypatch.setattr(app.config, "_settings", None)
+    service, behavior, uploads = _make_service(fake_ark, monkeypatch, latency=60.0)
+    record = await _open(store)
+
+    with pytest.raises(TimeoutError):
+        await service.generate(_IMAGE_URL, _PROMPT, record=record)
+    task_id = record.get("provider_task_id")
+    assert task_id
+
+    # 重试时继续等待同一个任务，而不是重新创建
+    record = await _open(store)
+    assert record.get("provider_task_id") == task_id
+    with pytest.raises(TimeoutError):
+        await service.generate(_IMAGE_URL, _PROMPT, record=record)
+
+    assert behavior.calls == 1
+    assert store.resumed == {"video:poll": 1}
+    assert record.get("provider_task_id") == task_id
+
+
+async def test_record_invalidated_when_fingerprint_changes(store):
+    record = await _open(store)
+    await record.update(provider_task_id="fake-1", video_url="http://example.invalid/v.mp4")
+
+    # 场景图像重新生成后，旧的视频任务不再有效
+    assert (await _open(store, image_url="http://example.invalid/scene-1-v2.png")).get("provider_task_id") is None
+
+    # 输入不变时记录仍然有效，且进程重启后可从数据库读回
+    restarted = IdempotencyStore(ttl=3600)
+    record = await _open(restarted)
+    assert record.get("provider_task_id") == "fake-1"
+    assert record.get("video_url") == "http://example.invalid/v.mp4"